@@ -2,6 +2,7 @@
 """
 知识库管理系统启动脚本
 """
+import multiprocessing
 import os
 import sys
 
@@ -12,4 +13,6 @@ sys.path.insert(0, os.path.abspath(os.path.dirname(__file__)))
 from src.main import main
 
 if __name__ == "__main__":
+    # PyInstaller 打包后，PDF / 导入进程池的子进程会重新执行本程序，由此进入子进程入口
+    multiprocessing.freeze_support()
     main()
\ No newline at end of file
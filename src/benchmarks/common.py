@@ -0,0 +1,73 @@
+"""
+基准测试公共工具：延迟分位数、峰值内存、主机信息与 JSON 报告输出
+"""
+import json
+import os
+import platform
+import sys
+from datetime import datetime
+from typing import Dict, List, Optional
+
+
+def percentile(values: List[float], p: float) -> float:
+    """计算分位数（线性插值）"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def latency_summary(latencies: List[float]) -> Dict[str, float]:
+    """将以秒为单位的延迟列表汇总为毫秒分位数"""
+    if not latencies:
+        return {"count": 0, "mean_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+    return {
+        "count": len(latencies),
+        "mean_ms": sum(latencies) / len(latencies) * 1000,
+        "p50_ms": percentile(latencies, 50) * 1000,
+        "p95_ms": percentile(latencies, 95) * 1000,
+        "p99_ms": percentile(latencies, 99) * 1000,
+        "max_ms": max(latencies) * 1000
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """获取当前进程的峰值常驻内存（MB），无法获取时返回 None"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 返回 KB，macOS 返回字节
+        return peak / 1024 / 1024 if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        pass
+    try:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / 1024 / 1024
+    except ImportError:
+        return None
+
+
+def host_info() -> Dict:
+    """收集主机信息，便于比较不同机器上的结果"""
+    return {
+        "hostname": platform.node(),
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+def write_report(report: Dict, output_path: Optional[str] = None):
+    """输出 JSON 报告到文件或标准输出"""
+    text = json.dumps(report, ensure_ascii=False, indent=2, default=str)
+    if output_path:
+        with open(output_path, "w", encoding="utf-8") as f:
+            f.write(text)
+    else:
+        print(text)
@@ -0,0 +1,176 @@
+"""
+嵌入基准：在可配置的中英文混合语料上扫描批大小、最大长度、线程数与后端
+
+每个配置默认在独立的子进程中运行，峰值内存和加载时间互不干扰。
+用法:
+    python -m src.benchmarks.embedding --corpus-size 2000 --zh-ratio 0.5 \\
+        --batch-sizes 16,32,64 --max-lengths 128,256 --threads 1,4 --backends torch,onnx,onnx-int8
+    python -m src.benchmarks.embedding --corpus data/corpus.jsonl --output report.json
+"""
+import argparse
+import itertools
+import json
+import multiprocessing
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional
+
+from src.benchmarks.common import host_info, latency_summary, peak_rss_mb, write_report
+from src.models.embedding_scheduler import estimate_tokens
+
+# 合成语料使用的词表，覆盖知识库中常见的技术与日常内容
+ZH_WORDS = [
+    "知识库", "向量", "检索", "模型", "文档", "数据", "系统", "用户", "搜索", "结果",
+    "性能", "优化", "服务器", "内存", "配置", "导入", "文件", "段落", "语义", "相似度",
+    "我们", "需要", "通过", "可以", "进行", "已经", "如果", "因为", "所以", "但是",
+    "今天", "公司", "项目", "会议", "报告", "分析", "问题", "方案", "测试", "部署"
+]
+EN_WORDS = [
+    "knowledge", "vector", "search", "model", "document", "data", "system", "user", "query", "result",
+    "performance", "memory", "server", "config", "import", "file", "paragraph", "semantic", "similar", "index",
+    "the", "we", "need", "to", "can", "with", "for", "and", "but", "because",
+    "today", "company", "project", "meeting", "report", "analysis", "issue", "plan", "test", "deploy"
+]
+
+BACKENDS = {
+    "torch": ("torch", False),
+    "onnx": ("onnx", False),
+    "onnx-int8": ("onnx", True)
+}
+
+
+def generate_sentence(rng: random.Random, chinese: bool, min_words: int, max_words: int) -> str:
+    """生成一条合成句子，中文不加空格，英文以空格分词"""
+    words = [rng.choice(ZH_WORDS if chinese else EN_WORDS) for _ in range(rng.randint(min_words, max_words))]
+    return ("".join(words) + "。") if chinese else (" ".join(words).capitalize() + ".")
+
+
+def generate_corpus(size: int, zh_ratio: float = 0.5, min_words: int = 5, max_words: int = 120,
+                    seed: int = 42) -> List[str]:
+    """生成长度不一的中英文混合语料"""
+    rng = random.Random(seed)
+    return [generate_sentence(rng, rng.random() < zh_ratio, min_words, max_words) for _ in range(size)]
+
+
+def load_corpus(path: str, size: Optional[int] = None) -> List[str]:
+    """从 .txt（每行一条）或 .jsonl（text 字段）读取语料"""
+    texts = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            texts.append(json.loads(line)["text"] if path.endswith(".jsonl") else line)
+            if size and len(texts) >= size:
+                break
+    return texts
+
+
+def run_config(model_name: str, backend: str, num_threads: int, max_length: int,
+               batch_sizes: List[int], corpus: List[str], warmup: int = 1) -> List[Dict]:
+    """加载一次模型，依次测量各批大小，返回每个批大小一条结果"""
+    from src.core.model_tester import ModelTester
+
+    engine, quantize = BACKENDS[backend]
+    start = time.perf_counter()
+    model = ModelTester().load_model(model_name, "cpu", engine, num_threads, quantize, max_length)
+    load_time = time.perf_counter() - start
+    total_tokens = sum(estimate_tokens(text) for text in corpus)
+
+    results = []
+    for batch_size in batch_sizes:
+        batches = [corpus[i:i + batch_size] for i in range(0, len(corpus), batch_size)]
+        for batch in batches[:warmup]:
+            model.encode(batch, batch_size=batch_size)
+
+        latencies = []
+        start = time.perf_counter()
+        for batch in batches:
+            batch_start = time.perf_counter()
+            model.encode(batch, batch_size=batch_size)
+            latencies.append(time.perf_counter() - batch_start)
+        elapsed = time.perf_counter() - start
+
+        results.append({
+            "backend": backend,
+            "threads": num_threads,
+            "max_length": max_length,
+            "batch_size": batch_size,
+            "load_time_s": load_time,
+            "elapsed_s": elapsed,
+            "texts_per_sec": len(corpus) / elapsed if elapsed else 0.0,
+            "tokens_per_sec": total_tokens / elapsed if elapsed else 0.0,
+            "batch_latency": latency_summary(latencies),
+            "peak_rss_mb": peak_rss_mb()
+        })
+    return results
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="嵌入模型吞吐、延迟分位数与内存基准")
+    parser.add_argument("--model", default="sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2")
+    parser.add_argument("--corpus", help="语料文件（.txt 每行一条 / .jsonl 的 text 字段），默认生成合成语料")
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--zh-ratio", type=float, default=0.5, help="合成语料中中文句子的比例")
+    parser.add_argument("--min-words", type=int, default=5)
+    parser.add_argument("--max-words", type=int, default=120)
+    parser.add_argument("--batch-sizes", type=_int_list, default=[16, 32, 64])
+    parser.add_argument("--max-lengths", type=_int_list, default=[128, 256])
+    parser.add_argument("--threads", type=_int_list, default=[1, 4])
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8",
+                        help=f"逗号分隔，可选: {', '.join(BACKENDS)}")
+    parser.add_argument("--warmup", type=int, default=1, help="每个批大小的预热批次数")
+    parser.add_argument("--no-isolate", action="store_true", help="在当前进程中运行所有配置（峰值内存将累计）")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    backends = [backend for backend in args.backends.split(",") if backend]
+    unknown = [backend for backend in backends if backend not in BACKENDS]
+    if unknown:
+        parser.error(f"未知后端: {', '.join(unknown)}")
+
+    if args.corpus:
+        corpus = load_corpus(args.corpus, args.corpus_size)
+    else:
+        corpus = generate_corpus(args.corpus_size, args.zh_ratio, args.min_words, args.max_words, args.seed)
+
+    results = []
+    for backend, num_threads, max_length in itertools.product(backends, args.threads, args.max_lengths):
+        config_args = (args.model, backend, num_threads, max_length, args.batch_sizes, corpus, args.warmup)
+        try:
+            if args.no_isolate:
+                results.extend(run_config(*config_args))
+            else:
+                # spawn 保证子进程从干净状态开始，torch 线程设置与峰值内存不受之前配置影响
+                with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+                    results.extend(executor.submit(run_config, *config_args).result())
+        except Exception as e:
+            results.append({
+                "backend": backend,
+                "threads": num_threads,
+                "max_length": max_length,
+                "error": str(e)
+            })
+
+    write_report({
+        "benchmark": "embedding",
+        "host": host_info(),
+        "config": {**vars(args), "backends": backends},
+        "corpus": {
+            "size": len(corpus),
+            "tokens": sum(estimate_tokens(text) for text in corpus),
+            "mean_chars": sum(len(text) for text in corpus) / len(corpus) if corpus else 0
+        },
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
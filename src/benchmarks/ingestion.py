@@ -0,0 +1,273 @@
+"""
+导入流水线基准：DocumentProcessor.process_document → 嵌入 → VectorStore.add_texts
+
+在临时目录中合成 TXT / DOCX / PDF 语料，使用本地模式 Qdrant 跑完整导入流程，
+报告各阶段耗时（解析与分块、嵌入、upsert、点 ID 查询、配置写入）、文档吞吐与峰值内存。
+不依赖 Qt 界面。
+用法:
+    python -m src.benchmarks.ingestion --docs 200 --types txt,docx,pdf --paragraphs 40
+    python -m src.benchmarks.ingestion --model sentence-transformers/all-MiniLM-L6-v2 --output report.json
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List
+
+from src.benchmarks.common import host_info, peak_rss_mb, write_report
+from src.benchmarks.embedding import generate_sentence
+from src.core.document_processor import DocumentProcessor
+from src.core.parse_cache import ParseCache
+from src.core.vector_store import VectorStore
+from src.models.embedding_scheduler import EmbeddingScheduler
+
+# 与界面导入时相同的每批块数
+ADD_BATCH_SIZE = 64
+
+COLLECTION_NAME = "bench_ingestion"
+
+
+class StageTimer:
+    """累计各阶段耗时"""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = defaultdict(float)
+        self.calls: Dict[str, int] = defaultdict(int)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.totals[stage] += time.perf_counter() - start
+                self.calls[stage] += 1
+        return timed
+
+    def summary(self) -> Dict[str, Dict]:
+        return {
+            stage: {"total_s": total, "calls": self.calls[stage]}
+            for stage, total in self.totals.items()
+        }
+
+
+# ---- 语料合成 ----
+
+def _paragraphs(rng: random.Random, count: int, zh_ratio: float, max_words: int) -> List[str]:
+    paragraphs = []
+    for _ in range(count):
+        chinese = rng.random() < zh_ratio
+        paragraphs.append((" " if not chinese else "").join(
+            generate_sentence(rng, chinese, 5, max_words) for _ in range(rng.randint(1, 4))
+        ))
+    return paragraphs
+
+
+def write_txt(path: str, paragraphs: List[str]):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n\n".join(paragraphs))
+
+
+def write_docx(path: str, paragraphs: List[str]):
+    from docx import Document
+    document = Document()
+    for paragraph in paragraphs:
+        document.add_paragraph(paragraph)
+    document.save(path)
+
+
+def _pdf_escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: str, pages: List[List[str]]):
+    """写出只含 Helvetica 文本的最小 PDF（仅 ASCII），不依赖第三方库"""
+    page_count = len(pages)
+    # 对象编号：1 目录，2 页面树，3 字体，之后每页依次为页面对象和内容流
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        ("<< /Type /Pages /Kids [%s] /Count %d >>" % (
+            " ".join(f"{4 + i * 2} 0 R" for i in range(page_count)), page_count
+        )).encode("ascii"),
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+    ]
+    for i, lines in enumerate(pages):
+        stream = "BT /F1 10 Tf 12 TL 40 800 Td " + " ".join(
+            f"({_pdf_escape(line)}) Tj T*" for line in lines
+        ) + " ET"
+        stream_bytes = stream.encode("latin-1", errors="replace")
+        objects.append((
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {5 + i * 2} 0 R >>"
+        ).encode("ascii"))
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream_bytes) + stream_bytes + b"\nendstream")
+
+    with open(path, "wb") as f:
+        f.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(f.tell())
+            f.write(b"%d 0 obj\n" % number + body + b"\nendobj\n")
+        xref = f.tell()
+        f.write(b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1))
+        for offset in offsets:
+            f.write(b"%010d 00000 n \n" % offset)
+        f.write(b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref))
+
+
+def synthesize_corpus(directory: str, docs: int, types: List[str], paragraphs: int,
+                      zh_ratio: float, max_words: int, seed: int) -> List[str]:
+    """在 directory 中生成 docs 个文件，类型轮流取自 types"""
+    rng = random.Random(seed)
+    files = []
+    for i in range(docs):
+        file_type = types[i % len(types)]
+        path = os.path.join(directory, f"doc_{i:05d}.{file_type}")
+        if file_type == "pdf":
+            # 内置 Helvetica 字体不含中文字形，PDF 只生成英文内容，每页约 50 行
+            lines = [line[:100] for line in _paragraphs(rng, paragraphs, 0.0, max_words)]
+            write_pdf(path, [lines[start:start + 50] for start in range(0, len(lines), 50)] or [[]])
+        elif file_type == "docx":
+            write_docx(path, _paragraphs(rng, paragraphs, zh_ratio, max_words))
+        else:
+            write_txt(path, _paragraphs(rng, paragraphs, zh_ratio, max_words))
+        files.append(path)
+    return files
+
+
+# ---- 基准 ----
+
+def instrument(store: VectorStore, timer: StageTimer):
+    """为向量存储的各阶段挂上计时"""
+    store.embedder.encode = timer.wrap("embed", store.embedder.encode)
+    client = store.client
+    client.upsert = timer.wrap("upsert", client.upsert)
+    client.get_collection = timer.wrap("point_id_lookup", client.get_collection)
+    store.save_config = timer.wrap("config_write", store.save_config)
+
+
+def run_ingestion(files: List[str], data_dir: str, batch_size: int, embedder=None, parse_cache=None) -> Dict:
+    """对文件列表执行完整导入流程并返回统计
+    Args:
+        parse_cache: 解析缓存，默认不使用，使每轮都测量真实解析开销
+    """
+    timer = StageTimer()
+    store = VectorStore(data_dir=data_dir, settings={"qdrant": {"mode": "local"}})
+    if embedder is not None:
+        store.set_embedder(embedder)
+    processor = DocumentProcessor(cache=parse_cache)
+    vector_size = len(store.embedder.encode(["vector size probe"])[0])
+    store.create_collection(COLLECTION_NAME, vector_size=vector_size)
+    instrument(store, timer)
+    # 解析与分块在各格式的处理函数中一次完成，合并计时
+    process_document = timer.wrap("parse_chunk", processor.process_document)
+
+    per_type = defaultdict(lambda: {"docs": 0, "chunks": 0, "elapsed_s": 0.0, "errors": 0})
+    total_chunks = 0
+    start = time.perf_counter()
+    for file_path in files:
+        file_type = os.path.splitext(file_path)[1][1:]
+        doc_start = time.perf_counter()
+        try:
+            chunks = process_document(file_path)
+            for i in range(0, len(chunks), batch_size):
+                store.add_texts(COLLECTION_NAME, chunks[i:i + batch_size], is_first_chunk=(i == 0))
+            per_type[file_type]["chunks"] += len(chunks)
+            total_chunks += len(chunks)
+        except Exception as e:
+            per_type[file_type]["errors"] += 1
+            per_type[file_type]["last_error"] = str(e)
+        per_type[file_type]["docs"] += 1
+        per_type[file_type]["elapsed_s"] += time.perf_counter() - doc_start
+    elapsed = time.perf_counter() - start
+
+    stages = timer.summary()
+    accounted = sum(stage["total_s"] for stage in stages.values())
+    stages["other"] = {"total_s": max(elapsed - accounted, 0.0), "calls": 0}
+    for stage in stages.values():
+        stage["share"] = stage["total_s"] / elapsed if elapsed else 0.0
+
+    for stats in per_type.values():
+        stats["docs_per_sec"] = stats["docs"] / stats["elapsed_s"] if stats["elapsed_s"] else 0.0
+
+    store.pool.close()
+    return {
+        "docs": len(files),
+        "chunks": total_chunks,
+        "elapsed_s": elapsed,
+        "docs_per_sec": len(files) / elapsed if elapsed else 0.0,
+        "chunks_per_sec": total_chunks / elapsed if elapsed else 0.0,
+        "stages": stages,
+        "per_type": dict(per_type),
+        "embedder": store.embedder.stats() if hasattr(store.embedder, "stats") else None
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="端到端文档导入基准（本地模式 Qdrant，无界面）")
+    parser.add_argument("--docs", type=int, default=100, help="生成的文档数量")
+    parser.add_argument("--types", default="txt,docx,pdf", help="逗号分隔的文件类型: txt, docx, pdf")
+    parser.add_argument("--paragraphs", type=int, default=40, help="每个文档的段落数")
+    parser.add_argument("--max-words", type=int, default=40, help="每句最大词数")
+    parser.add_argument("--zh-ratio", type=float, default=0.5, help="TXT/DOCX 中中文段落的比例")
+    parser.add_argument("--batch-size", type=int, default=ADD_BATCH_SIZE, help="每次 add_texts 的块数")
+    parser.add_argument("--model", help="使用真实嵌入模型，默认使用内置的 SimpleEmbedder")
+    parser.add_argument("--backend", default="torch", choices=["torch", "onnx", "onnx-int8"])
+    parser.add_argument("--threads", type=int, default=None)
+    parser.add_argument("--parse-cache", action="store_true",
+                        help="额外运行一轮使用解析缓存的导入（先冷后热），比较缓存命中时的吞吐")
+    parser.add_argument("--work-dir", help="语料与 Qdrant 数据目录，默认使用临时目录并在结束后删除")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    types = [file_type.strip().lower() for file_type in args.types.split(",") if file_type.strip()]
+    unknown = [file_type for file_type in types if file_type not in ("txt", "docx", "pdf")]
+    if unknown:
+        parser.error(f"不支持的文件类型: {', '.join(unknown)}")
+
+    embedder = None
+    if args.model:
+        from src.core.model_tester import ModelTester
+        model = ModelTester().load_model(
+            args.model, "cpu", "onnx" if args.backend.startswith("onnx") else "torch",
+            args.threads, args.backend == "onnx-int8"
+        )
+        embedder = EmbeddingScheduler(lambda texts: model.encode(texts, batch_size=len(texts)).tolist())
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="vkb_ingest_bench_")
+    try:
+        corpus_dir = os.path.join(work_dir, "corpus")
+        os.makedirs(corpus_dir, exist_ok=True)
+        synth_start = time.perf_counter()
+        files = synthesize_corpus(corpus_dir, args.docs, types, args.paragraphs,
+                                  args.zh_ratio, args.max_words, args.seed)
+        synth_time = time.perf_counter() - synth_start
+        corpus_bytes = sum(os.path.getsize(path) for path in files)
+
+        result = run_ingestion(files, os.path.join(work_dir, "qdrant"), args.batch_size, embedder)
+        if args.parse_cache:
+            cache = ParseCache(os.path.join(work_dir, "parse_cache"))
+            result["parse_cache"] = {
+                "cold": run_ingestion(files, os.path.join(work_dir, "qdrant_cold"), args.batch_size, embedder, cache),
+                "warm": run_ingestion(files, os.path.join(work_dir, "qdrant_warm"), args.batch_size, embedder, cache)
+            }
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report({
+        "benchmark": "ingestion",
+        "host": host_info(),
+        "config": {**vars(args), "types": types},
+        "corpus": {"files": len(files), "bytes": corpus_bytes, "synthesis_s": synth_time},
+        "result": result,
+        "peak_rss_mb": peak_rss_mb()
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+PDF 提取基准：比较各后端在不同并行进程数下的页/秒
+
+用法:
+    python -m src.benchmarks.pdf --pages 400 --workers 1,4
+    python -m src.benchmarks.pdf --pdf manual.pdf --pdf report.pdf --backends pypdfium2,pypdf2
+未指定 --pdf 时合成一个纯文本 PDF。各后端第一轮用于预热（进程池启动、模块导入），不计入结果。
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+from typing import Dict, List
+
+from src.benchmarks.common import host_info, latency_summary, peak_rss_mb, write_report
+from src.benchmarks.ingestion import _paragraphs, write_pdf
+from src.core import pdf_backends
+
+
+def synthesize_pdf(path: str, pages: int, lines_per_page: int, seed: int):
+    rng = random.Random(seed)
+    lines = [line[:100] for line in _paragraphs(rng, pages * lines_per_page, 0.0, 20)]
+    write_pdf(path, [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)])
+
+
+def run_backend(files: List[str], backend: str, workers: int, repeat: int, settings: Dict) -> Dict:
+    """对所有文件重复提取 repeat 轮，返回页/秒与每个文件的延迟"""
+    pdf_backends.extract_pdf_pages(files[0], backend, workers, settings=settings)
+    latencies = []
+    total_pages = 0
+    total_chars = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for file_path in files:
+            file_start = time.perf_counter()
+            pages = pdf_backends.extract_pdf_pages(file_path, backend, workers, settings=settings)
+            latencies.append(time.perf_counter() - file_start)
+            total_pages += len(pages)
+            total_chars += sum(len(text) for text in pages)
+    elapsed = time.perf_counter() - start
+    return {
+        "backend": backend,
+        "workers": workers,
+        "pages": total_pages,
+        "chars_per_page": total_chars / total_pages if total_pages else 0.0,
+        "elapsed_s": elapsed,
+        "pages_per_sec": total_pages / elapsed if elapsed else 0.0,
+        "file_latency": latency_summary(latencies)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较 PDF 提取后端的页/秒")
+    parser.add_argument("--pdf", action="append", help="要提取的 PDF，可重复；默认合成一个")
+    parser.add_argument("--pages", type=int, default=200, help="合成 PDF 的页数")
+    parser.add_argument("--lines-per-page", type=int, default=50)
+    parser.add_argument("--backends", help="逗号分隔的后端，默认所有已安装的后端")
+    parser.add_argument("--workers", default="1,4", help="逗号分隔的并行进程数")
+    parser.add_argument("--pages-per-task", type=int, default=pdf_backends.DEFAULT_PDF_SETTINGS["pages_per_task"])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    backends = args.backends.split(",") if args.backends else pdf_backends.available_backends()
+    missing = [name for name in backends if name not in pdf_backends.BACKENDS or not pdf_backends.BACKENDS[name].available()]
+    if missing:
+        parser.error(f"后端不可用: {', '.join(missing)}（可用: {', '.join(pdf_backends.available_backends())}）")
+    # 基准中总是按 workers 参数并行，不受页数阈值限制
+    settings = {"pdf": {"parallel_min_pages": 1, "pages_per_task": args.pages_per_task}}
+
+    work_dir = None
+    files = args.pdf
+    if not files:
+        work_dir = tempfile.mkdtemp(prefix="vkb_pdf_bench_")
+        files = [os.path.join(work_dir, "synthetic.pdf")]
+        synthesize_pdf(files[0], args.pages, args.lines_per_page, args.seed)
+    try:
+        results = [
+            run_backend(files, backend, int(workers), args.repeat, settings)
+            for backend in backends
+            for workers in args.workers.split(",")
+        ]
+    finally:
+        pdf_backends.shutdown_pool()
+        if work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    write_report({
+        "benchmark": "pdf",
+        "host": host_info(),
+        "config": vars(args),
+        "files": [{"path": path, "bytes": os.path.getsize(path)} for path in files] if args.pdf else None,
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
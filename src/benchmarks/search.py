@@ -0,0 +1,272 @@
+"""
+搜索基准：不同集合规模与 HNSW / 量化配置下的 VectorStore.search 延迟、QPS 与召回率
+
+向量由带种子的高斯混合分布按块生成，写入时同步以暴力计算维护每个查询的精确 top-k，
+召回率 = 搜索结果与精确 top-k 的交集 / k。HNSW 与量化只在服务器模式下生效，
+本地模式（qdrant_client 内置的精确搜索）仅适合小规模冒烟测试。
+用法:
+    python -m src.benchmarks.search --sizes 10000,100000,1000000 --clients 1,4,16 \\
+        --index-configs "m=16,ef_construct=100,ef=64;m=32,ef_construct=200,ef=128,quant=scalar"
+    python -m src.benchmarks.search --mode local --sizes 10000 --clients 1
+"""
+import argparse
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from src.benchmarks.common import host_info, latency_summary, peak_rss_mb, write_report
+from src.core.vector_store import VectorStore
+
+DEFAULT_INDEX_CONFIGS = "m=16,ef_construct=100,ef=64;m=16,ef_construct=100,ef=128;m=16,ef_construct=100,ef=128,quant=scalar"
+
+# 上传时每批点数
+UPLOAD_BATCH_SIZE = 1000
+
+# 查询向量的随机数流编号；SeedSequence 只接受非负整数，取数据块编号用不到的最大值
+QUERY_STREAM = 2 ** 32 - 1
+
+
+class QueryEmbedder:
+    """把查询文本 "q{i}" 映射到预先生成的查询向量，使 VectorStore.search 的完整路径可被测量"""
+
+    def __init__(self, query_vectors: np.ndarray):
+        self.query_vectors = query_vectors
+
+    def encode(self, texts):
+        return [self.query_vectors[int(text[1:])].tolist() for text in texts]
+
+
+def parse_index_configs(value: str) -> List[Dict]:
+    """解析 "m=16,ef_construct=100,ef=64,quant=scalar;..." 形式的索引配置列表"""
+    configs = []
+    for spec in value.split(";"):
+        spec = spec.strip()
+        if not spec:
+            continue
+        options = dict(item.split("=", 1) for item in spec.split(","))
+        hnsw = {key: int(options[key]) for key in ("m", "ef_construct") if key in options}
+        search_params = {"hnsw_ef": int(options["ef"])} if "ef" in options else {}
+        quantization = options.get("quant") or None
+        if quantization:
+            search_params["rescore"] = options.get("rescore", "true").lower() != "false"
+            if "oversampling" in options:
+                search_params["oversampling"] = float(options["oversampling"])
+        configs.append({
+            "name": spec.replace(",", "_").replace("=", ""),
+            "hnsw_config": hnsw or None,
+            "quantization": quantization,
+            "search_params": search_params or None
+        })
+    return configs
+
+
+def make_centers(dim: int, clusters: int, seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).normal(size=(clusters, dim)).astype(np.float32)
+
+
+def sample_vectors(centers: np.ndarray, count: int, rng: np.random.Generator, noise: float) -> np.ndarray:
+    """从高斯混合分布采样并归一化，比均匀随机向量更接近真实嵌入的聚簇结构"""
+    labels = rng.integers(0, len(centers), size=count)
+    vectors = centers[labels] + noise * rng.normal(size=(count, centers.shape[1])).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def iter_chunks(size: int, centers: np.ndarray, seed: int, noise: float,
+                chunk_size: int = UPLOAD_BATCH_SIZE) -> Iterator[Tuple[int, np.ndarray]]:
+    """按块生成 size 个点，每块的随机数种子固定，重复生成结果一致"""
+    for index, start in enumerate(range(0, size, chunk_size)):
+        rng = np.random.default_rng([seed, index])
+        yield start, sample_vectors(centers, min(chunk_size, size - start), rng, noise)
+
+
+class ExactTopK:
+    """流式维护每个查询的精确 top-k（内积，向量已归一化即余弦）"""
+
+    def __init__(self, queries: np.ndarray, k: int):
+        self.queries = queries
+        self.k = k
+        self.scores = np.full((len(queries), 0), -np.inf, dtype=np.float32)
+        self.ids = np.zeros((len(queries), 0), dtype=np.int64)
+
+    def update(self, start_id: int, vectors: np.ndarray):
+        scores = np.concatenate([self.scores, self.queries @ vectors.T], axis=1)
+        ids = np.concatenate([
+            self.ids,
+            np.broadcast_to(np.arange(start_id, start_id + len(vectors)), (len(self.queries), len(vectors)))
+        ], axis=1)
+        if scores.shape[1] > self.k:
+            top = np.argpartition(-scores, self.k - 1, axis=1)[:, :self.k]
+            scores = np.take_along_axis(scores, top, axis=1)
+            ids = np.take_along_axis(ids, top, axis=1)
+        self.scores, self.ids = scores, ids
+
+    def ground_truth(self) -> List[set]:
+        return [set(row.tolist()) for row in self.ids]
+
+
+def populate(store: VectorStore, collection: str, size: int, centers: np.ndarray, args,
+             exact: ExactTopK = None) -> float:
+    """通过 VectorStore.add_texts 写入 size 个点，source 字段保存点编号以便计算召回率
+
+    点 ID 显式指定：服务器模式下 points_count 是近似值，以它为起始 ID 会覆盖或跳过点，
+    使点 ID 与精确 top-k 中的编号对不上
+    """
+    start = time.perf_counter()
+    for start_id, vectors in iter_chunks(size, centers, args.seed, args.noise):
+        texts = [{"content": f"point {start_id + i}", "filename": str(start_id + i)} for i in range(len(vectors))]
+        store.add_texts(collection, texts, vectors=vectors.tolist(), start_id=start_id)
+        if exact is not None:
+            exact.update(start_id, vectors)
+    return time.perf_counter() - start
+
+
+def wait_for_index(store: VectorStore, collection: str, timeout: float) -> float:
+    """等待服务器完成索引构建（集合状态变为 green），返回等待时间"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        info = store._execute(lambda client: client.get_collection(collection))
+        if str(getattr(info.status, "value", info.status)).lower() == "green":
+            break
+        time.sleep(1)
+    return time.perf_counter() - start
+
+
+def measure(store: VectorStore, collection: str, query_count: int, k: int, clients: int,
+            search_params, truth: List[set], duration: float) -> Dict:
+    """以 clients 个并发客户端循环执行查询，返回延迟分位数、QPS 与召回率"""
+    deadline = time.perf_counter() + duration
+
+    def client_loop(client_index: int):
+        latencies, recalls = [], []
+        i = client_index
+        while True:
+            query_id = i % query_count
+            begin = time.perf_counter()
+            hits = store.search(f"q{query_id}", collection, limit=k, search_params=search_params)
+            latencies.append(time.perf_counter() - begin)
+            retrieved = {int(source) for _, source, _ in hits if str(source).isdigit()}
+            recalls.append(len(retrieved & truth[query_id]) / k)
+            i += clients
+            # 每个客户端至少把分到的查询跑完一遍，之后按时长截止
+            if i >= query_count and time.perf_counter() >= deadline:
+                return latencies, recalls
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        results = list(executor.map(client_loop, range(clients)))
+    elapsed = time.perf_counter() - start
+
+    latencies = [value for client_latencies, _ in results for value in client_latencies]
+    recalls = [value for _, client_recalls in results for value in client_recalls]
+    return {
+        "clients": clients,
+        "queries": len(latencies),
+        "elapsed_s": elapsed,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "latency": latency_summary(latencies),
+        f"recall@{k}": float(np.mean(recalls)) if recalls else 0.0
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="VectorStore 搜索延迟、QPS 与召回率基准")
+    parser.add_argument("--mode", choices=["server", "local"], default="server")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--http", action="store_true", help="服务器模式使用 HTTP 而不是 gRPC")
+    parser.add_argument("--sizes", type=_int_list, default=[10000, 100000, 1000000])
+    parser.add_argument("--index-configs", default=DEFAULT_INDEX_CONFIGS,
+                        help="分号分隔的配置，键: m, ef_construct, ef, quant(scalar/binary), rescore, oversampling")
+    parser.add_argument("--clients", type=_int_list, default=[1, 4, 16])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=10.0, help="每个并发档位的最短测量时长（秒）")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=256)
+    parser.add_argument("--noise", type=float, default=0.6, help="簇内噪声，越大越接近均匀分布")
+    parser.add_argument("--index-timeout", type=float, default=1800.0)
+    parser.add_argument("--keep", action="store_true", help="结束后保留基准集合")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    index_configs = parse_index_configs(args.index_configs)
+    centers = make_centers(args.dim, args.clusters, args.seed)
+    query_vectors = sample_vectors(centers, args.queries, np.random.default_rng([args.seed, QUERY_STREAM]), args.noise)
+
+    data_dir = None
+    if args.mode == "server":
+        settings = {"qdrant": {
+            "mode": "server",
+            "host": args.host,
+            "port": args.port,
+            "grpc_port": args.grpc_port,
+            "prefer_grpc": not args.http,
+            "pool_size": max(args.clients),
+            "timeout": 60.0
+        }}
+    else:
+        data_dir = tempfile.mkdtemp(prefix="vkb_search_bench_")
+        settings = {"qdrant": {"mode": "local", "timeout": 60.0}}
+
+    store = VectorStore(data_dir=data_dir, settings=settings)
+    store.set_embedder(QueryEmbedder(query_vectors))
+
+    results = []
+    try:
+        for size in args.sizes:
+            truth = None
+            for config in index_configs:
+                collection = f"bench_search_{size}_{config['name']}"
+                if collection in store.get_collections():
+                    store.delete_collection(collection)
+                if not store.create_collection(collection, args.dim, config["hnsw_config"], config["quantization"]):
+                    raise RuntimeError(f"创建集合失败: {collection}")
+
+                # 精确 top-k 与数据只和规模有关，第一个配置写入时顺便计算
+                exact = ExactTopK(query_vectors, args.k) if truth is None else None
+                upload_time = populate(store, collection, size, centers, args, exact)
+                if exact is not None:
+                    truth = exact.ground_truth()
+                index_time = wait_for_index(store, collection, args.index_timeout) if args.mode == "server" else 0.0
+
+                runs = [
+                    measure(store, collection, args.queries, args.k, clients, config["search_params"],
+                            truth, args.duration)
+                    for clients in args.clients
+                ]
+                results.append({
+                    "size": size,
+                    "config": config,
+                    "upload_s": upload_time,
+                    "upload_points_per_sec": size / upload_time if upload_time else 0.0,
+                    "index_wait_s": index_time,
+                    "runs": runs
+                })
+                if not args.keep:
+                    store.delete_collection(collection)
+    finally:
+        store.pool.close()
+        if data_dir:
+            shutil.rmtree(data_dir, ignore_errors=True)
+
+    write_report({
+        "benchmark": "search",
+        "host": host_info(),
+        "config": {**vars(args), "index_configs": index_configs},
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+HTTP 搜索服务压测：在不同并发下测量 /search 或 /search/batch 的延迟、QPS 与拒绝率
+
+先启动服务（python -m src.cli serve），再运行:
+    python -m src.benchmarks.service --concurrency 1,8,32,128 --duration 10
+    python -m src.benchmarks.service --batch 16 --collection 产品文档
+每个客户端线程使用一条 keep-alive 连接；503（背压）与 504（超时）单独计数，不计入延迟。
+"""
+import argparse
+import http.client
+import json
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+from urllib.parse import urlparse
+
+from src.benchmarks.common import host_info, latency_summary, write_report
+from src.benchmarks.embedding import generate_sentence
+
+
+def fetch_metrics(url) -> Dict[str, float]:
+    """读取服务端的批大小指标，用于计算平均合批大小"""
+    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=10)
+    try:
+        connection.request("GET", "/metrics")
+        text = connection.getresponse().read().decode("utf-8")
+    finally:
+        connection.close()
+    values = {}
+    for line in text.splitlines():
+        for name in ("vkb_service_batch_size_sum", "vkb_service_batch_size_count"):
+            if line.startswith(name + " "):
+                values[name] = float(line.split()[1])
+    return values
+
+
+def run_level(args, url, concurrency: int, queries: List[str]) -> Dict:
+    """以指定并发持续发送请求 duration 秒"""
+    path = "/search/batch" if args.batch > 1 else "/search"
+    deadline = time.perf_counter() + args.duration
+    latencies: List[float] = []
+    statuses: Dict[str, int] = {}
+    lock = threading.Lock()
+
+    def client(index: int):
+        rng = random.Random(args.seed + index)
+        connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=args.timeout)
+        local_latencies = []
+        local_statuses: Dict[str, int] = {}
+        try:
+            while time.perf_counter() < deadline:
+                items = [
+                    {"query": rng.choice(queries), "limit": args.limit, "collection": args.collection, "all": args.all}
+                    for _ in range(args.batch)
+                ]
+                body = json.dumps({"queries": items} if args.batch > 1 else items[0], ensure_ascii=False)
+                start = time.perf_counter()
+                try:
+                    connection.request("POST", path, body.encode("utf-8"), {"Content-Type": "application/json"})
+                    response = connection.getresponse()
+                    response.read()
+                    status = str(response.status)
+                except (OSError, http.client.HTTPException) as e:
+                    status = type(e).__name__
+                    connection.close()
+                    connection = http.client.HTTPConnection(url.hostname, url.port or 80, timeout=args.timeout)
+                elapsed = time.perf_counter() - start
+                local_statuses[status] = local_statuses.get(status, 0) + 1
+                if status == "200":
+                    local_latencies.append(elapsed)
+        finally:
+            connection.close()
+        with lock:
+            latencies.extend(local_latencies)
+            for status, count in local_statuses.items():
+                statuses[status] = statuses.get(status, 0) + count
+
+    before = fetch_metrics(url)
+    start_time = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(client, range(concurrency)))
+    elapsed = time.perf_counter() - start_time
+    after = fetch_metrics(url)
+
+    batches = after.get("vkb_service_batch_size_count", 0) - before.get("vkb_service_batch_size_count", 0)
+    batched = after.get("vkb_service_batch_size_sum", 0) - before.get("vkb_service_batch_size_sum", 0)
+    total = sum(statuses.values())
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "statuses": statuses,
+        "rejected_ratio": statuses.get("503", 0) / total if total else 0.0,
+        "qps": len(latencies) / elapsed if elapsed else 0.0,
+        "queries_per_sec": len(latencies) * args.batch / elapsed if elapsed else 0.0,
+        "mean_embed_batch": batched / batches if batches else 0.0,
+        "latency": latency_summary(latencies)
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="压测本地 HTTP 搜索服务")
+    parser.add_argument("--url", default="http://127.0.0.1:8765")
+    parser.add_argument("--concurrency", default="1,8,32", help="逗号分隔的并发客户端数")
+    parser.add_argument("--duration", type=float, default=10.0, help="每个并发级别的持续时间（秒）")
+    parser.add_argument("--batch", type=int, default=1, help="每个请求的查询数，大于 1 时使用 /search/batch")
+    parser.add_argument("--collection", help="目标集合，默认由服务选择")
+    parser.add_argument("--all", action="store_true", help="搜索所有集合")
+    parser.add_argument("--limit", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=500, help="合成查询池大小")
+    parser.add_argument("--zh-ratio", type=float, default=0.5)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    url = urlparse(args.url)
+    rng = random.Random(args.seed)
+    queries = [generate_sentence(rng, rng.random() < args.zh_ratio, 3, 12) for _ in range(args.queries)]
+    results = [run_level(args, url, int(level), queries) for level in args.concurrency.split(",")]
+    write_report({
+        "benchmark": "service",
+        "host": host_info(),
+        "config": vars(args),
+        "results": results
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Qdrant 传输基准：比较 HTTP 与 gRPC 的批量 upsert 吞吐量
+
+用法（需本地运行 Qdrant 二进制，默认端口 6333/6334）:
+    python -m src.benchmarks.transport --points 20000 --workers 4
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+import numpy as np
+from qdrant_client import QdrantClient, models
+from qdrant_client.http.models import Distance, VectorParams
+
+from src.benchmarks.common import host_info, latency_summary, peak_rss_mb, write_report
+from src.core.vector_store import QdrantClientPool
+
+
+def run_transport(args, prefer_grpc: bool) -> Dict:
+    """使用指定传输方式执行一轮 upsert 基准"""
+    transport = "grpc" if prefer_grpc else "http"
+    collection_name = f"bench_transport_{transport}"
+    pool = QdrantClientPool(
+        lambda: QdrantClient(
+            host=args.host,
+            port=args.port,
+            grpc_port=args.grpc_port,
+            prefer_grpc=prefer_grpc,
+            timeout=args.timeout
+        ),
+        size=args.workers
+    )
+    try:
+        with pool.acquire() as client:
+            client.recreate_collection(
+                collection_name=collection_name,
+                vectors_config=VectorParams(size=args.vector_size, distance=Distance.COSINE)
+            )
+
+        rng = np.random.default_rng(args.seed)
+        vectors = rng.random((args.points, args.vector_size), dtype=np.float32)
+        batches = [
+            range(start, min(start + args.batch_size, args.points))
+            for start in range(0, args.points, args.batch_size)
+        ]
+
+        def upsert_batch(batch):
+            points = [
+                models.PointStruct(
+                    id=i,
+                    vector=vectors[i].tolist(),
+                    payload={"text": f"benchmark point {i}"}
+                )
+                for i in batch
+            ]
+            start = time.perf_counter()
+            with pool.acquire() as client:
+                client.upsert(collection_name=collection_name, points=points, wait=True)
+            return time.perf_counter() - start
+
+        start_time = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=args.workers) as executor:
+            latencies = list(executor.map(upsert_batch, batches))
+        elapsed = time.perf_counter() - start_time
+
+        with pool.acquire() as client:
+            client.delete_collection(collection_name)
+
+        return {
+            "transport": transport,
+            "points": args.points,
+            "elapsed_s": elapsed,
+            "points_per_sec": args.points / elapsed if elapsed else 0.0,
+            "batch_latency": latency_summary(latencies)
+        }
+    finally:
+        pool.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="比较 Qdrant HTTP 与 gRPC 的 upsert 吞吐量")
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=6333)
+    parser.add_argument("--grpc-port", type=int, default=6334)
+    parser.add_argument("--points", type=int, default=20000)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--vector-size", type=int, default=384)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--output", help="JSON 报告输出路径，默认打印到标准输出")
+    args = parser.parse_args(argv)
+
+    results = [run_transport(args, prefer_grpc=False), run_transport(args, prefer_grpc=True)]
+    write_report({
+        "benchmark": "transport",
+        "host": host_info(),
+        "config": vars(args),
+        "results": results,
+        "peak_rss_mb": peak_rss_mb()
+    }, args.output)
+
+
+if __name__ == "__main__":
+    main()
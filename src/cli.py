@@ -0,0 +1,410 @@
+"""
+命令行入口：无界面地导入、搜索与查看知识库，不依赖 PyQt6
+
+用法:
+    python -m src.cli import docs/ --collection 产品文档 --create --recursive --workers 4
+    python -m src.cli import docs/ --collection 产品文档 --watch 300     # 常驻，每 5 分钟导入新增或修改的文件
+    python -m src.cli search "如何配置服务器" --collection 产品文档 --limit 5
+    python -m src.cli search --queries queries.jsonl --all > results.jsonl
+    python -m src.cli stats
+    python -m src.cli serve --service-port 8765                      # 本地 HTTP 搜索服务
+    python -m src.cli bench ingestion --docs 100
+
+结果以 JSON / JSON Lines 写到标准输出，日志写到标准错误，便于脚本与 cron 处理。
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional
+
+from src.core.document_processor import DocumentProcessor, available_extensions, iter_batches
+from src.core.logger import Logger
+from src.core.vector_store import VectorStore, payload_content
+
+logger = Logger.get_logger("cli")
+
+# 与界面导入一致的每批块数
+ADD_BATCH_SIZE = 64
+
+BENCHMARKS = ("embedding", "ingestion", "pdf", "search", "service", "transport")
+
+
+def emit(record: Dict, stream=None):
+    """输出一行 JSON"""
+    stream = stream or sys.stdout
+    stream.write(json.dumps(record, ensure_ascii=False, default=str) + "\n")
+    stream.flush()
+
+
+def build_store(args) -> VectorStore:
+    """按命令行参数创建 VectorStore，未指定时沿用 settings.json"""
+    settings = None
+    if args.mode == "local":
+        settings = {"qdrant": {"mode": "local"}}
+    elif args.mode == "server":
+        settings = {"qdrant": {"mode": "server", "host": args.host, "port": args.port}}
+    return VectorStore(data_dir=args.data_dir, settings=settings)
+
+
+# ---- import ----
+
+_worker_processor: Optional[DocumentProcessor] = None
+
+
+def _parse_file(file_path: str) -> List[Dict]:
+    """在解析进程中处理单个文件"""
+    global _worker_processor
+    if _worker_processor is None:
+        # 文件之间已经并行，单个 PDF 不再拆分到更多进程
+        _worker_processor = DocumentProcessor(pdf_workers=1)
+    return _worker_processor.process_document(file_path)
+
+
+def iter_files(paths: Iterable[str], recursive: bool, extensions: List[str]) -> Iterator[str]:
+    """展开文件与目录参数，只保留支持的扩展名"""
+    for path in paths:
+        path = Path(path)
+        if path.is_dir():
+            candidates = path.rglob("*") if recursive else path.iterdir()
+            for candidate in sorted(candidates):
+                if candidate.is_file() and candidate.suffix.lower() in extensions:
+                    yield str(candidate)
+        elif path.is_file():
+            yield str(path)
+        else:
+            logger.warning(f"路径不存在: {path}")
+
+
+class ImportState:
+    """记录已导入文件的大小与修改时间，增量导入时跳过未变化的文件"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.files: Dict[str, Dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    self.files = json.load(f)
+            except Exception as e:
+                logger.error(f"读取导入状态失败: {str(e)}")
+
+    @staticmethod
+    def _signature(file_path: str) -> Dict:
+        stat = os.stat(file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime}
+
+    def key(self, collection: str, file_path: str) -> str:
+        return f"{collection}::{os.path.abspath(file_path)}"
+
+    def was_imported(self, collection: str, file_path: str) -> bool:
+        return self.key(collection, file_path) in self.files
+
+    def is_current(self, collection: str, file_path: str) -> bool:
+        return self.files.get(self.key(collection, file_path)) == self._signature(file_path)
+
+    def mark(self, collection: str, file_path: str):
+        self.files[self.key(collection, file_path)] = self._signature(file_path)
+
+    def save(self):
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.files, f, ensure_ascii=False, indent=2)
+        os.replace(tmp, self.path)
+
+
+def import_files(store: VectorStore, files: List[str], collection: str, workers: int,
+                 batch_size: int, per_file: bool, state: Optional[ImportState] = None) -> Dict:
+    """并行解析文件，由当前线程依次写入向量库
+
+    写入保持单线程：add_texts 以集合当前点数作为起始 ID，并发写入会产生 ID 冲突。
+    增量导入时，已导入过但内容有变化的文件先删除旧的块再写入，不会重复。
+    """
+    summary = {"collection": collection, "files": len(files), "imported": 0, "failed": 0, "chunks": 0,
+               "replaced": 0}
+    start = time.perf_counter()
+
+    def store_chunks(file_path: str, chunks: Iterable[Dict]) -> int:
+        count = 0
+        # 解析成功后才删除旧的块：解析失败时保留上一次导入的内容
+        chunks = iter(chunks)
+        first = next(chunks, None)
+        if state is not None and state.was_imported(collection, file_path):
+            if store.delete_source(collection, file_path):
+                summary["replaced"] += 1
+        if first is not None:
+            chunks = itertools.chain([first], chunks)
+        for i, batch in enumerate(iter_batches(chunks, batch_size)):
+            store.add_texts(collection, batch, is_first_chunk=(i == 0))
+            count += len(batch)
+        summary["imported"] += 1
+        summary["chunks"] += count
+        if state is not None:
+            state.mark(collection, file_path)
+        return count
+
+    def report(file_path: str, status: str, chunks: int = 0, error: str = None):
+        if per_file:
+            record = {"file": file_path, "status": status, "chunks": chunks}
+            if error:
+                record["error"] = error
+            emit(record)
+
+    def handle(file_path: str, parse):
+        try:
+            count = store_chunks(file_path, parse())
+            report(file_path, "ok", count)
+        except Exception as e:
+            summary["failed"] += 1
+            logger.error(f"导入失败: {file_path}: {str(e)}")
+            report(file_path, "failed", error=str(e))
+
+    if workers <= 1:
+        processor = DocumentProcessor()
+        # 旧版 Office 文件在后台并行转换
+        processor.prefetch(files)
+        for file_path in files:
+            handle(file_path, lambda file_path=file_path: processor.iter_chunks(file_path))
+    else:
+        processor = DocumentProcessor(pdf_workers=1)
+        streaming = [file_path for file_path in files if processor.is_streaming(file_path)]
+        skipped = set(streaming)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            pending = {}
+            queue = (file_path for file_path in files if file_path not in skipped)
+            # 在途任务数有上限，避免解析结果在内存中堆积
+            for file_path in queue:
+                pending[executor.submit(_parse_file, file_path)] = file_path
+                if len(pending) >= workers * 2:
+                    break
+            # 大的行式文本文件在当前进程边读边写入，不把整个文件的解析结果传回主进程；
+            # 期间进程池继续解析其余文件
+            for file_path in streaming:
+                handle(file_path, lambda file_path=file_path: processor.iter_chunks(file_path))
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    file_path = pending.pop(future)
+                    handle(file_path, future.result)
+                    next_file = next(queue, None)
+                    if next_file is not None:
+                        pending[executor.submit(_parse_file, next_file)] = next_file
+
+    if state is not None:
+        state.save()
+    summary["elapsed_s"] = time.perf_counter() - start
+    summary["docs_per_sec"] = summary["imported"] / summary["elapsed_s"] if summary["elapsed_s"] else 0.0
+    return summary
+
+
+def cmd_import(args) -> int:
+    if args.create and not args.collection:
+        logger.error("--create 需要同时指定 --collection")
+        return 2
+    store = build_store(args)
+    collection = args.collection or store._resolve_collection()
+    if collection not in store.get_collections():
+        if not args.create:
+            logger.error(f"集合不存在: {collection}（使用 --create 自动创建）")
+            return 2
+        if not store.create_collection(collection):
+            return 2
+
+    extensions = [ext if ext.startswith(".") else f".{ext}" for ext in args.extensions.split(",")]
+    incremental = args.incremental or args.watch
+    state = None
+    if incremental:
+        state_path = args.state or os.path.join(os.path.dirname(store.config_file), "import_state.json")
+        state = ImportState(state_path)
+
+    while True:
+        files = list(iter_files(args.paths, args.recursive, extensions))
+        if state is not None:
+            # 块的 source 字段即此路径，统一为绝对路径，换工作目录运行时也能找到旧的块
+            files = [os.path.abspath(file_path) for file_path in files]
+        skipped = 0
+        if state is not None:
+            pending = [file_path for file_path in files if not state.is_current(collection, file_path)]
+            skipped = len(files) - len(pending)
+            files = pending
+        summary = import_files(store, files, collection, args.workers, args.batch_size, args.per_file, state)
+        summary["skipped"] = skipped
+        emit({"summary": summary} if args.per_file else summary)
+        if not args.watch:
+            return 1 if summary["failed"] else 0
+        time.sleep(args.watch)
+
+
+# ---- search ----
+
+
+def iter_queries(args) -> Iterator[Dict]:
+    """命令行查询或 JSONL 查询文件（每行 {"query", "collection"?, "limit"?}，或纯文本行）"""
+    if args.query:
+        yield {"query": args.query}
+        return
+    stream = sys.stdin if args.queries == "-" else open(args.queries, "r", encoding="utf-8")
+    try:
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                yield json.loads(line)
+            else:
+                yield {"query": line}
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+
+
+def cmd_search(args) -> int:
+    if not args.query and not args.queries:
+        logger.error("需要提供查询文本或 --queries 文件")
+        return 2
+    store = build_store(args)
+    for item in iter_queries(args):
+        query = item["query"]
+        limit = int(item.get("limit", args.limit))
+        start = time.perf_counter()
+        if args.all or item.get("collection") == "*":
+            hits = [
+                {"score": score, "source": source, "text": payload_content(text), "collection": collection}
+                for score, source, text, collection in store.search_all(query, limit=limit)
+            ]
+        else:
+            collection = item.get("collection", args.collection)
+            hits = [
+                {"score": score, "source": source, "text": payload_content(text)}
+                for score, source, text in store.search(query, collection, limit=limit)
+            ]
+        emit({
+            "id": item.get("id"),
+            "query": query,
+            "latency_ms": (time.perf_counter() - start) * 1000,
+            "hits": hits
+        })
+    return 0
+
+
+# ---- stats ----
+
+def cmd_stats(args) -> int:
+    store = build_store(args)
+    collections = []
+    for name in store.get_collections():
+        info = store.get_collection_info(name)
+        collections.append({
+            "name": name,
+            "documents": info["points_count"],
+            "created_at": info["created_at"],
+            "status": str(getattr(info["status"], "value", info["status"]))
+        })
+    emit({
+        "data_dir": os.path.dirname(store.config_file),
+        "transport": store.transport,
+        "collections": collections
+    })
+    return 0
+
+
+# ---- serve ----
+
+def cmd_serve(args) -> int:
+    from src.core.search_service import DEFAULT_SERVICE_SETTINGS, run_service
+    from src.core.settings import read_settings
+    config = {**DEFAULT_SERVICE_SETTINGS, **(read_settings() or {}).get("service", {})}
+    overrides = {
+        "host": args.bind,
+        "port": args.service_port,
+        "max_batch_size": args.max_batch_size,
+        "max_wait_ms": args.max_wait_ms,
+        "max_pending": args.max_pending,
+        "request_timeout": args.timeout
+    }
+    config.update({key: value for key, value in overrides.items() if value is not None})
+    if args.allow_file_ingest:
+        config["allow_file_ingest"] = True
+    run_service(build_store(args), config)
+    return 0
+
+
+# ---- bench ----
+
+def cmd_bench(args) -> int:
+    import importlib
+    module = importlib.import_module(f"src.benchmarks.{args.benchmark}")
+    module.main(args.bench_args)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m src.cli", description="V-knowledge 命令行工具")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--mode", choices=["settings", "local", "server"], default="settings",
+                        help="Qdrant 连接方式，默认读取 settings.json")
+    common.add_argument("--host", default="localhost")
+    common.add_argument("--port", type=int, default=6333)
+    common.add_argument("--data-dir", help="数据目录（本地存储与 kb_config.json），默认与界面相同")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", parents=[common], help="导入文件或目录")
+    import_parser.add_argument("paths", nargs="+")
+    import_parser.add_argument("--collection", help="目标集合，默认使用第一个集合")
+    import_parser.add_argument("--create", action="store_true", help="集合不存在时创建")
+    import_parser.add_argument("--recursive", "-r", action="store_true")
+    import_parser.add_argument("--extensions", default=",".join(available_extensions()))
+    import_parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="解析进程数")
+    import_parser.add_argument("--batch-size", type=int, default=ADD_BATCH_SIZE)
+    import_parser.add_argument("--per-file", action="store_true", help="每个文件输出一行结果")
+    import_parser.add_argument("--incremental", action="store_true", help="跳过大小与修改时间未变化的已导入文件，修改过的文件先删除旧的块再导入")
+    import_parser.add_argument("--state", help="增量导入状态文件，默认在数据目录中")
+    import_parser.add_argument("--watch", type=float, metavar="SECONDS",
+                               help="常驻模式：每隔 SECONDS 秒重新扫描并增量导入")
+    import_parser.set_defaults(func=cmd_import)
+
+    search_parser = subparsers.add_parser("search", parents=[common], help="搜索")
+    search_parser.add_argument("query", nargs="?")
+    search_parser.add_argument("--queries", help="JSONL 查询文件，- 表示标准输入")
+    search_parser.add_argument("--collection")
+    search_parser.add_argument("--all", action="store_true", help="搜索所有集合")
+    search_parser.add_argument("--limit", type=int, default=5)
+    search_parser.set_defaults(func=cmd_search)
+
+    stats_parser = subparsers.add_parser("stats", parents=[common], help="集合统计")
+    stats_parser.set_defaults(func=cmd_stats)
+
+    serve_parser = subparsers.add_parser("serve", parents=[common], help="运行本地 HTTP 搜索服务")
+    serve_parser.add_argument("--bind", help="监听地址，默认 127.0.0.1")
+    serve_parser.add_argument("--service-port", type=int, help="监听端口，默认 8765")
+    serve_parser.add_argument("--max-batch-size", type=int, help="一次嵌入调用合并的最大查询数")
+    serve_parser.add_argument("--max-wait-ms", type=float, help="凑批的最长等待时间")
+    serve_parser.add_argument("--max-pending", type=int, help="同时处理的请求上限，超出返回 503")
+    serve_parser.add_argument("--timeout", type=float, help="单个请求的超时（秒），超出返回 504")
+    serve_parser.add_argument("--allow-file-ingest", action="store_true", help="允许 /ingest 按本机路径导入文件")
+    serve_parser.set_defaults(func=cmd_serve)
+
+    bench_parser = subparsers.add_parser("bench", help="运行基准测试")
+    bench_parser.add_argument("benchmark", choices=BENCHMARKS)
+    bench_parser.add_argument("bench_args", nargs=argparse.REMAINDER, help="传给基准脚本的参数")
+    bench_parser.set_defaults(func=cmd_bench)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return 130
+    except Exception as e:
+        logger.error(f"命令执行失败: {str(e)}")
+        return 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,271 @@
+import asyncio
+import threading
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Coroutine, Dict, Iterable, List, Optional
+from qdrant_client import AsyncQdrantClient
+from qdrant_client.http.models import Distance, PayloadSchemaType, VectorParams
+from src.core.logger import Logger
+from src.core.vector_store import VectorStore, build_points, format_hits
+
+
+class _ThreadedClient:
+    """本地模式下存储目录已被 VectorStore 的客户端加锁，改为在线程中调用它的同步客户端"""
+
+    def __init__(self, store: VectorStore):
+        self.store = store
+
+    def __getattr__(self, name):
+        async def call(*args, **kwargs):
+            return await asyncio.to_thread(
+                self.store._execute, lambda client: getattr(client, name)(*args, **kwargs), name
+            )
+        return call
+
+    async def close(self):
+        # 客户端属于 VectorStore，由它关闭
+        pass
+
+
+class AsyncVectorStore:
+    """基于 AsyncQdrantClient 的异步向量存储，接口与 VectorStore 保持一致
+
+    与一个 VectorStore 共用知识库配置（kb_config.json）、嵌入服务和点 ID 分配：
+    ID 通过 VectorStore.reserve_point_ids 预留，同步与异步写入可以混用同一个集合。
+    使用前需调用 `await store.connect()`。导入时可通过 `add_texts_many`
+    同时保持多个 upsert 请求在途，搜索时可通过 `search_many` 并发查询多个集合。
+    """
+
+    def __init__(self, store: VectorStore, max_in_flight: int = 8):
+        """初始化异步向量存储
+        Args:
+            store: 共用配置与 ID 分配的同步向量存储
+            max_in_flight: 同时在途的 upsert 请求上限
+        """
+        self.logger = Logger.get_logger("vector_store")
+        self.store = store
+        self.max_in_flight = max_in_flight
+        self.client = None
+        self.current_collection = None
+
+    @property
+    def config(self) -> Dict:
+        return self.store.config
+
+    @property
+    def embedder(self):
+        return self.store.embedder
+
+    async def connect(self):
+        """建立连接：服务器模式使用 AsyncQdrantClient，本地模式在线程中复用同步客户端"""
+        try:
+            if self.store.server_address is not None:
+                host, port = self.store.server_address
+                transport = self.store.transport
+                self.logger.info(f"正在异步连接到 Qdrant 服务器: {host}:{port}")
+                self.client = AsyncQdrantClient(
+                    host=host,
+                    port=port,
+                    grpc_port=transport["grpc_port"],
+                    prefer_grpc=transport["prefer_grpc"],
+                    timeout=transport["timeout"]
+                )
+            else:
+                self.client = _ThreadedClient(self.store)
+
+            await self.client.get_collections()
+            self.logger.info("异步向量存储连接成功")
+            return self
+        except Exception as e:
+            self.logger.error(f"初始化异步向量存储失败: {str(e)}")
+            raise ConnectionError(f"初始化异步向量存储失败: {str(e)}")
+
+    async def close(self):
+        """关闭客户端"""
+        if self.client is not None:
+            await self.client.close()
+            self.client = None
+
+    async def __aenter__(self):
+        return await self.connect()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
+    async def create_collection(self, name, vector_size=None):
+        """创建新的集合
+        Args:
+            vector_size: 向量维度，None 使用当前嵌入模型的维度
+        """
+        try:
+            if name in await self.get_collections():
+                raise ValueError(f"集合 {name} 已存在")
+
+            vector_size = vector_size or self.store.vector_size
+            await self.client.create_collection(
+                collection_name=name,
+                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+            )
+            try:
+                await self.client.create_payload_index(
+                    collection_name=name, field_name="source", field_schema=PayloadSchemaType.KEYWORD
+                )
+            except Exception as e:
+                self.logger.warning(f"创建 source 索引失败: {name}: {str(e)}")
+
+            with self.store._id_lock:
+                self.config["collections"][name] = {
+                    "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "doc_count": 0,
+                    "vector_size": vector_size,
+                    "source_indexed": True
+                }
+                self.store.save_config()
+
+            self.current_collection = name
+            self.logger.info(f"成功创建集合: {name}")
+            return True
+        except Exception as e:
+            self.logger.error(f"创建集合失败: {str(e)}")
+            return False
+
+    async def get_collections(self):
+        """获取所有集合"""
+        try:
+            collections = (await self.client.get_collections()).collections
+            return [collection.name for collection in collections]
+        except Exception as e:
+            self.logger.error(f"获取集合失败: {str(e)}")
+            return []
+
+    async def get_collection_info(self, collection_name: str) -> Dict:
+        """获取集合信息"""
+        try:
+            collection_info = await self.client.get_collection(collection_name)
+            return {
+                "name": collection_name,
+                "points_count": self.config["collections"][collection_name]["doc_count"],
+                "created_at": self.config["collections"][collection_name]["created_at"],
+                "status": collection_info.status
+            }
+        except Exception as e:
+            self.logger.error(f"获取集合信息失败: {str(e)}")
+            return {
+                "name": collection_name,
+                "points_count": 0,
+                "created_at": "未知",
+                "status": "未知"
+            }
+
+    async def add_texts(self, collection_name: str, texts: list, is_first_chunk: bool = False):
+        """Add texts to collection
+        Args:
+            collection_name: Collection name
+            texts: List of texts
+            is_first_chunk: Whether this is the first chunk of the document, used to control document count
+        """
+        try:
+            # Embedding and the locked ID reservation block, keep them off the event loop
+            vectors = await asyncio.to_thread(self.embedder.encode, texts)
+            start_id = await asyncio.to_thread(self.store.reserve_point_ids, collection_name, len(texts))
+
+            await self.client.upsert(
+                collection_name=collection_name,
+                points=build_points(texts, vectors, start_id)
+            )
+
+            if is_first_chunk:
+                await asyncio.to_thread(self.store.count_document, collection_name)
+
+            self.logger.debug("Successfully added %d texts to collection %s", len(texts), collection_name)
+        except Exception as e:
+            self.logger.error(f"Failed to add texts: {str(e)}")
+            raise
+
+    async def add_texts_many(self, collection_name: str, documents: Iterable[list]):
+        """Add several documents concurrently, keeping up to max_in_flight upserts pending
+        Args:
+            collection_name: Collection name
+            documents: Iterable of chunk lists, one list per document
+        """
+        semaphore = asyncio.Semaphore(self.max_in_flight)
+
+        async def add_document(texts):
+            async with semaphore:
+                await self.add_texts(collection_name, texts, is_first_chunk=True)
+
+        await asyncio.gather(*(add_document(texts) for texts in documents if texts))
+
+    async def _resolve_collection(self, collection_name):
+        """Return collection_name, falling back to the current or first collection"""
+        if collection_name is not None:
+            return collection_name
+        if self.current_collection is None:
+            collections = await self.get_collections()
+            if not collections:
+                raise ValueError("No available collections, please create one first")
+            self.current_collection = collections[0]
+        return self.current_collection
+
+    async def _search_vector(self, query_vector, collection_name, limit):
+        search_result = await self.client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            limit=limit
+        )
+        return format_hits(search_result)
+
+    async def search(self, query, collection_name=None, limit=5):
+        """Search texts
+        Returns:
+            list: Search results list, each element is a (score, source, text) tuple
+        """
+        try:
+            collection_name = await self._resolve_collection(collection_name)
+            query_vector = (await asyncio.to_thread(self.embedder.encode, [query]))[0]
+            return await self._search_vector(query_vector, collection_name, limit)
+        except Exception as e:
+            self.logger.error(f"搜索失败: {str(e)}")
+            return []
+
+    async def search_many(self, query, collection_names: List[str], limit=5) -> Dict[str, list]:
+        """Encode the query once and search several collections concurrently
+        Returns:
+            dict: Collection name -> (score, source, text) tuples
+        """
+        query_vector = (await asyncio.to_thread(self.embedder.encode, [query]))[0]
+        results = await asyncio.gather(
+            *(self._search_vector(query_vector, name, limit) for name in collection_names),
+            return_exceptions=True
+        )
+        merged = {}
+        for name, result in zip(collection_names, results):
+            if isinstance(result, Exception):
+                self.logger.error(f"搜索集合 {name} 失败: {str(result)}")
+                merged[name] = []
+            else:
+                merged[name] = result
+        return merged
+
+
+class AsyncLoopThread:
+    """在专用线程中运行 asyncio 事件循环，供 Qt 等同步代码提交协程"""
+
+    def __init__(self, name: str = "AsyncVectorStoreLoop"):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, coro: Coroutine) -> Future:
+        """提交协程，返回 concurrent.futures.Future，可在 Qt 线程中通过回调获取结果"""
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def stop(self):
+        """停止事件循环并等待线程退出"""
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
@@ -1,17 +1,126 @@
+import hashlib
+import json
 import os
-from typing import List, Dict, Optional, Callable
+import time
+from itertools import islice
+from typing import List, Dict, Iterable, Iterator, Optional, Callable
 from pathlib import Path
-import PyPDF2
 from docx import Document
 from datetime import datetime
+from src.core import metrics
+from src.core.office_converter import CONVERSIONS, get_converter
+from src.core.parse_cache import ParseCache
+from src.core.pdf_backends import extract_pdf_pages, load_pdf_settings, resolve_backend
+from src.core.structured_text import (
+    RecordMapper, iter_csv_units, iter_jsonl_units, iter_markdown_units, load_streaming_settings
+)
+from src.core.text_encoding import iter_lines, iter_paragraphs, iter_text
+
+_DEFAULT_CACHE = object()
+
+# 界面与命令行共用的扩展名列表
+SUPPORTED_EXTENSIONS = ('.txt', '.md', '.csv', '.jsonl', '.pdf', '.docx',
+                        '.doc', '.rtf', '.xls', '.xlsx', '.ppt', '.pptx')
+
+# 可以边读边导入的行式文本格式
+STREAMING_EXTENSIONS = ('.txt', '.md', '.csv', '.jsonl')
+
+
+def available_extensions() -> List[str]:
+    """当前环境可以导入的扩展名：需要转换的 Office 格式只在装有转换工具时包含"""
+    converter = get_converter()
+    return [ext for ext in SUPPORTED_EXTENSIONS if ext not in CONVERSIONS or converter.can_convert(ext)]
+
+
+def file_dialog_filter() -> str:
+    """文件选择对话框的过滤器"""
+    patterns = " ".join(f"*{ext}" for ext in available_extensions())
+    return f"Document Files ({patterns});;All Files (*.*)"
+
+
+def iter_batches(chunks: Iterable[Dict], batch_size: int) -> Iterator[List[Dict]]:
+    """把块流按 batch_size 分批，供 add_texts 逐批写入"""
+    chunks = iter(chunks)
+    while True:
+        batch = list(islice(chunks, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+# 扩展名 -> 解析时使用的 "streaming" 子节；.doc / .rtf 转换为文本后按 txt 设置切分，
+# 电子表格转换为 CSV 后按 CSV 设置解析
+STREAMING_CONFIG_FORMATS = {
+    '.txt': "txt",
+    '.md': "md",
+    '.csv': "csv",
+    '.jsonl': "jsonl",
+    '.doc': "txt",
+    '.rtf': "txt",
+    '.xls': "csv",
+    '.xlsx': "csv"
+}
+
+
+def streaming_config_hash(file_format: str) -> str:
+    """按格式合并后的 streaming 设置的短哈希，content_fields、delimiter 等变化时解析缓存随之失效"""
+    config = load_streaming_settings(file_format)
+    # threshold_mb 只决定是否走缓存，各格式的子节已合并到顶层
+    relevant = {key: value for key, value in config.items()
+                if key != "threshold_mb" and key not in STREAMING_CONFIG_FORMATS.values()}
+    encoded = json.dumps(relevant, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()[:12]
+
 
 class DocumentProcessor:
-    def __init__(self):
+    # 解析器版本，处理函数的输出变化时递增，使旧的解析缓存失效
+    PARSER_VERSIONS = {
+        '.txt': 2,
+        '.md': 1,
+        '.csv': 1,
+        '.jsonl': 1,
+        '.pdf': 1,
+        '.doc': 2,
+        '.docx': 1,
+        '.rtf': 1,
+        '.xls': 1,
+        '.xlsx': 1,
+        '.ppt': 1,
+        '.pptx': 1
+    }
+
+    def __init__(self, cache=_DEFAULT_CACHE, pdf_backend: Optional[str] = None, pdf_workers: Optional[int] = None):
+        """
+        Args:
+            cache: 解析缓存，默认按 settings.json 创建，传入 None 关闭缓存
+            pdf_backend: PDF 提取后端，None 使用 settings.json 中的设置
+            pdf_workers: 单个大 PDF 的并行提取进程数，None 使用设置；已在进程池中解析时应传 1
+        """
+        self.cache = ParseCache.from_settings() if cache is _DEFAULT_CACHE else cache
+        self.pdf_settings = load_pdf_settings()
+        self.pdf_backend = resolve_backend(pdf_backend or self.pdf_settings["backend"])
+        self.pdf_workers = pdf_workers
+        self.streaming_threshold = float(load_streaming_settings()["threshold_mb"]) * 1024 * 1024
+        self.office = get_converter()
         self.supported_extensions = {
             '.txt': self._process_txt,
+            '.md': self._process_md,
+            '.csv': self._process_csv,
+            '.jsonl': self._process_jsonl,
             '.pdf': self._process_pdf,
             '.doc': self._process_doc,
-            '.docx': self._process_docx
+            '.docx': self._process_docx,
+            '.rtf': self._process_doc,
+            '.xls': self._process_spreadsheet,
+            '.xlsx': self._process_spreadsheet,
+            '.ppt': self._process_presentation,
+            '.pptx': self._process_presentation
+        }
+        self.streaming_parsers = {
+            '.txt': self._iter_txt,
+            '.md': self._iter_md,
+            '.csv': self._iter_csv,
+            '.jsonl': self._iter_jsonl
         }
 
     def process_document(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
@@ -25,95 +134,172 @@ class DocumentProcessor:
                 raise ValueError(f"Unsupported file type: {path.suffix}")
 
             # Call corresponding processing function
+            file_type = path.suffix[1:].lower()
             processor = self.supported_extensions[path.suffix.lower()]
-            chunks = processor(file_path, progress_callback)
+            parser_version = self.parser_version(path.suffix.lower())
+            chunks = self.cache.get(file_path, parser_version) if self.cache is not None else None
+            if chunks is not None:
+                if progress_callback:
+                    progress_callback(100)
+            else:
+                start = time.perf_counter()
+                try:
+                    chunks = processor(file_path, progress_callback)
+                except Exception:
+                    metrics.DOCUMENTS_TOTAL.inc(file_type=file_type, status="error")
+                    raise
+                metrics.PARSE_SECONDS.observe(time.perf_counter() - start, file_type=file_type)
+                # 在补充元数据之前缓存，同一文件导入到其他知识库时也能复用
+                if self.cache is not None:
+                    self.cache.put(file_path, parser_version, chunks)
+            metrics.DOCUMENT_CHUNKS.observe(len(chunks), file_type=file_type)
+            metrics.DOCUMENTS_TOTAL.inc(file_type=file_type, status="ok")
 
             # Add metadata
             for chunk in chunks:
-                chunk.update({
-                    "source": file_path,
-                    "filename": path.name,
-                    "file_type": path.suffix[1:].upper(),
-                    "created_at": datetime.now().isoformat()
-                })
+                self._add_metadata(chunk, file_path)
 
             return chunks
 
         except Exception as e:
             raise Exception(f"Failed to process document: {str(e)}")
 
-    def _process_txt(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
-        """Process TXT file"""
-        chunks = []
+    def prefetch(self, files: List[str]) -> List:
+        """在后台并行转换需要转换的 Office 文件，返回可取消的 Future 列表"""
+        return self.office.prefetch(files)
+
+    def is_streaming(self, file_path: str) -> bool:
+        """行式文本文件达到 streaming.threshold_mb 时边读边导入"""
+        extension = Path(file_path).suffix.lower()
+        if extension not in self.streaming_parsers:
+            return False
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
+            return os.path.getsize(file_path) >= self.streaming_threshold
+        except OSError:
+            return False
 
-            # Simple paragraph processing
-            paragraphs = content.split('\n\n')
-            total = len(paragraphs)
+    def iter_chunks(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        """Yield the chunks of a document
 
-            for i, para in enumerate(paragraphs, 1):
-                if para.strip():
-                    chunks.append({
-                        "content": para.strip(),
-                        "chunk_type": "paragraph",
-                        "chunk_index": i
-                    })
+        Large line-oriented files are parsed lazily so memory stays flat regardless of
+        file size; they bypass the parse cache. Everything else goes through process_document.
+        """
+        if not self.is_streaming(file_path):
+            yield from self.process_document(file_path, progress_callback)
+            return
 
-                if progress_callback:
-                    progress_callback(int(i * 100 / total))
+        path = Path(file_path)
+        file_type = path.suffix[1:].lower()
+        count = 0
+        try:
+            for chunk in self.streaming_parsers[path.suffix.lower()](file_path, progress_callback):
+                count += 1
+                yield self._add_metadata(chunk, file_path)
+        except Exception as e:
+            metrics.DOCUMENTS_TOTAL.inc(file_type=file_type, status="error")
+            raise Exception(f"Failed to process document: {str(e)}")
+        metrics.DOCUMENT_CHUNKS.observe(count, file_type=file_type)
+        metrics.DOCUMENTS_TOTAL.inc(file_type=file_type, status="ok")
+        if progress_callback:
+            progress_callback(100)
+
+    def _add_metadata(self, chunk: Dict, file_path: str) -> Dict:
+        path = Path(file_path)
+        chunk.update({
+            "source": file_path,
+            "filename": path.name,
+            "file_type": path.suffix[1:].upper(),
+            "created_at": datetime.now().isoformat()
+        })
+        return chunk
+
+    def parser_version(self, extension: str) -> str:
+        """解析缓存键中使用的解析器版本，PDF 还区分提取后端，文本类格式还区分 "streaming" 设置"""
+        version = f"{extension[1:]}-v{self.PARSER_VERSIONS.get(extension, 1)}"
+        if extension in ('.pdf', '.ppt', '.pptx'):
+            version = f"{version}-{self.pdf_backend}"
+        if extension in STREAMING_CONFIG_FORMATS:
+            version = f"{version}-{streaming_config_hash(STREAMING_CONFIG_FORMATS[extension])}"
+        return version
 
+    def _process_txt(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process TXT file
+
+        The encoding is detected from a few samples, then the file is decoded and split
+        into paragraphs in a single streaming pass.
+        """
+        try:
+            chunks = list(self._iter_txt(file_path, progress_callback))
+            if progress_callback:
+                progress_callback(100)
             return chunks
 
-        except UnicodeDecodeError:
-            # Try other encodings
-            encodings = ['gbk', 'gb2312', 'utf-16', 'ascii']
-            for encoding in encodings:
-                try:
-                    with open(file_path, 'r', encoding=encoding) as f:
-                        content = f.read()
-                    
-                    paragraphs = content.split('\n\n')
-                    total = len(paragraphs)
+        except Exception as e:
+            raise Exception(f"Unable to decode file: {file_path}: {str(e)}")
+
+    def _process_md(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process Markdown file, split into sections under their heading path"""
+        try:
+            return list(self._iter_md(file_path, progress_callback))
+        except Exception as e:
+            raise Exception(f"Failed to process Markdown file: {str(e)}")
+
+    def _process_csv(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process CSV file, one chunk per row"""
+        try:
+            return list(self._iter_csv(file_path, progress_callback))
+        except Exception as e:
+            raise Exception(f"Failed to process CSV file: {str(e)}")
+
+    def _process_jsonl(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process JSONL file, one chunk per record"""
+        try:
+            return list(self._iter_jsonl(file_path, progress_callback))
+        except Exception as e:
+            raise Exception(f"Failed to process JSONL file: {str(e)}")
+
+    # ---- 流式解析，每个生成器只读一遍文件 ----
 
-                    for i, para in enumerate(paragraphs, 1):
-                        if para.strip():
-                            chunks.append({
-                                "content": para.strip(),
-                                "chunk_type": "paragraph",
-                                "chunk_index": i
-                            })
+    def _iter_txt(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        config = load_streaming_settings("txt")
+        pieces = iter_text(file_path, progress_callback=progress_callback)
+        for i, para in enumerate(iter_paragraphs(pieces, max_chars=int(config["max_chunk_chars"])), 1):
+            if para.strip():
+                yield {
+                    "content": para.strip(),
+                    "chunk_type": "paragraph",
+                    "chunk_index": i
+                }
 
-                        if progress_callback:
-                            progress_callback(int(i * 100 / total))
+    def _iter_md(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        config = load_streaming_settings("md")
+        lines = iter_lines(iter_text(file_path, progress_callback=progress_callback), int(config["max_line_chars"]))
+        return iter_markdown_units(lines, int(config["max_chunk_chars"]))
 
-                    return chunks
-                except UnicodeDecodeError:
-                    continue
+    def _iter_csv(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        config = load_streaming_settings("csv")
+        pieces = iter_text(file_path, progress_callback=progress_callback)
+        return iter_csv_units(pieces, RecordMapper.from_config(config), config["delimiter"], int(config["max_line_chars"]))
 
-            raise Exception(f"Unable to decode file: {file_path}")
+    def _iter_jsonl(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[Dict]:
+        config = load_streaming_settings("jsonl")
+        lines = iter_lines(iter_text(file_path, progress_callback=progress_callback), int(config["max_line_chars"]))
+        return iter_jsonl_units(lines, RecordMapper.from_config(config))
 
     def _process_pdf(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
         """Process PDF file"""
         chunks = []
         try:
-            with open(file_path, 'rb') as f:
-                pdf = PyPDF2.PdfReader(f)
-                total_pages = len(pdf.pages)
-
-                for i, page in enumerate(pdf.pages, 1):
-                    text = page.extract_text()
-                    if text.strip():
-                        chunks.append({
-                            "content": text.strip(),
-                            "chunk_type": "page",
-                            "chunk_index": i,
-                            "page_number": i
-                        })
-
-                    if progress_callback:
-                        progress_callback(int(i * 100 / total_pages))
+            pages = extract_pdf_pages(file_path, self.pdf_backend, self.pdf_workers, progress_callback,
+                                      settings={"pdf": self.pdf_settings})
+            for i, text in enumerate(pages, 1):
+                if text.strip():
+                    chunks.append({
+                        "content": text.strip(),
+                        "chunk_type": "page",
+                        "chunk_index": i,
+                        "page_number": i
+                    })
 
             return chunks
 
@@ -145,6 +331,52 @@ class DocumentProcessor:
             raise Exception(f"Failed to process DOCX file: {str(e)}")
 
     def _process_doc(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
-        """Process DOC file"""
-        # Currently not supported directly, recommend converting to DOCX
-        raise NotImplementedError("Currently not supported directly processing DOC file, please convert to DOCX format") 
\ No newline at end of file
+        """Process DOC / RTF file, converted to plain text first"""
+        try:
+            chunks = []
+            for output in self.office.convert(file_path):
+                chunks.extend(self._iter_txt(output, progress_callback))
+            return chunks
+        except Exception as e:
+            raise Exception(f"Failed to process {Path(file_path).suffix[1:].upper()} file: {str(e)}")
+
+    def _process_spreadsheet(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process XLS / XLSX file, each sheet converted to CSV, one chunk per row"""
+        try:
+            config = load_streaming_settings("csv")
+            mapper = RecordMapper.from_config(config)
+            outputs = self.office.convert(file_path)
+            stem = Path(file_path).stem
+            chunks = []
+            for i, output in enumerate(outputs, 1):
+                # 导出所有工作表时输出文件名为 "<原文件名>-<工作表名>.csv"
+                name = Path(output).stem
+                sheet = name[len(stem) + 1:] if name.startswith(f"{stem}-") else None
+                for unit in iter_csv_units(iter_text(output), mapper, ",", int(config["max_line_chars"])):
+                    unit["chunk_index"] = len(chunks) + 1
+                    if sheet:
+                        unit["sheet"] = sheet
+                    chunks.append(unit)
+                if progress_callback:
+                    progress_callback(int(i * 100 / len(outputs)))
+            return chunks
+        except Exception as e:
+            raise Exception(f"Failed to process spreadsheet: {str(e)}")
+
+    def _process_presentation(self, file_path: str, progress_callback: Optional[Callable[[int], None]] = None) -> List[Dict]:
+        """Process PPT / PPTX file, converted to PDF, one chunk per slide"""
+        try:
+            pdf_path = self.office.convert(file_path)[0]
+            pages = extract_pdf_pages(pdf_path, self.pdf_backend, self.pdf_workers, progress_callback,
+                                      settings={"pdf": self.pdf_settings})
+            return [
+                {
+                    "content": text.strip(),
+                    "chunk_type": "slide",
+                    "chunk_index": i,
+                    "slide_number": i
+                }
+                for i, text in enumerate(pages, 1) if text.strip()
+            ]
+        except Exception as e:
+            raise Exception(f"Failed to process presentation: {str(e)}") 
\ No newline at end of file
@@ -1,53 +1,255 @@
+import atexit
+import copy
+import json
 import logging
+import multiprocessing
 import os
+import queue
+import threading
+import time
 from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 from pathlib import Path
+from typing import Dict, Optional
+
+ROOT_LOGGER_NAME = 'VectorSearch'
+
+# settings.json 中 "logging" 节的默认值
+DEFAULT_LOGGING_SETTINGS = {
+    "level": "INFO",
+    # 各子系统的级别，键为 get_logger(name) 的 name，例如 {"vector_store": "WARNING"}
+    "levels": {},
+    "console": True,
+    "console_level": "INFO",
+    "json": True,
+    "max_bytes": 10 * 1024 * 1024,
+    "backup_count": 5,
+    # 热点路径限流：同一调用位置在 interval 秒内最多输出 per_site 条，不高于 max_level 的记录才限流
+    "rate_limit": {"per_site": 20, "interval": 10.0, "max_level": "INFO"}
+}
+
+
+class JsonFormatter(logging.Formatter):
+    """每条记录输出为一行 JSON"""
+
+    def format(self, record):
+        entry = {
+            "time": datetime.fromtimestamp(record.created).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "module": record.module,
+            "line": record.lineno,
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            # 经过队列的记录只带有已格式化的 exc_text，见 RecordQueueHandler
+            entry["exception"] = record.exc_text
+        # 通过 extra={"fields": {...}} 传入的结构化字段
+        fields = getattr(record, "fields", None)
+        if isinstance(fields, dict):
+            entry.update(fields)
+        suppressed = getattr(record, "suppressed", 0)
+        if suppressed:
+            entry["suppressed"] = suppressed
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class RecordQueueHandler(QueueHandler):
+    """QueueHandler that keeps the traceback as exc_text
+
+    The stock prepare() merges the traceback into msg and clears exc_info and
+    exc_text, so the listener's formatters can no longer tell message from
+    exception. Here the traceback is formatted on the calling thread, while
+    exc_info is still valid, and stored in exc_text.
+    """
+
+    _exception_formatter = logging.Formatter()
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self._exception_formatter.formatException(record.exc_info)
+        record.message = record.getMessage()
+        record.msg = record.message
+        record.args = None
+        # traceback 对象不能跨线程安全持有，也无法 pickle
+        record.exc_info = None
+        return record
+
+
+class RateLimitFilter(logging.Filter):
+    """Throttles repeated records from the same call site
+
+    At most per_site records from one (logger, file, line) are let through per interval.
+    Records above max_level are never throttled. The next record let through from a
+    throttled site carries the number of records dropped in between as `suppressed`.
+    """
+
+    def __init__(self, per_site: int = 20, interval: float = 10.0, max_level: int = logging.INFO):
+        super().__init__()
+        self.per_site = per_site
+        self.interval = interval
+        self.max_level = max_level
+        self._sites: Dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record):
+        if record.levelno > self.max_level or self.per_site <= 0:
+            return True
+        key = (record.name, record.pathname, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            # [窗口开始时间, 窗口内已输出条数, 被丢弃条数]
+            site = self._sites.get(key)
+            if site is None or now - site[0] >= self.interval:
+                suppressed = site[2] if site else 0
+                self._sites[key] = [now, 1, 0]
+                record.suppressed = suppressed
+                return True
+            if site[1] < self.per_site:
+                site[1] += 1
+                record.suppressed = 0
+                return True
+            site[2] += 1
+            return False
+
 
 class Logger:
     _instance = None
-    
+    _lock = threading.Lock()
+
     def __new__(cls):
         if cls._instance is None:
-            cls._instance = super(Logger, cls).__new__(cls)
-            cls._instance._initialize_logger()
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super(Logger, cls).__new__(cls)
+                    instance._initialize_logger()
+                    cls._instance = instance
         return cls._instance
-    
+
     def _initialize_logger(self):
-        """初始化日志配置"""
-        # 创建日志目录
-        log_dir = Path("logs")
-        log_dir.mkdir(exist_ok=True)
-        
-        # 设置日志文件名
-        log_file = log_dir / f"app_{datetime.now().strftime('%Y%m%d')}.log"
-        
-        # 配置日志格式
-        formatter = logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-        )
-        
-        # 文件处理器
-        file_handler = logging.FileHandler(log_file, encoding='utf-8')
-        file_handler.setFormatter(formatter)
-        
-        # 控制台处理器
-        console_handler = logging.StreamHandler()
-        console_handler.setFormatter(formatter)
-        
+        """初始化日志配置
+
+        业务线程只把记录放入队列，格式化与磁盘 I/O 在 QueueListener 的后台线程中完成。
+        """
+        config = self._load_config()
+        text_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+        if _is_child_process():
+            # 子进程（PDF / Office 进程池、CLI 并行导入）不打开 app.log：多个进程各自轮转
+            # 同一个文件会互相覆盖，Windows 上重命名被占用的文件还会失败。改为写到标准错误
+            child_handler = logging.StreamHandler()
+            child_handler.setFormatter(logging.Formatter(
+                '%(asctime)s - %(name)s[%(process)d] - %(levelname)s - %(message)s'))
+            handlers = [child_handler]
+        else:
+            # 创建日志目录
+            log_dir = Path("logs")
+            log_dir.mkdir(exist_ok=True)
+
+            # 按大小轮转的日志文件
+            file_handler = RotatingFileHandler(
+                log_dir / "app.log",
+                maxBytes=int(config["max_bytes"]),
+                backupCount=int(config["backup_count"]),
+                encoding='utf-8'
+            )
+            file_handler.setFormatter(JsonFormatter() if config["json"] else text_formatter)
+            handlers = [file_handler]
+
+            # 控制台处理器
+            if config["console"]:
+                console_handler = logging.StreamHandler()
+                console_handler.setFormatter(text_formatter)
+                console_handler.setLevel(_level(config["console_level"]))
+                handlers.append(console_handler)
+
+        self.queue = queue.SimpleQueue()
+        self.listener = QueueListener(self.queue, *handlers, respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.shutdown)
+
+        queue_handler = RecordQueueHandler(self.queue)
+        rate_limit = {**DEFAULT_LOGGING_SETTINGS["rate_limit"], **config.get("rate_limit", {})}
+        queue_handler.addFilter(RateLimitFilter(
+            per_site=int(rate_limit["per_site"]),
+            interval=float(rate_limit["interval"]),
+            max_level=_level(rate_limit["max_level"])
+        ))
+
         # 获取根日志记录器
-        self.logger = logging.getLogger('VectorSearch')
-        self.logger.setLevel(logging.DEBUG)
-        
-        # 添加处理器
-        self.logger.addHandler(file_handler)
-        self.logger.addHandler(console_handler)
-    
+        self.logger = logging.getLogger(ROOT_LOGGER_NAME)
+        self.logger.setLevel(_level(config["level"]))
+        self.logger.propagate = False
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(queue_handler)
+
+        # 子系统级别
+        for name, level in config["levels"].items():
+            logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}").setLevel(_level(level))
+
+    @staticmethod
+    def _load_config() -> Dict:
+        try:
+            from src.core.settings import read_settings
+            settings = (read_settings() or {}).get("logging", {})
+        except Exception:
+            settings = {}
+        return {**DEFAULT_LOGGING_SETTINGS, **settings}
+
+    @classmethod
+    def _after_fork_in_child(cls):
+        """fork 出的子进程继承了父进程的队列与文件处理器，但没有 QueueListener 线程，重新初始化"""
+        global _forked
+        _forked = True
+        if cls._instance is not None:
+            cls._instance.listener = None
+            cls._instance._initialize_logger()
+
+    def shutdown(self):
+        """停止后台线程，写出队列中剩余的记录"""
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+
     @classmethod
-    def get_logger(cls):
-        """获取日志记录器实例"""
+    def get_logger(cls, name: Optional[str] = None):
+        """获取日志记录器实例
+        Args:
+            name: 子系统名称，例如 "vector_store"，返回 VectorSearch.<name> 子记录器
+        """
         if cls._instance is None:
             cls()
+        if name:
+            return cls._instance.logger.getChild(name)
         return cls._instance.logger
 
+    @classmethod
+    def set_level(cls, level: str, name: Optional[str] = None):
+        """运行时调整整体或某个子系统的日志级别"""
+        cls.get_logger(name).setLevel(_level(level))
+
+
+# 当前进程是否由 fork 创建；fork 时 multiprocessing 尚未设置子进程名称
+_forked = False
+
+
+def _is_child_process() -> bool:
+    return _forked or multiprocessing.current_process().name != "MainProcess"
+
+
+def _level(value) -> int:
+    if isinstance(value, int):
+        return value
+    return logging.getLevelName(str(value).upper())
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=Logger._after_fork_in_child)
+
 # 创建全局日志记录器
-logger = Logger.get_logger() 
\ No newline at end of file
+logger = Logger.get_logger()
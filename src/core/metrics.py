@@ -0,0 +1,387 @@
+"""
+进程内指标：计数器与直方图，可在诊断面板中查看，或以 Prometheus 文本格式导出
+
+用法:
+    from src.core import metrics
+    metrics.SEARCH_SECONDS.observe(0.012, kind="search")
+    with metrics.UPSERT_SECONDS.time():
+        ...
+"""
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from src.core.logger import Logger
+
+# 延迟直方图的默认分桶（秒）
+DEFAULT_LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# 数量直方图的默认分桶
+DEFAULT_COUNT_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+
+# settings.json 中 "metrics" 节的默认值
+DEFAULT_METRICS_SETTINGS = {
+    "enabled": False,
+    "host": "127.0.0.1",
+    "port": 9464
+}
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape_label(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames: Sequence[str], values: LabelValues, extra: str = "") -> str:
+    parts = [f'{name}="{_escape_label(value)}"' for name, value in zip(labelnames, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    type_name = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 需要标签 {self.labelnames}，实际为 {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def label_dict(self, key: LabelValues) -> Dict[str, str]:
+        return dict(zip(self.labelnames, key))
+
+
+class Counter(_Metric):
+    """单调递增的计数器"""
+    type_name = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, help_text, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[Tuple[LabelValues, float]]:
+        with self._lock:
+            return sorted(self._values.items())
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def prometheus_lines(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in self.samples()
+        ]
+
+
+class Histogram(_Metric):
+    """累积分桶直方图，可按分桶近似估算分位数"""
+    type_name = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (float("inf"),)
+        # 每组标签: [各分桶计数（非累积）, 总和, 次数]
+        self._values: Dict[LabelValues, list] = {}
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            data = self._values.get(key)
+            if data is None:
+                data = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            data[0][index] += 1
+            data[1] += value
+            data[2] += 1
+
+    @contextmanager
+    def time(self, **labels):
+        """以上下文管理器计时，异常时同样记录"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def samples(self) -> List[Tuple[LabelValues, List[int], float, int]]:
+        with self._lock:
+            return sorted((key, list(data[0]), data[1], data[2]) for key, data in self._values.items())
+
+    def reset(self):
+        with self._lock:
+            self._values.clear()
+
+    def quantile(self, q: float, counts: List[int]) -> float:
+        """在分桶内线性插值估算分位数，落在 +Inf 桶时返回最大有限边界"""
+        total = sum(counts)
+        if not total:
+            return 0.0
+        rank = q * total
+        cumulative = 0
+        for i, count in enumerate(counts):
+            if cumulative + count >= rank and count:
+                upper = self.buckets[i]
+                lower = self.buckets[i - 1] if i > 0 else 0.0
+                if upper == float("inf"):
+                    return lower
+                return lower + (upper - lower) * (rank - cumulative) / count
+            cumulative += count
+        return self.buckets[-2]
+
+    def summary(self) -> List[Dict]:
+        """每组标签的次数、均值与 p50/p95/p99 估算"""
+        rows = []
+        for key, counts, total, count in self.samples():
+            rows.append({
+                "labels": self.label_dict(key),
+                "count": count,
+                "sum": total,
+                "mean": total / count if count else 0.0,
+                "p50": self.quantile(0.50, counts),
+                "p95": self.quantile(0.95, counts),
+                "p99": self.quantile(0.99, counts)
+            })
+        return rows
+
+    def prometheus_lines(self) -> List[str]:
+        lines = []
+        for key, counts, total, count in self.samples():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                le = 'le="%s"' % _format_value(bound)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """全局指标注册表（单例）"""
+    _instance = None
+    _instance_lock = threading.Lock()
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get_registry(cls) -> "MetricsRegistry":
+        """获取全局注册表实例"""
+        if cls._instance is None:
+            with cls._instance_lock:
+                if cls._instance is None:
+                    cls._instance = cls()
+        return cls._instance
+
+    def _register(self, metric_class, name: str, *args, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = metric_class(name, *args, **kwargs)
+            elif not isinstance(metric, metric_class):
+                raise ValueError(f"指标 {name} 已注册为 {metric.type_name}")
+            return metric
+
+    def counter(self, name: str, help_text: str, labelnames: Sequence[str] = ()) -> Counter:
+        """获取或注册计数器"""
+        return self._register(Counter, name, help_text, labelnames)
+
+    def histogram(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_LATENCY_BUCKETS) -> Histogram:
+        """获取或注册直方图"""
+        return self._register(Histogram, name, help_text, labelnames, buckets)
+
+    def metrics(self) -> List[_Metric]:
+        with self._lock:
+            return [self._metrics[name] for name in sorted(self._metrics)]
+
+    def reset(self):
+        """清空所有已记录的数值，保留注册的指标"""
+        for metric in self.metrics():
+            metric.reset()
+
+    def to_prometheus(self) -> str:
+        """导出 Prometheus 文本格式（0.0.4）"""
+        lines = []
+        for metric in self.metrics():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.prometheus_lines())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsServer:
+    """在后台线程中提供 /metrics 端点，供 Prometheus 抓取"""
+
+    def __init__(self, registry: Optional[MetricsRegistry] = None, host: str = "127.0.0.1", port: int = 9464):
+        self.registry = registry or MetricsRegistry.get_registry()
+        self.host = host
+        self.port = port
+        self._server = None
+        self._thread = None
+
+    @property
+    def running(self) -> bool:
+        return self._server is not None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def start(self):
+        if self._server is not None:
+            return
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = registry.to_prometheus().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer((self.host, self.port), Handler)
+        # 端口为 0 时由系统分配
+        self.port = self._server.server_address[1]
+        self._thread = threading.Thread(target=self._server.serve_forever, name="MetricsServer", daemon=True)
+        self._thread.start()
+        Logger.get_logger("metrics").info(f"指标端点已启动: {self.url}")
+
+    def stop(self):
+        if self._server is None:
+            return
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+        self._server = None
+        self._thread = None
+
+
+_server: Optional[MetricsServer] = None
+
+
+def get_server() -> Optional[MetricsServer]:
+    """返回当前运行的指标端点，未启动时返回 None"""
+    return _server if _server is not None and _server.running else None
+
+
+def start_server(host: str = "127.0.0.1", port: int = 9464) -> MetricsServer:
+    """启动（或返回已启动的）全局指标端点"""
+    global _server
+    if _server is None or not _server.running:
+        _server = MetricsServer(host=host, port=port)
+        _server.start()
+    return _server
+
+
+def stop_server():
+    global _server
+    if _server is not None:
+        _server.stop()
+        _server = None
+
+
+def start_from_settings(settings: Optional[Dict]) -> Optional[MetricsServer]:
+    """settings.json 的 "metrics" 节启用时启动端点"""
+    config = {**DEFAULT_METRICS_SETTINGS, **(settings or {}).get("metrics", {})}
+    if not config["enabled"]:
+        return None
+    try:
+        return start_server(config["host"], int(config["port"]))
+    except OSError as e:
+        Logger.get_logger("metrics").error(f"启动指标端点失败: {str(e)}")
+        return None
+
+
+# ---- 应用指标 ----
+
+registry = MetricsRegistry.get_registry()
+
+PARSE_SECONDS = registry.histogram(
+    "vkb_parse_seconds", "Time to parse and chunk one document", ("file_type",)
+)
+DOCUMENT_CHUNKS = registry.histogram(
+    "vkb_document_chunks", "Chunks produced per document", ("file_type",), DEFAULT_COUNT_BUCKETS
+)
+DOCUMENTS_TOTAL = registry.counter(
+    "vkb_documents_total", "Documents processed", ("file_type", "status")
+)
+EMBED_SECONDS = registry.histogram(
+    "vkb_embed_seconds", "Time to embed one batch of texts", ("source",)
+)
+EMBED_TEXTS_TOTAL = registry.counter(
+    "vkb_embed_texts_total", "Texts embedded", ("source",)
+)
+UPSERT_SECONDS = registry.histogram(
+    "vkb_upsert_seconds", "Qdrant upsert latency per batch"
+)
+UPSERT_POINTS_TOTAL = registry.counter(
+    "vkb_upsert_points_total", "Points upserted into Qdrant"
+)
+SEARCH_SECONDS = registry.histogram(
+    "vkb_search_seconds", "End-to-end search latency including query encoding", ("kind",)
+)
+RERANK_SECONDS = registry.histogram(
+    "vkb_rerank_seconds", "Rerank latency per query"
+)
+MODEL_LOAD_SECONDS = registry.histogram(
+    "vkb_model_load_seconds", "Model load time", ("service", "backend")
+)
+CACHE_REQUESTS_TOTAL = registry.counter(
+    "vkb_cache_requests_total", "Cache lookups", ("cache", "result")
+)
+QDRANT_ERRORS_TOTAL = registry.counter(
+    "vkb_qdrant_errors_total", "Failed Qdrant requests", ("operation", "transient")
+)
+QDRANT_RETRIES_TOTAL = registry.counter(
+    "vkb_qdrant_retries_total", "Retried Qdrant requests", ("operation",)
+)
+SERVICE_REQUESTS_TOTAL = registry.counter(
+    "vkb_service_requests_total", "HTTP service requests", ("endpoint", "status")
+)
+SERVICE_SECONDS = registry.histogram(
+    "vkb_service_seconds", "HTTP service request latency", ("endpoint",)
+)
+SERVICE_BATCH_SIZE = registry.histogram(
+    "vkb_service_batch_size", "Queries coalesced into one embedding call", buckets=DEFAULT_COUNT_BUCKETS
+)
+EMBED_SERVER_BATCH_SIZE = registry.histogram(
+    "vkb_embed_server_batch_size", "Texts coalesced into one shared encode call", ("model",), DEFAULT_COUNT_BUCKETS
+)
+EMBED_SERVER_WAIT_SECONDS = registry.histogram(
+    "vkb_embed_server_wait_seconds", "Time an encode request waited in the shared queue", ("model",)
+)
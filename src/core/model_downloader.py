@@ -0,0 +1,303 @@
+import os
+import json
+import shutil
+import hashlib
+import threading
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+from urllib.parse import quote, unquote, urlparse
+import requests
+
+# 默认镜像，可通过 HF_ENDPOINT 环境变量或 settings.json 的 "model_download" 节覆盖
+DEFAULT_MIRROR = os.environ.get("HF_ENDPOINT", "https://huggingface.co")
+
+DEFAULT_DOWNLOAD_SETTINGS = {
+    "mirror": DEFAULT_MIRROR,
+    "revision": "main",
+    "workers": 4,
+    "segment_size_mb": 16,
+    "timeout": 30
+}
+
+# 下载时单次读写的块大小
+CHUNK_SIZE = 1024 * 1024
+
+
+class DownloadCancelled(Exception):
+    """下载被用户取消"""
+
+
+@dataclass
+class RemoteFile:
+    """模型仓库中的一个文件"""
+    path: str
+    size: int
+    sha256: Optional[str] = None  # LFS 文件的 sha256
+    git_sha1: Optional[str] = None  # 普通文件的 git blob sha1
+
+
+@dataclass
+class _Segment:
+    file: RemoteFile
+    index: int
+    start: int
+    end: int  # 包含
+
+    @property
+    def length(self) -> int:
+        return self.end - self.start + 1
+
+
+class ModelDownloader:
+    """Downloads model repositories from a mirror or a local file:// repository
+
+    HTTP mirrors must expose the Hugging Face layout: the file list comes from
+    `{mirror}/api/models/{name}/tree/{revision}?recursive=true` and files are fetched from
+    `{mirror}/{name}/resolve/{revision}/{path}`. Large files are split into byte-range
+    segments downloaded in parallel into `.part` files, so an interrupted download
+    resumes where each segment stopped. Every file is verified against the checksum
+    published by the mirror before it is moved into place.
+
+    A `file://` mirror points at a directory containing `{name}/` folders, optionally
+    with a `manifest.json` listing `{"files": [{"path", "size", "sha256"}]}`.
+    """
+
+    def __init__(self, mirror: str = DEFAULT_MIRROR, revision: str = "main", workers: int = 4,
+                 segment_size: int = 16 * 1024 * 1024, timeout: float = 30,
+                 session: Optional[requests.Session] = None):
+        self.mirror = mirror.rstrip("/")
+        self.revision = revision
+        self.workers = max(1, workers)
+        self.segment_size = segment_size
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict]) -> "ModelDownloader":
+        """根据 settings.json 的 "model_download" 节创建下载器"""
+        config = {**DEFAULT_DOWNLOAD_SETTINGS, **(settings or {}).get("model_download", {})}
+        return cls(
+            mirror=config["mirror"],
+            revision=config["revision"],
+            workers=config["workers"],
+            segment_size=int(config["segment_size_mb"] * 1024 * 1024),
+            timeout=config["timeout"]
+        )
+
+    @property
+    def is_local(self) -> bool:
+        return self.mirror.startswith("file://")
+
+    def _local_root(self) -> Path:
+        parsed = urlparse(self.mirror)
+        path = unquote(parsed.path)
+        # Windows 路径形如 file:///C:/models
+        if os.name == "nt" and path.startswith("/") and len(path) > 2 and path[2] == ":":
+            path = path[1:]
+        return Path(parsed.netloc + path if parsed.netloc else path)
+
+    def _file_url(self, model_name: str, path: str) -> str:
+        return f"{self.mirror}/{model_name}/resolve/{quote(self.revision)}/{quote(path)}"
+
+    # ---- 文件列表 ----
+
+    def list_files(self, model_name: str) -> List[RemoteFile]:
+        """List the files of a model repository with their sizes and checksums"""
+        if self.is_local:
+            return self._list_local_files(model_name)
+
+        url = f"{self.mirror}/api/models/{model_name}/tree/{quote(self.revision)}"
+        response = self.session.get(url, params={"recursive": "true"}, timeout=self.timeout)
+        response.raise_for_status()
+        files = []
+        for entry in response.json():
+            if entry.get("type") != "file":
+                continue
+            lfs = entry.get("lfs")
+            files.append(RemoteFile(
+                path=entry["path"],
+                size=lfs["size"] if lfs else entry.get("size", 0),
+                sha256=lfs.get("oid") if lfs else None,
+                git_sha1=None if lfs else entry.get("oid")
+            ))
+        return files
+
+    def _list_local_files(self, model_name: str) -> List[RemoteFile]:
+        model_dir = self._local_root() / model_name
+        if not model_dir.is_dir():
+            raise FileNotFoundError(f"本地模型仓库中不存在模型: {model_dir}")
+        manifest = model_dir / "manifest.json"
+        if manifest.exists():
+            with open(manifest, "r", encoding="utf-8") as f:
+                return [RemoteFile(**entry) for entry in json.load(f)["files"]]
+        files = []
+        for root, _, filenames in os.walk(model_dir):
+            for filename in filenames:
+                file_path = Path(root) / filename
+                files.append(RemoteFile(
+                    path=file_path.relative_to(model_dir).as_posix(),
+                    size=file_path.stat().st_size
+                ))
+        return files
+
+    # ---- 下载 ----
+
+    def download(self, model_name: str, target_dir: Path,
+                 progress_callback: Optional[Callable[[int, int], None]] = None,
+                 cancel_event: Optional[threading.Event] = None) -> List[RemoteFile]:
+        """Download every file of the model into target_dir
+        Args:
+            model_name: Repository name, e.g. sentence-transformers/all-MiniLM-L6-v2
+            target_dir: Destination directory
+            progress_callback: Called with (downloaded_bytes, total_bytes)
+            cancel_event: Set to abort the download, partial files are kept for resuming
+        Returns:
+            The downloaded files
+        """
+        target_dir = Path(target_dir)
+        target_dir.mkdir(parents=True, exist_ok=True)
+        files = self.list_files(model_name)
+        cancel_event = cancel_event or threading.Event()
+
+        total = sum(f.size for f in files)
+        pending_files = []
+        done = 0
+        for remote in files:
+            if self._is_complete(target_dir / remote.path, remote):
+                done += remote.size
+            else:
+                pending_files.append(remote)
+
+        segments = [segment for remote in pending_files for segment in self._segments(remote)]
+        # 已存在的分段数据计入进度，实现断点续传
+        done += sum(self._part_size(target_dir, segment) for segment in segments)
+        progress = {"done": done}
+
+        def report(delta: int):
+            with self._lock:
+                progress["done"] += delta
+                current = progress["done"]
+            if progress_callback:
+                progress_callback(current, total)
+
+        report(0)
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = [
+                executor.submit(self._download_segment, model_name, target_dir, segment, report, cancel_event)
+                for segment in segments
+            ]
+            try:
+                for future in futures:
+                    future.result()
+            except BaseException:
+                cancel_event.set()
+                raise
+
+        # 逐个校验全部文件：校验失败的文件删除分段，下次重新下载，而不是留下长度完整但内容错误的分段
+        failed = [remote.path for remote in pending_files if not self._assemble(target_dir, remote)]
+        if failed:
+            raise IOError(f"文件校验失败: {', '.join(failed)}")
+        return files
+
+    def _segments(self, remote: RemoteFile) -> List[_Segment]:
+        if remote.size <= self.segment_size:
+            return [_Segment(remote, 0, 0, max(remote.size - 1, 0))]
+        return [
+            _Segment(remote, index, start, min(start + self.segment_size, remote.size) - 1)
+            for index, start in enumerate(range(0, remote.size, self.segment_size))
+        ]
+
+    @staticmethod
+    def _part_path(target_dir: Path, segment: _Segment) -> Path:
+        return target_dir / f"{segment.file.path}.part{segment.index}"
+
+    def _part_size(self, target_dir: Path, segment: _Segment) -> int:
+        part = self._part_path(target_dir, segment)
+        return min(part.stat().st_size, segment.length) if part.exists() else 0
+
+    def _download_segment(self, model_name: str, target_dir: Path, segment: _Segment,
+                          report: Callable[[int], None], cancel_event: threading.Event):
+        part = self._part_path(target_dir, segment)
+        part.parent.mkdir(parents=True, exist_ok=True)
+        have = self._part_size(target_dir, segment)
+        if segment.file.size == 0 or have >= segment.length:
+            part.touch()
+            return
+
+        if self.is_local:
+            source = self._local_root() / model_name / segment.file.path
+            with open(source, "rb") as src, open(part, "ab") as dst:
+                src.seek(segment.start + have)
+                remaining = segment.length - have
+                while remaining > 0:
+                    if cancel_event.is_set():
+                        raise DownloadCancelled("下载已取消")
+                    data = src.read(min(CHUNK_SIZE, remaining))
+                    if not data:
+                        break
+                    dst.write(data)
+                    remaining -= len(data)
+                    report(len(data))
+            return
+
+        headers = {"Range": f"bytes={segment.start + have}-{segment.end}"}
+        with self.session.get(self._file_url(model_name, segment.file.path), headers=headers,
+                              stream=True, timeout=self.timeout) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                # 服务器不支持 Range：只有单分段的文件可以从头完整下载
+                if segment.length != segment.file.size:
+                    raise IOError(f"镜像不支持分段下载: {segment.file.path}")
+                if have:
+                    part.unlink(missing_ok=True)
+                    report(-have)
+            with open(part, "ab") as dst:
+                for data in response.iter_content(CHUNK_SIZE):
+                    if cancel_event.is_set():
+                        raise DownloadCancelled("下载已取消")
+                    dst.write(data)
+                    report(len(data))
+
+    def _assemble(self, target_dir: Path, remote: RemoteFile) -> bool:
+        """Concatenate segment parts, verify the checksum and move the file into place
+
+        Returns False, with the parts removed, when the checksum does not match.
+        """
+        final = target_dir / remote.path
+        tmp = target_dir / f"{remote.path}.download"
+        parts = [self._part_path(target_dir, segment) for segment in self._segments(remote)]
+        with open(tmp, "wb") as dst:
+            for part in parts:
+                with open(part, "rb") as src:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+        if tmp.stat().st_size != remote.size or not self._verify(tmp, remote):
+            tmp.unlink()
+            for part in parts:
+                part.unlink(missing_ok=True)
+            return False
+
+        os.replace(tmp, final)
+        for part in parts:
+            part.unlink(missing_ok=True)
+        return True
+
+    def _is_complete(self, path: Path, remote: RemoteFile) -> bool:
+        return path.exists() and path.stat().st_size == remote.size and self._verify(path, remote)
+
+    @staticmethod
+    def _verify(path: Path, remote: RemoteFile) -> bool:
+        """Check sha256 (LFS files) or git blob sha1 (regular files) when the mirror provides one"""
+        if remote.sha256:
+            digest = hashlib.sha256()
+        elif remote.git_sha1:
+            digest = hashlib.sha1(f"blob {remote.size}\0".encode())
+        else:
+            return True
+        with open(path, "rb") as f:
+            for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(data)
+        return digest.hexdigest() == (remote.sha256 or remote.git_sha1)
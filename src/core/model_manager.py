@@ -2,15 +2,24 @@ import os
 import json
 import shutil
 from pathlib import Path
-from typing import Dict, List, Optional
+import threading
+from typing import Callable, Dict, List, Optional
 import torch
 from sentence_transformers import SentenceTransformer
 from transformers import AutoModelForSequenceClassification, AutoTokenizer
 from datetime import datetime
+from src.core import metrics
+from src.core.logger import Logger
+from src.core.model_downloader import DownloadCancelled, ModelDownloader
+from src.core.settings import read_settings
+from src.models.embedding_server import get_shared_model, model_key
+
+logger = Logger.get_logger("models")
 
 class ModelManager:
-    def __init__(self, cache_dir: str = "models"):
+    def __init__(self, cache_dir: str = "models", downloader: Optional[ModelDownloader] = None):
         self.cache_dir = Path(cache_dir)
+        self.downloader = downloader or ModelDownloader.from_settings(read_settings())
         self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.models_info_file = self.cache_dir / "models_info.json"
         self.models_info = self._load_models_info()
@@ -28,7 +37,7 @@ class ModelManager:
             json.dump(self.models_info, f, ensure_ascii=False, indent=2)
 
     def get_available_models(self) -> List[Dict]:
-        """获取可用模型列表"""
+        """获取可用模型列表（大小取自 models_info.json 中的缓存）"""
         models = []
         for model_name, info in self.models_info.items():
             model_path = self.cache_dir / info["path"]
@@ -36,20 +45,71 @@ class ModelManager:
                 models.append({
                     "name": model_name,
                     "type": info["type"],
-                    "size": self._format_size(model_path.stat().st_size),
+                    "size": self._format_size(self.get_model_size_bytes(model_name)),
                     "download_date": info["download_date"]
                 })
         return models
 
-    def download_model(self, model_name: str, model_type: str) -> bool:
-        """下载模型"""
+    def get_model_size_bytes(self, model_name: str) -> int:
+        """返回缓存的模型大小，尚未统计过的模型在此时统计一次"""
+        info = self.models_info[model_name]
+        if "size_bytes" not in info:
+            metrics.CACHE_REQUESTS_TOTAL.inc(cache="model_size", result="miss")
+            self.refresh_model_size(model_name)
+        else:
+            metrics.CACHE_REQUESTS_TOTAL.inc(cache="model_size", result="hit")
+        return info.get("size_bytes", 0)
+
+    def refresh_model_size(self, model_name: str, save: bool = True) -> int:
+        """重新统计模型大小：逐个文件读取大小，原地改写的文件也能统计到"""
+        info = self.models_info[model_name]
+        info["size_bytes"] = self._scan_dir_size(self.cache_dir / info["path"])
+        # 旧版本按目录 mtime 复用的索引，目录 mtime 不反映文件的原地改写，不再使用
+        info.pop("dir_index", None)
+        if save:
+            self._save_models_info()
+        return info["size_bytes"]
+
+    @staticmethod
+    def _scan_dir_size(root: Path) -> int:
+        """Sum file sizes under root with os.scandir
+
+        Every file is stat'ed: a directory's mtime only changes when entries are
+        added or removed, so it cannot tell whether a file was rewritten in place.
+        DirEntry.stat() is served from the directory listing on Windows.
+        """
+        if root.is_file():
+            return root.stat().st_size
+        total = 0
+        stack = [str(root)]
+        while stack:
+            directory = stack.pop()
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.is_file(follow_symlinks=False):
+                            total += entry.stat(follow_symlinks=False).st_size
+            except OSError:
+                continue
+        return total
+
+    def download_model(self, model_name: str, model_type: str,
+                       progress_callback: Optional[Callable[[int, int], None]] = None,
+                       cancel_event: Optional[threading.Event] = None) -> bool:
+        """下载模型
+        Args:
+            progress_callback: 以 (已下载字节, 总字节) 调用
+            cancel_event: 设置后中止下载，已下载的分段保留以便续传
+        """
+        model_dir = self.cache_dir / model_type / model_name
         try:
             # 创建模型目录
-            model_dir = self.cache_dir / model_type / model_name
             model_dir.mkdir(parents=True, exist_ok=True)
             
-            # 模拟下载过程
-            # TODO: 实现实际的模型下载逻辑
+            # 分段并行下载，完成后逐个文件校验
+            self.downloader.download(model_name, model_dir, progress_callback, cancel_event)
             
             # 保存模型信息
             self.models_info[model_name] = {
@@ -57,14 +117,16 @@ class ModelManager:
                 "path": str(model_dir.relative_to(self.cache_dir)),
                 "download_date": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
             }
-            self._save_models_info()
+            # 下载完成时统计一次大小，之后使用缓存的值
+            self.refresh_model_size(model_name)
             
             return True
+        except DownloadCancelled:
+            logger.info(f"下载已取消: {model_name}")
+            return False
         except Exception as e:
-            print(f"下载模型失败: {str(e)}")
-            # 清理未完成的下载
-            if model_dir.exists():
-                shutil.rmtree(model_dir)
+            # 保留已下载的分段，下次下载时从中断处继续
+            logger.error(f"下载模型失败: {str(e)}")
             return False
 
     def delete_model(self, model_name: str) -> bool:
@@ -79,7 +141,7 @@ class ModelManager:
                 return True
             return False
         except Exception as e:
-            print(f"删除模型失败: {str(e)}")
+            logger.error(f"删除模型失败: {str(e)}")
             return False
 
     def _format_size(self, size_bytes: int) -> str:
@@ -97,15 +159,23 @@ class ModelManager:
                 return None
 
             model_info = self.models_info[model_name]
+            # 模型路径相对于缓存目录保存
+            model_path = str(self.cache_dir / model_info["path"])
+            # 同一模型在进程内只加载一份，与 EmbeddingService、ModelTester 共用
             if model_info["type"] == "Embedding Models":
-                model = SentenceTransformer(model_info["path"])
-                model.to(device)
-            else:
-                model = AutoModelForSequenceClassification.from_pretrained(model_info["path"])
+                def loader():
+                    model = SentenceTransformer(model_path)
+                    model.to(device)
+                    return model
+                return get_shared_model(model_key("torch", model_path, device), loader)
+
+            def loader():
+                model = AutoModelForSequenceClassification.from_pretrained(model_path)
                 model.to(device)
-            return model
+                return model
+            return get_shared_model(model_key("sequence_classification", model_path, device), loader)
         except Exception as e:
-            print(f"Failed to load model: {str(e)}")
+            logger.error(f"Failed to load model: {str(e)}")
             return None
 
     def get_local_models(self, model_type: Optional[str] = None) -> List[Dict]:
@@ -113,22 +183,26 @@ class ModelManager:
         models = []
         for name, info in self.models_info.items():
             if model_type is None or info["type"] == model_type:
+                # 旧版本登记的模型没有 size_bytes，首次访问时统计一次并写回 models_info.json
+                exists = (self.cache_dir / info["path"]).exists()
+                size = self._format_size(self.get_model_size_bytes(name)) if exists else ""
                 models.append({
                     "name": name,
-                    **info
+                    **{key: value for key, value in info.items() if key != "dir_index"},
+                    "size": size
                 })
         return models
 
     def _get_model_size(self, path: str) -> str:
         """Get model size"""
-        total_size = 0
         path = Path(path)
-        if path.is_dir():
-            for file in path.glob("**/*"):
-                if file.is_file():
-                    total_size += file.stat().st_size
+        # 已登记的模型直接使用缓存的大小
+        for model_name, info in self.models_info.items():
+            if self.cache_dir / info["path"] == path:
+                total_size = self.get_model_size_bytes(model_name)
+                break
         else:
-            total_size = path.stat().st_size
+            total_size = self._scan_dir_size(path)
 
         # 转换为合适的单位
         units = ["B", "KB", "MB", "GB"]
@@ -137,4 +211,4 @@ class ModelManager:
         while size >= 1024 and unit_index < len(units) - 1:
             size /= 1024
             unit_index += 1
-        return f"{size:.2f}{units[unit_index]}" 
\ No newline at end of file
+        return f"{size:.2f}{units[unit_index]}"
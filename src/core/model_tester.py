@@ -1,10 +1,104 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Sequence
+import csv
+import json
 import time
 import numpy as np
 from sentence_transformers import SentenceTransformer
 from sentence_transformers.evaluation import SentenceEvaluator
 from torch.utils.data import DataLoader
 import torch
+from src.models.embedding_server import get_shared_model, model_key
+
+def normalize_rows(embeddings) -> np.ndarray:
+    """L2 归一化每一行，零向量保持为零"""
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.clip(norms, 1e-12, None)
+
+
+def cosine_similarity_matrix(a, b=None) -> np.ndarray:
+    """Pairwise cosine similarity of the rows of a and b (a with itself if b is None) in one GEMM"""
+    a = normalize_rows(a)
+    b = a if b is None else normalize_rows(b)
+    return a @ b.T
+
+
+def paired_cosine_similarity(a, b) -> np.ndarray:
+    """Cosine similarity of row i of a with row i of b"""
+    return np.einsum("ij,ij->i", normalize_rows(a), normalize_rows(b))
+
+
+def retrieval_metrics(query_embeddings, doc_embeddings, relevant: Sequence[Sequence[int]],
+                      ks: Sequence[int] = (1, 5, 10), chunk_size: int = 1024) -> Dict[str, float]:
+    """Recall@k, MRR and nDCG@k for queries with a set of relevant documents each
+
+    Queries are scored against the whole corpus in chunks of chunk_size rows, so
+    the full similarity matrix is never held in memory. The rank of a relevant
+    document is the number of irrelevant documents scoring strictly higher than
+    it plus its position within the query's relevant set. Recall@k
+    is the fraction of a query's relevant documents in its top k, MRR uses the best
+    ranked one and nDCG@k uses binary gains against the ideal ordering.
+    Args:
+        query_embeddings: (n_queries, dim)
+        doc_embeddings: (n_docs, dim)
+        relevant: Indices into doc_embeddings of each query's relevant documents
+        ks: Cut-offs for recall and nDCG
+        chunk_size: Queries scored per GEMM
+    """
+    queries = normalize_rows(query_embeddings)
+    docs = normalize_rows(doc_embeddings)
+    relevant = [np.unique(np.asarray(docs_of_query, dtype=np.int64)) for docs_of_query in relevant]
+    # 没有相关文档的查询不参与统计
+    keep = [i for i, docs_of_query in enumerate(relevant) if len(docs_of_query)]
+    if not keep:
+        return {"mrr": 0.0, **{f"{name}@{k}": 0.0 for k in ks for name in ("recall", "ndcg")}}
+    queries = queries[keep]
+    relevant = [relevant[i] for i in keep]
+
+    # 把 (查询, 相关文档) 展开成平铺数组，每个相关文档单独计算名次
+    counts = np.array([len(docs_of_query) for docs_of_query in relevant], dtype=np.int64)
+    owner = np.repeat(np.arange(len(queries)), counts)
+    positives = np.concatenate(relevant)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    ranks = np.empty(len(positives), dtype=np.int64)
+    for start in range(0, len(queries), chunk_size):
+        stop = min(start + chunk_size, len(queries))
+        scores = queries[start:stop] @ docs.T
+        lo, hi = offsets[start], offsets[stop]
+        rows = owner[lo:hi] - start
+        positive_scores = scores[rows, positives[lo:hi]]
+        # 只数排在前面的负例，再加上该文档在本查询相关集合内的名次，相关文档并列时名次也不重复
+        scores[rows, positives[lo:hi]] = -np.inf
+        order = np.lexsort((-positive_scores, rows))
+        within = np.empty(hi - lo, dtype=np.int64)
+        within[order] = np.arange(hi - lo) - (offsets[owner[lo:hi][order]] - lo)
+        ranks[lo:hi] = (scores[rows] > positive_scores[:, None]).sum(axis=1) + within
+
+    metrics = {"mrr": float(np.mean(1.0 / (np.minimum.reduceat(ranks, offsets[:-1]) + 1)))}
+    gains = 1.0 / np.log2(ranks + 2)
+    for k in ks:
+        hits = np.add.reduceat((ranks < k).astype(np.float64), offsets[:-1])
+        metrics[f"recall@{k}"] = float(np.mean(hits / counts))
+        dcg = np.add.reduceat(np.where(ranks < k, gains, 0.0), offsets[:-1])
+        # 理想排序：相关文档占据前 min(k, 相关数) 个位置
+        ideal = np.cumsum(1.0 / np.log2(np.arange(k) + 2))[np.minimum(counts, k) - 1]
+        metrics[f"ndcg@{k}"] = float(np.mean(dcg / ideal))
+    return metrics
+
+
+def load_evaluation_data(path: str) -> List[Dict[str, Any]]:
+    """读取评估数据，支持 .jsonl / .json / .csv，每条包含 query、reference、score"""
+    if path.endswith(".csv"):
+        with open(path, "r", encoding="utf-8-sig", newline="") as f:
+            return [
+                {"query": row["query"], "reference": row["reference"], "score": float(row["score"])}
+                for row in csv.DictReader(f)
+            ]
+    with open(path, "r", encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            return [json.loads(line) for line in f if line.strip()]
+        return json.load(f)
+
 
 class ModelTester:
     def __init__(self):
@@ -21,12 +115,46 @@ class ModelTester:
             "This sentence is completely different from the above, but has similar length and is in English, with different content, and they are all test sentences used for testing models"
         ]
 
-    def test_model(self, model_name: str, device: str = "cpu") -> Dict[str, Any]:
-        """测试模型性能"""
-        try:
-            # 加载模型
+    def load_model(self, model_name: str, device: str = "cpu", backend: str = "torch",
+                   num_threads: Optional[int] = None, quantize: bool = False,
+                   max_length: Optional[int] = None):
+        """按后端加载模型，返回具有 encode 方法的对象
+        Args:
+            max_length: 最大 token 长度，None 使用模型默认值
+        """
+        if backend == "onnx":
+            def load_onnx():
+                from src.models.onnx_backend import OnnxEmbeddingBackend
+                kwargs = {"max_length": max_length} if max_length else {}
+                return OnnxEmbeddingBackend(model_name, quantize=quantize, num_threads=num_threads, **kwargs).load()
+            key = model_key("onnx", model_name, quantize=quantize, num_threads=num_threads, max_length=max_length)
+            return get_shared_model(key, load_onnx)
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+
+        def load_torch():
             model = SentenceTransformer(model_name)
             model.to(device)
+            if max_length:
+                model.max_seq_length = max_length
+            return model
+        # 与 EmbeddingService 等组件共用已加载的模型，测试不会再占一份内存
+        return get_shared_model(model_key("torch", model_name, device, max_length=max_length), load_torch)
+
+    def test_model(self, model_name: str, device: str = "cpu", backend: str = "torch",
+                   num_threads: Optional[int] = None, quantize: bool = False) -> Dict[str, Any]:
+        """测试模型性能
+        Args:
+            backend: "torch" 或 "onnx"（onnx 仅在 CPU 上运行）
+            num_threads: CPU 线程数
+            quantize: onnx 后端是否使用 int8 量化模型
+        """
+        try:
+            # 加载模型
+            start_time = time.time()
+            model = self.load_model(model_name, device, backend, num_threads, quantize)
+            load_time = time.time() - start_time
 
             # 测试编码速度
             start_time = time.time()
@@ -35,14 +163,7 @@ class ModelTester:
 
             # 测试相似度计算
             start_time = time.time()
-            similarities = np.zeros((len(self.test_sentences), len(self.test_sentences)))
-            for i in range(len(self.test_sentences)):
-                for j in range(i+1, len(self.test_sentences)):
-                    sim = np.dot(embeddings[i], embeddings[j]) / (
-                        np.linalg.norm(embeddings[i]) * np.linalg.norm(embeddings[j])
-                    )
-                    similarities[i][j] = sim
-                    similarities[j][i] = sim
+            similarities = cosine_similarity_matrix(embeddings)
             similarity_time = time.time() - start_time
 
             # 测试内存使用
@@ -55,7 +176,9 @@ class ModelTester:
 
             return {
                 "model_name": model_name,
-                "device": device,
+                "device": "cpu" if backend == "onnx" else device,
+                "backend": "onnx-int8" if backend == "onnx" and quantize else backend,
+                "load_time": load_time,
                 "encode_time": encode_time,
                 "similarity_time": similarity_time,
                 "total_time": encode_time + similarity_time,
@@ -68,39 +191,79 @@ class ModelTester:
         except Exception as e:
             raise Exception(f"模型测试失败: {str(e)}")
 
-    def evaluate_model(self, model_name: str, test_data: List[Dict[str, str]], device: str = "cpu") -> Dict[str, float]:
-        """评估模型性能"""
+    def compare_backends(self, model_name: str, num_threads: Optional[int] = None,
+                         quantize: bool = True) -> Dict[str, Any]:
+        """在 CPU 上比较 PyTorch 与 ONNX Runtime 后端的编码速度和结果一致性"""
         try:
-            model = SentenceTransformer(model_name)
-            model.to(device)
+            torch_result = self.test_model(model_name, "cpu", "torch", num_threads)
+            onnx_result = self.test_model(model_name, "cpu", "onnx", num_threads, quantize)
+
+            # 两个后端对同一批句子的嵌入余弦相似度，衡量导出/量化带来的精度损失
+            torch_embeddings = self.load_model(model_name, "cpu", "torch", num_threads).encode(self.test_sentences)
+            onnx_embeddings = self.load_model(model_name, "cpu", "onnx", num_threads, quantize).encode(self.test_sentences)
+            agreement = np.sum(torch_embeddings * onnx_embeddings, axis=1) / (
+                np.linalg.norm(torch_embeddings, axis=1) * np.linalg.norm(onnx_embeddings, axis=1)
+            )
+
+            return {
+                "model_name": model_name,
+                "torch_encode_time": torch_result["encode_time"],
+                "onnx_encode_time": onnx_result["encode_time"],
+                "onnx_backend": onnx_result["backend"],
+                "speedup": torch_result["encode_time"] / max(onnx_result["encode_time"], 1e-9),
+                "min_cosine_agreement": float(agreement.min()),
+                "mean_cosine_agreement": float(agreement.mean())
+            }
+        except Exception as e:
+            raise Exception(f"后端比较失败: {str(e)}")
+
+    def evaluate_model(self, model_name: str, test_data: List[Dict[str, Any]], device: str = "cpu",
+                       batch_size: int = 64, relevance_threshold: float = 0.5,
+                       ks: Sequence[int] = (1, 5, 10), backend: str = "torch",
+                       num_threads: Optional[int] = None, quantize: bool = False) -> Dict[str, float]:
+        """评估模型性能
+        Args:
+            test_data: 每条包含 query、reference、score（0~1 的相似度标注）
+            relevance_threshold: score 不低于该值的样本对作为检索评估的相关对
+            ks: recall@k / nDCG@k 的截断位置
+        Returns:
+            相似度回归指标（mse、mae、correlation）和检索指标（recall@k、mrr、ndcg@k）
+        """
+        try:
+            model = self.load_model(model_name, device, backend, num_threads, quantize)
 
             # 准备评估数据
-            sentences1 = [item["query"] for item in test_data]
-            sentences2 = [item["reference"] for item in test_data]
-            scores = [item["score"] for item in test_data]
+            queries = [item["query"] for item in test_data]
+            references = [item["reference"] for item in test_data]
+            scores = np.array([float(item["score"]) for item in test_data], dtype=np.float32)
 
-            # 计算相似度
-            embeddings1 = model.encode(sentences1, batch_size=32)
-            embeddings2 = model.encode(sentences2, batch_size=32)
+            # 去重后只编码一次，大数据集中重复的文本很多
+            unique_queries, query_index = np.unique(np.array(queries, dtype=object), return_inverse=True)
+            unique_refs, ref_index = np.unique(np.array(references, dtype=object), return_inverse=True)
+            query_embeddings = normalize_rows(model.encode(list(unique_queries), batch_size=batch_size))
+            ref_embeddings = normalize_rows(model.encode(list(unique_refs), batch_size=batch_size))
 
             # 计算余弦相似度
-            similarities = []
-            for i in range(len(sentences1)):
-                sim = np.dot(embeddings1[i], embeddings2[i]) / (
-                    np.linalg.norm(embeddings1[i]) * np.linalg.norm(embeddings2[i])
-                )
-                similarities.append(sim)
+            similarities = paired_cosine_similarity(query_embeddings[query_index], ref_embeddings[ref_index])
 
             # 计算评估指标
-            mse = np.mean((np.array(similarities) - np.array(scores)) ** 2)
-            mae = np.mean(np.abs(np.array(similarities) - np.array(scores)))
-            correlation = np.corrcoef(similarities, scores)[0, 1]
-
-            return {
-                "mse": mse,
-                "mae": mae,
-                "correlation": correlation
+            errors = similarities - scores
+            results = {
+                "pairs": len(test_data),
+                "mse": float(np.mean(errors ** 2)),
+                "mae": float(np.mean(np.abs(errors))),
+                "correlation": float(np.corrcoef(similarities, scores)[0, 1])
             }
 
+            # 检索指标：以全部去重后的参考文本为语料库
+            # 同一查询的所有相关参考文本组成一个相关集合，按集合计算指标
+            relevant = scores >= relevance_threshold
+            relevant_sets = [[] for _ in range(len(unique_queries))]
+            for q, r in zip(query_index[relevant], ref_index[relevant]):
+                relevant_sets[q].append(r)
+            if any(relevant_sets):
+                results.update(retrieval_metrics(query_embeddings, ref_embeddings, relevant_sets, ks))
+            return results
+
         except Exception as e:
-            raise Exception(f"模型评估失败: {str(e)}") 
\ No newline at end of file
+            raise Exception(f"模型评估失败: {str(e)}")
@@ -0,0 +1,307 @@
+"""
+旧版与其他 Office 格式的转换：调用本地无界面的 LibreOffice（soffice --convert-to）转换为
+可直接解析的格式，.doc 在没有 LibreOffice 时回退到 antiword
+
+    .doc / .rtf           -> UTF-8 文本
+    .xls / .xlsx          -> 每个工作表一个 CSV
+    .ppt / .pptx          -> PDF（每页一张幻灯片）
+
+通过 settings.json 的 "office" 节配置。转换进程数有上限，每个槽位使用独立且持续复用的
+LibreOffice 用户配置目录：多个 soffice 可以同时运行，且只有第一次启动需要初始化配置。
+转换结果按文件内容哈希缓存，同一文件再次导入或导入到其他知识库时不再转换。
+"""
+import atexit
+import os
+import queue
+import shutil
+import subprocess
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from src.core.logger import Logger
+from src.core.parse_cache import file_digest
+
+logger = Logger.get_logger("office")
+
+# settings.json 中 "office" 节的默认值
+DEFAULT_OFFICE_SETTINGS = {
+    # soffice 可执行文件，null 表示在 PATH 中查找 soffice / libreoffice
+    "soffice": None,
+    # 同时运行的转换进程数，0 表示 min(CPU 数, 4)
+    "workers": 2,
+    # 单个文件的转换超时（秒）
+    "timeout": 180,
+    # 转换结果缓存目录，默认为工作目录下的 data/office_cache
+    "cache_dir": None,
+    "max_mb": 1024,
+    # 没有 LibreOffice 时用 antiword 转换 .doc
+    "antiword": True
+}
+
+# 扩展名 -> (输出扩展名, --convert-to 参数)
+CONVERSIONS = {
+    '.doc': ("txt", "txt:Text (encoded):UTF8"),
+    '.rtf': ("txt", "txt:Text (encoded):UTF8"),
+    # 分隔符、引号、UTF-8 编码 ... 最后的 -1 表示导出所有工作表（LibreOffice 7.2+）
+    '.xls': ("csv", 'csv:Text - txt - csv (StarCalc):44,34,76,1,,0,false,true,false,false,false,-1'),
+    '.xlsx': ("csv", 'csv:Text - txt - csv (StarCalc):44,34,76,1,,0,false,true,false,false,false,-1'),
+    '.ppt': ("pdf", "pdf"),
+    '.pptx': ("pdf", "pdf")
+}
+
+# 可以用 antiword 转换的格式
+ANTIWORD_EXTENSIONS = ('.doc',)
+
+# 淘汰到上限的这个比例，避免每次转换都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+
+def load_office_settings(settings: Optional[Dict] = None) -> Dict:
+    if settings is None:
+        try:
+            from src.core.settings import read_settings
+            settings = read_settings()
+        except Exception:
+            settings = None
+    return {**DEFAULT_OFFICE_SETTINGS, **(settings or {}).get("office", {})}
+
+
+def find_soffice(configured: Optional[str] = None) -> Optional[str]:
+    if configured:
+        return configured if os.path.exists(configured) else shutil.which(configured)
+    return shutil.which("soffice") or shutil.which("libreoffice")
+
+
+class OfficeConverter:
+    """Bounded pool of headless converter processes with a content-addressed output cache"""
+
+    def __init__(self, soffice: Optional[str] = None, workers: int = 2, timeout: float = 180,
+                 cache_dir: Optional[str] = None, max_mb: float = 1024, antiword: bool = True):
+        self.soffice = find_soffice(soffice)
+        self.antiword = shutil.which("antiword") if antiword else None
+        self.workers = int(workers) or min(os.cpu_count() or 1, 4)
+        self.timeout = timeout
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), "data", "office_cache")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        # 每个槽位对应一个 LibreOffice 用户配置目录；同一配置目录同一时间只能被一个 soffice 使用
+        self._slots: "queue.Queue[int]" = queue.Queue()
+        for slot in range(self.workers):
+            self._slots.put(slot)
+        self._profile_root = os.path.join(tempfile.gettempdir(), f"vkb_soffice_{os.getpid()}")
+        self._lock = threading.Lock()
+        # 正在转换的文件（按内容哈希），同一文件的并发请求等待同一次转换
+        self._inflight: Dict[str, Future] = {}
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # 缓存条目 -> 字节数，按最近使用排序（最久未用的在前）；第一次使用时扫描一次缓存目录建立
+        self._index: Optional["OrderedDict[str, int]"] = None
+        self._total_bytes = 0
+        atexit.register(self.close)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict] = None) -> "OfficeConverter":
+        config = load_office_settings(settings)
+        return cls(config["soffice"], int(config["workers"]), float(config["timeout"]),
+                   config["cache_dir"], float(config["max_mb"]), bool(config["antiword"]))
+
+    def can_convert(self, extension: str) -> bool:
+        extension = extension.lower()
+        if extension not in CONVERSIONS:
+            return False
+        return self.soffice is not None or (self.antiword is not None and extension in ANTIWORD_EXTENSIONS)
+
+    def supported_extensions(self) -> List[str]:
+        return [ext for ext in CONVERSIONS if self.can_convert(ext)]
+
+    # ---- 转换 ----
+
+    def convert(self, file_path: str) -> List[str]:
+        """转换文件，返回按文件名排序的输出文件路径；已缓存时直接返回"""
+        extension = Path(file_path).suffix.lower()
+        if not self.can_convert(extension):
+            raise Exception(f"No converter available for {extension} files, install LibreOffice"
+                            + (" or antiword" if extension in ANTIWORD_EXTENSIONS else ""))
+
+        digest = file_digest(file_path)
+        target = os.path.join(self.cache_dir, digest[:2], f"{digest}-{CONVERSIONS[extension][0]}")
+        with self._lock:
+            if os.path.isdir(target):
+                # 更新访问时间，下次启动重建索引时按它排序
+                os.utime(target)
+                self._touch(target)
+                return self._outputs(target)
+            future = self._inflight.get(digest)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._inflight[digest] = future
+
+        if not owner:
+            return future.result()
+        try:
+            outputs = self._convert_to(file_path, extension, target)
+            future.set_result(outputs)
+            return outputs
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(digest, None)
+
+    def prefetch(self, files: Iterable[str]) -> List[Future]:
+        """在后台并行转换，导入时直接读取缓存的结果"""
+        files = [file_path for file_path in files if self.can_convert(Path(file_path).suffix)]
+        if not files:
+            return []
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="office")
+        return [self._executor.submit(self._prefetch_one, file_path) for file_path in files]
+
+    def _prefetch_one(self, file_path: str):
+        try:
+            self.convert(file_path)
+        except Exception as e:
+            # 导入该文件时会再次报错，这里只记录
+            logger.warning(f"预转换失败: {file_path}: {str(e)}")
+
+    def _convert_to(self, file_path: str, extension: str, target: str) -> List[str]:
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        work_dir = tempfile.mkdtemp(prefix="convert_", dir=os.path.dirname(target))
+        try:
+            if self.soffice is not None:
+                try:
+                    self._run_soffice(file_path, CONVERSIONS[extension][1], work_dir)
+                except Exception as e:
+                    if not (self.antiword and extension in ANTIWORD_EXTENSIONS):
+                        raise
+                    logger.warning(f"LibreOffice 转换失败，改用 antiword: {file_path}: {str(e)}")
+                    self._run_antiword(file_path, work_dir)
+            else:
+                self._run_antiword(file_path, work_dir)
+
+            if not os.listdir(work_dir):
+                raise Exception(f"Converter produced no output for {file_path}")
+            try:
+                os.replace(work_dir, target)
+            except OSError:
+                # 其他进程已写入同一条目
+                if not os.path.isdir(target):
+                    raise
+                shutil.rmtree(work_dir, ignore_errors=True)
+        except Exception:
+            shutil.rmtree(work_dir, ignore_errors=True)
+            raise
+        with self._lock:
+            self._touch(target)
+            self._evict_if_needed()
+        return self._outputs(target)
+
+    def _run_soffice(self, file_path: str, convert_to: str, out_dir: str):
+        slot = self._slots.get()
+        try:
+            profile = Path(self._profile_root, f"slot{slot}").as_uri()
+            command = [
+                self.soffice, f"-env:UserInstallation={profile}",
+                "--headless", "--norestore", "--nolockcheck",
+                "--convert-to", convert_to, "--outdir", out_dir, os.path.abspath(file_path)
+            ]
+            try:
+                result = subprocess.run(command, capture_output=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                raise Exception(f"LibreOffice conversion timed out after {self.timeout}s")
+            if result.returncode != 0 or not os.listdir(out_dir):
+                message = result.stderr.decode("utf-8", errors="replace").strip()
+                raise Exception(f"LibreOffice conversion failed ({result.returncode}): {message}")
+        finally:
+            self._slots.put(slot)
+
+    def _run_antiword(self, file_path: str, out_dir: str):
+        if self.antiword is None:
+            raise Exception("antiword is not installed")
+        slot = self._slots.get()
+        try:
+            try:
+                result = subprocess.run([self.antiword, "-m", "UTF-8.txt", "-w", "0", file_path],
+                                        capture_output=True, timeout=self.timeout)
+            except subprocess.TimeoutExpired:
+                raise Exception(f"antiword timed out after {self.timeout}s")
+            if result.returncode != 0:
+                message = result.stderr.decode("utf-8", errors="replace").strip()
+                raise Exception(f"antiword failed ({result.returncode}): {message}")
+            with open(os.path.join(out_dir, f"{Path(file_path).stem}.txt"), "wb") as f:
+                f.write(result.stdout)
+        finally:
+            self._slots.put(slot)
+
+    @staticmethod
+    def _outputs(target: str) -> List[str]:
+        return sorted(os.path.join(target, name) for name in os.listdir(target))
+
+    # ---- 缓存淘汰 ----
+
+    @staticmethod
+    def _entry_size(path: str) -> int:
+        return sum(f.stat().st_size for f in os.scandir(path) if f.is_file())
+
+    def _load_index(self):
+        """扫描缓存目录建立 LRU 索引，只在第一次使用时执行；调用方持有 _lock"""
+        entries = []
+        if os.path.isdir(self.cache_dir):
+            for sub in os.scandir(self.cache_dir):
+                if not sub.is_dir():
+                    continue
+                for entry in os.scandir(sub.path):
+                    if entry.is_dir() and not entry.name.startswith("convert_"):
+                        entries.append((entry.stat().st_mtime, entry.path, self._entry_size(entry.path)))
+        self._index = OrderedDict((path, size) for _, path, size in sorted(entries))
+        self._total_bytes = sum(self._index.values())
+
+    def _touch(self, target: str):
+        """把条目移到 LRU 末尾，新条目计入总大小；调用方持有 _lock"""
+        if self._index is None:
+            self._load_index()
+        if target in self._index:
+            self._index.move_to_end(target)
+            return
+        size = self._entry_size(target)
+        self._index[target] = size
+        self._total_bytes += size
+
+    def _evict_if_needed(self):
+        """按索引从最久未用的条目开始淘汰，不再扫描缓存目录；调用方持有 _lock"""
+        if self._total_bytes <= self.max_bytes:
+            return
+        target = self.max_bytes * EVICT_TARGET_RATIO
+        removed = 0
+        # 至少保留最近使用的条目（刚转换完、即将被读取的那个）
+        while self._total_bytes > target and len(self._index) > 1:
+            path, size = self._index.popitem(last=False)
+            shutil.rmtree(path, ignore_errors=True)
+            self._total_bytes -= size
+            removed += 1
+        logger.info(f"转换缓存已淘汰 {removed} 个条目，当前 {self._total_bytes / 1024 / 1024:.1f} MB")
+
+    def close(self):
+        """停止后台转换并删除本进程的 LibreOffice 配置目录"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+        shutil.rmtree(self._profile_root, ignore_errors=True)
+
+
+_converter: Optional[OfficeConverter] = None
+_converter_lock = threading.Lock()
+
+
+def get_converter() -> OfficeConverter:
+    """进程内共用一个转换器，使转换进程数的上限对所有导入生效"""
+    global _converter
+    with _converter_lock:
+        if _converter is None:
+            _converter = OfficeConverter.from_settings()
+        return _converter
@@ -0,0 +1,198 @@
+"""
+文档解析缓存：按文件内容哈希与解析器版本保存解析结果，重复导入同一文件时跳过解析
+
+缓存的是各格式处理函数返回的原始单元（PDF 按页、TXT/DOCX 按段落，含页码与样式），
+不含 source、filename 等每次导入时补充的元数据，因此同一文件导入到不同知识库也能命中。
+条目为压缩的 JSON：装有 zstandard 时使用 zstd，否则使用 zlib。总大小超过上限时按最近
+访问时间淘汰。写入先写临时文件再替换，多个导入进程可共用同一目录。
+"""
+import hashlib
+import json
+import os
+import threading
+import zlib
+from typing import Dict, List, Optional, Tuple
+
+from src.core import metrics
+from src.core.logger import Logger
+
+try:
+    import zstandard
+except ImportError:  # 可选依赖，缺失时使用 zlib
+    zstandard = None
+
+# settings.json 中 "parse_cache" 节的默认值
+DEFAULT_PARSE_CACHE_SETTINGS = {
+    "enabled": True,
+    # 缓存目录，默认为工作目录下的 data/parse_cache
+    "dir": None,
+    "max_mb": 512,
+    # "zstd" 或 "zlib"；zstandard 未安装时总是使用 zlib
+    "compression": "zstd",
+    "level": 3
+}
+
+# 缓存条目格式版本，条目结构变化时递增
+CACHE_FORMAT_VERSION = 1
+
+# 淘汰到上限的这个比例，避免每次写入都触发淘汰
+EVICT_TARGET_RATIO = 0.9
+
+_HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_digest(file_path: str) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(_HASH_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ParseCache:
+    """Compressed, size-bounded cache of parsed document units"""
+
+    def __init__(self, cache_dir: Optional[str] = None, max_mb: float = 512,
+                 compression: str = "zstd", level: int = 3):
+        self.cache_dir = cache_dir or os.path.join(os.getcwd(), "data", "parse_cache")
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.codec = "zstd" if compression == "zstd" and zstandard is not None else "zlib"
+        self.level = level
+        self.logger = Logger.get_logger("parse_cache")
+        self._lock = threading.Lock()
+        # 同一进程内按 (路径, 大小, mtime) 记住内容哈希，避免重复读取大文件
+        self._digests: Dict[Tuple[str, int, int], str] = {}
+        self._total_bytes: Optional[int] = None
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Dict] = None) -> Optional["ParseCache"]:
+        """按 settings.json 的 "parse_cache" 节创建缓存，未启用时返回 None"""
+        if settings is None:
+            try:
+                from src.core.settings import read_settings
+                settings = read_settings()
+            except Exception:
+                settings = None
+        config = {**DEFAULT_PARSE_CACHE_SETTINGS, **(settings or {}).get("parse_cache", {})}
+        if not config["enabled"]:
+            return None
+        try:
+            return cls(config["dir"], float(config["max_mb"]), config["compression"], int(config["level"]))
+        except Exception as e:
+            Logger.get_logger("parse_cache").error(f"初始化解析缓存失败: {str(e)}")
+            return None
+
+    # ---- 键与编码 ----
+
+    def _digest(self, file_path: str) -> str:
+        stat = os.stat(file_path)
+        memo_key = (os.path.abspath(file_path), stat.st_size, stat.st_mtime_ns)
+        digest = self._digests.get(memo_key)
+        if digest is None:
+            digest = file_digest(file_path)
+            self._digests[memo_key] = digest
+        return digest
+
+    def _entry_path(self, digest: str, parser_version: str) -> str:
+        suffix = ".json.zst" if self.codec == "zstd" else ".json.z"
+        # 按哈希前两位分子目录，避免单个目录下文件过多
+        return os.path.join(self.cache_dir, digest[:2], f"{digest}-{parser_version}{suffix}")
+
+    def _compress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdCompressor(level=self.level).compress(data)
+        return zlib.compress(data, self.level)
+
+    def _decompress(self, data: bytes) -> bytes:
+        if self.codec == "zstd":
+            return zstandard.ZstdDecompressor().decompress(data)
+        return zlib.decompress(data)
+
+    # ---- 读写 ----
+
+    def get(self, file_path: str, parser_version: str) -> Optional[List[Dict]]:
+        """返回缓存的解析结果，未命中时返回 None"""
+        try:
+            path = self._entry_path(self._digest(file_path), parser_version)
+            with open(path, "rb") as f:
+                entry = json.loads(self._decompress(f.read()))
+            if entry.get("format") != CACHE_FORMAT_VERSION:
+                raise ValueError("cache format changed")
+            # 更新访问时间，供淘汰时参考
+            os.utime(path)
+            metrics.CACHE_REQUESTS_TOTAL.inc(cache="parse", result="hit")
+            return entry["units"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            self.logger.warning(f"读取解析缓存失败: {file_path}: {str(e)}")
+        metrics.CACHE_REQUESTS_TOTAL.inc(cache="parse", result="miss")
+        return None
+
+    def put(self, file_path: str, parser_version: str, units: List[Dict]):
+        """保存解析结果，失败只记录日志，不影响导入"""
+        try:
+            digest = self._digest(file_path)
+            path = self._entry_path(digest, parser_version)
+            data = self._compress(json.dumps(
+                {"format": CACHE_FORMAT_VERSION, "parser": parser_version, "units": units},
+                ensure_ascii=False
+            ).encode("utf-8"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+            with self._lock:
+                if self._total_bytes is not None:
+                    self._total_bytes += len(data)
+            self._evict_if_needed()
+        except Exception as e:
+            self.logger.warning(f"写入解析缓存失败: {file_path}: {str(e)}")
+
+    def _entries(self) -> List[Tuple[float, int, str]]:
+        entries = []
+        for sub in os.scandir(self.cache_dir):
+            if not sub.is_dir():
+                continue
+            for entry in os.scandir(sub.path):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _evict_if_needed(self):
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = sum(size for _, size, _ in self._entries())
+            if self._total_bytes <= self.max_bytes:
+                return
+            # 其他进程也可能写入，淘汰前重新统计
+            entries = sorted(self._entries())
+            total = sum(size for _, size, _ in entries)
+            target = self.max_bytes * EVICT_TARGET_RATIO
+            removed = 0
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                    removed += 1
+                except OSError:
+                    pass
+            self._total_bytes = total
+        if removed:
+            self.logger.info(f"解析缓存已淘汰 {removed} 个条目，当前 {total / 1024 / 1024:.1f} MB")
+
+    def clear(self):
+        """删除全部缓存条目"""
+        with self._lock:
+            for _, _, path in self._entries():
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self._total_bytes = 0
@@ -0,0 +1,245 @@
+"""
+PDF 文本提取后端：PyPDF2（默认回退）、pypdfium2、pdfminer.six（版面分析模式）
+
+通过 settings.json 的 "pdf" 节选择:
+    "backend": "auto" | "pypdfium2" | "pdfminer" | "pypdf2"
+    auto 依次尝试 pypdfium2、pdfminer、PyPDF2，使用第一个已安装的后端。
+页数达到 parallel_min_pages 的大文件按页范围拆分到多个进程中并行提取。
+"""
+import atexit
+import itertools
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, List, Optional, Tuple
+
+import PyPDF2
+
+from src.core.logger import Logger
+
+try:
+    import pypdfium2
+except ImportError:  # 可选依赖
+    pypdfium2 = None
+
+try:
+    from pdfminer.high_level import extract_text as pdfminer_extract_text
+    from pdfminer.layout import LAParams
+    from pdfminer.pdfpage import PDFPage
+except ImportError:  # 可选依赖
+    pdfminer_extract_text = None
+
+logger = Logger.get_logger("pdf")
+
+# settings.json 中 "pdf" 节的默认值
+DEFAULT_PDF_SETTINGS = {
+    "backend": "auto",
+    # 并行提取的进程数，0 表示 min(CPU 数, 4)，1 表示不并行
+    "workers": 0,
+    # 页数不少于此值时才并行，小文件的进程通信开销大于收益
+    "parallel_min_pages": 64,
+    # 每个任务的页数
+    "pages_per_task": 16
+}
+
+
+class PdfBackend:
+    """PDF 后端接口：统计页数、提取 [start, end) 范围内各页的文本"""
+    name = ""
+
+    @classmethod
+    def available(cls) -> bool:
+        return True
+
+    def page_count(self, file_path: str) -> int:
+        raise NotImplementedError
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        raise NotImplementedError
+
+
+class PyPDF2Backend(PdfBackend):
+    name = "pypdf2"
+
+    def page_count(self, file_path: str) -> int:
+        with open(file_path, "rb") as f:
+            return len(PyPDF2.PdfReader(f).pages)
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        with open(file_path, "rb") as f:
+            pdf = PyPDF2.PdfReader(f)
+            return [(pdf.pages[i].extract_text() or "") for i in range(start, end)]
+
+
+class PdfiumBackend(PdfBackend):
+    """pypdfium2（PDFium 的绑定），通常比 PyPDF2 快一个数量级"""
+    name = "pypdfium2"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pypdfium2 is not None
+
+    def page_count(self, file_path: str) -> int:
+        pdf = pypdfium2.PdfDocument(file_path)
+        try:
+            return len(pdf)
+        finally:
+            pdf.close()
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        pdf = pypdfium2.PdfDocument(file_path)
+        texts = []
+        try:
+            for i in range(start, end):
+                page = pdf[i]
+                textpage = page.get_textpage()
+                try:
+                    texts.append(textpage.get_text_range().replace("\r\n", "\n"))
+                finally:
+                    textpage.close()
+                    page.close()
+        finally:
+            pdf.close()
+        return texts
+
+
+class PdfMinerBackend(PdfBackend):
+    """pdfminer.six 版面分析模式，多栏排版的阅读顺序更准确，速度较慢"""
+    name = "pdfminer"
+
+    @classmethod
+    def available(cls) -> bool:
+        return pdfminer_extract_text is not None
+
+    def page_count(self, file_path: str) -> int:
+        with open(file_path, "rb") as f:
+            return sum(1 for _ in PDFPage.get_pages(f))
+
+    def extract_pages(self, file_path: str, start: int, end: int) -> List[str]:
+        text = pdfminer_extract_text(file_path, page_numbers=list(range(start, end)), laparams=LAParams())
+        # 每页之后有一个换页符
+        pages = text.split("\f")
+        return (pages + [""] * (end - start))[:end - start]
+
+
+BACKENDS: Dict[str, type] = {
+    backend.name: backend for backend in (PdfiumBackend, PdfMinerBackend, PyPDF2Backend)
+}
+
+# auto 模式的优先顺序
+AUTO_ORDER = ("pypdfium2", "pdfminer", "pypdf2")
+
+
+def available_backends() -> List[str]:
+    return [name for name in AUTO_ORDER if BACKENDS[name].available()]
+
+
+def resolve_backend(name: Optional[str] = None) -> str:
+    """解析后端名，指定的后端未安装时回退到 PyPDF2"""
+    name = (name or "auto").lower()
+    if name == "auto":
+        return available_backends()[0]
+    if name not in BACKENDS:
+        raise ValueError(f"未知的 PDF 后端: {name}")
+    if not BACKENDS[name].available():
+        logger.warning(f"PDF 后端 {name} 未安装，改用 PyPDF2")
+        return PyPDF2Backend.name
+    return name
+
+
+def load_pdf_settings(settings: Optional[Dict] = None) -> Dict:
+    if settings is None:
+        try:
+            from src.core.settings import read_settings
+            settings = read_settings()
+        except Exception:
+            settings = None
+    return {**DEFAULT_PDF_SETTINGS, **(settings or {}).get("pdf", {})}
+
+
+# ---- 并行提取 ----
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool(workers: int) -> ProcessPoolExecutor:
+    """复用同一个进程池，批量导入多个大 PDF 时不必反复启动进程
+
+    进程池只在第一次使用时按 workers 创建，之后不再替换：其他线程可能正在使用它。
+    每次调用的并行度由 extract_pdf_pages 控制在途任务数实现。
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=workers)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.shutdown()
+
+
+atexit.register(shutdown_pool)
+
+
+def _extract_range(backend_name: str, file_path: str, start: int, end: int) -> Tuple[int, List[str]]:
+    return start, BACKENDS[backend_name]().extract_pages(file_path, start, end)
+
+
+def default_workers() -> int:
+    return min(os.cpu_count() or 1, 4)
+
+
+def extract_pdf_pages(file_path: str, backend: Optional[str] = None, workers: Optional[int] = None,
+                      progress_callback: Optional[Callable[[int], None]] = None,
+                      settings: Optional[Dict] = None) -> List[str]:
+    """提取 PDF 每一页的文本
+    Args:
+        backend: 后端名，None 使用设置
+        workers: 并行进程数，None 使用设置，1 表示在当前进程中顺序提取
+        progress_callback: 进度回调（0-100）
+    Returns:
+        list: 按页顺序的文本
+    """
+    config = load_pdf_settings(settings)
+    backend_name = resolve_backend(backend or config["backend"])
+    extractor = BACKENDS[backend_name]()
+    total_pages = extractor.page_count(file_path)
+    if total_pages == 0:
+        return []
+
+    workers = int(config["workers"] if workers is None else workers) or default_workers()
+    pages_per_task = max(1, int(config["pages_per_task"]))
+    ranges = [(start, min(start + pages_per_task, total_pages)) for start in range(0, total_pages, pages_per_task)]
+    pages: List[Optional[str]] = [None] * total_pages
+    done_pages = 0
+
+    if workers <= 1 or total_pages < int(config["parallel_min_pages"]):
+        for start, end in ranges:
+            pages[start:end] = extractor.extract_pages(file_path, start, end)
+            done_pages += end - start
+            if progress_callback:
+                progress_callback(int(done_pages * 100 / total_pages))
+        return pages
+
+    pool = _get_pool(workers)
+    # 共用的进程池可能大于本次的 workers，在途任务数不超过 workers
+    pending_ranges = iter(ranges)
+    futures = {pool.submit(_extract_range, backend_name, file_path, start, end)
+               for start, end in itertools.islice(pending_ranges, workers)}
+    while futures:
+        done, futures = wait(futures, return_when=FIRST_COMPLETED)
+        for future in done:
+            start, texts = future.result()
+            pages[start:start + len(texts)] = texts
+            done_pages += len(texts)
+            if progress_callback:
+                progress_callback(int(done_pages * 100 / total_pages))
+            for start, end in itertools.islice(pending_ranges, 1):
+                futures.add(pool.submit(_extract_range, backend_name, file_path, start, end))
+    return pages
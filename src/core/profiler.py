@@ -0,0 +1,213 @@
+"""
+可选的性能剖析钩子：为导入与搜索的关键路径生成 cProfile 转储或采样调用栈
+
+通过 settings.json 的 "profiling" 节或环境变量 VKB_PROFILE 开启:
+    VKB_PROFILE=sample    采样模式，输出可直接交给 flamegraph.pl / speedscope 的折叠栈
+    VKB_PROFILE=cprofile  确定性模式，输出 .prof 文件与按累计时间排序的文本摘要
+    VKB_PROFILE=0         关闭（覆盖 settings.json）
+每次运行的结果写入 logs/profiles/<会话>/，会话目录中的 session.json 汇总各入口的调用次数与耗时。
+未开启时 @profiled 只多一次属性检查。
+"""
+import cProfile
+import functools
+import io
+import json
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from src.core.logger import Logger
+
+PROFILE_ENV_VAR = "VKB_PROFILE"
+
+# settings.json 中 "profiling" 节的默认值
+DEFAULT_PROFILING_SETTINGS = {
+    "enabled": False,
+    "mode": "sample",
+    # 采样间隔（秒）
+    "interval": 0.005,
+    "output_dir": os.path.join("logs", "profiles"),
+    # cProfile 文本摘要中列出的函数数
+    "top": 50
+}
+
+MODES = ("sample", "cprofile")
+
+
+class _StackSampler:
+    """在后台线程中定时采样目标线程的调用栈，累计为折叠栈计数"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="ProfilerSampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+            self.samples += 1
+
+    def write_collapsed(self, path: Path):
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class Profiler:
+    """性能剖析会话（单例），由 @profiled 装饰的入口共用"""
+    _instance = None
+    _lock = threading.Lock()
+
+    def __init__(self, config: Dict):
+        self.enabled = bool(config["enabled"]) and config["mode"] in MODES
+        self.mode = config["mode"]
+        self.interval = float(config["interval"])
+        self.top = int(config["top"])
+        self.session_dir = Path(config["output_dir"]) / f"{datetime.now().strftime('%Y%m%d_%H%M%S')}_{os.getpid()}"
+        self.logger = Logger.get_logger("profiler")
+        self._local = threading.local()
+        self._counter = 0
+        self._summary: Dict[str, Dict] = {}
+        self._summary_lock = threading.Lock()
+        if self.enabled:
+            self.logger.info(f"性能剖析已开启（{self.mode}），输出目录: {self.session_dir}")
+
+    @classmethod
+    def get_profiler(cls) -> "Profiler":
+        if cls._instance is None:
+            with cls._lock:
+                if cls._instance is None:
+                    cls._instance = cls(cls._load_config())
+        return cls._instance
+
+    @staticmethod
+    def _load_config() -> Dict:
+        try:
+            from src.core.settings import read_settings
+            settings = (read_settings() or {}).get("profiling", {})
+        except Exception:
+            settings = {}
+        config = {**DEFAULT_PROFILING_SETTINGS, **settings}
+
+        # 环境变量优先：模式名开启对应模式，0/false/off 关闭，其他真值使用设置中的模式
+        env = os.environ.get(PROFILE_ENV_VAR, "").strip().lower()
+        if env in MODES:
+            config.update(enabled=True, mode=env)
+        elif env in ("0", "false", "off", "no"):
+            config["enabled"] = False
+        elif env:
+            config["enabled"] = True
+        return config
+
+    def _next_path(self, name: str, suffix: str) -> Path:
+        with self._summary_lock:
+            self._counter += 1
+            index = self._counter
+        self.session_dir.mkdir(parents=True, exist_ok=True)
+        return self.session_dir / f"{index:04d}_{name}{suffix}"
+
+    def run(self, name: str, func: Callable, *args, **kwargs):
+        """在剖析下执行 func；同一线程中已在剖析时直接执行，避免嵌套的入口重复计入"""
+        if getattr(self._local, "active", False):
+            return func(*args, **kwargs)
+        self._local.active = True
+        start = time.perf_counter()
+        try:
+            if self.mode == "cprofile":
+                return self._run_cprofile(name, func, *args, **kwargs)
+            return self._run_sampled(name, func, *args, **kwargs)
+        finally:
+            self._local.active = False
+            self._record(name, time.perf_counter() - start)
+
+    def _run_cprofile(self, name: str, func: Callable, *args, **kwargs):
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # 另一个 profiler 已在运行（例如在外部用 cProfile 启动），退化为直接执行
+            return func(*args, **kwargs)
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            self._dump_cprofile(name, profile)
+
+    def _dump_cprofile(self, name: str, profile: cProfile.Profile):
+        try:
+            path = self._next_path(name, ".prof")
+            profile.dump_stats(str(path))
+            text = io.StringIO()
+            pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(self.top)
+            path.with_suffix(".txt").write_text(text.getvalue(), encoding="utf-8")
+        except Exception as e:
+            self.logger.error(f"写入 cProfile 结果失败: {str(e)}")
+
+    def _run_sampled(self, name: str, func: Callable, *args, **kwargs):
+        sampler = _StackSampler(threading.get_ident(), self.interval)
+        sampler.start()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            sampler.stop()
+            if sampler.samples:
+                try:
+                    sampler.write_collapsed(self._next_path(name, ".collapsed"))
+                except Exception as e:
+                    self.logger.error(f"写入采样结果失败: {str(e)}")
+
+    def _record(self, name: str, elapsed: float):
+        with self._summary_lock:
+            entry = self._summary.setdefault(name, {"calls": 0, "total_s": 0.0, "max_s": 0.0})
+            entry["calls"] += 1
+            entry["total_s"] += elapsed
+            entry["max_s"] = max(entry["max_s"], elapsed)
+            summary = {"mode": self.mode, "pid": os.getpid(), "entries": self._summary}
+            try:
+                self.session_dir.mkdir(parents=True, exist_ok=True)
+                with open(self.session_dir / "session.json", "w", encoding="utf-8") as f:
+                    json.dump(summary, f, ensure_ascii=False, indent=2)
+            except Exception as e:
+                self.logger.error(f"写入剖析汇总失败: {str(e)}")
+
+
+def profiled(name: Optional[str] = None):
+    """装饰器：剖析模式开启时对被装饰的函数生成剖析结果
+    Args:
+        name: 结果文件中的入口名，默认使用函数的 __qualname__
+    """
+    def decorator(func):
+        entry_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            profiler = Profiler.get_profiler()
+            if not profiler.enabled:
+                return func(*args, **kwargs)
+            return profiler.run(entry_name, func, *args, **kwargs)
+        return wrapper
+    return decorator
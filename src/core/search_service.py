@@ -0,0 +1,421 @@
+"""
+本地 HTTP/JSON 搜索服务（asyncio），让其他工具通过 HTTP 使用与界面相同的 VectorStore
+
+端点:
+    GET  /health          服务状态与当前在途请求数
+    GET  /collections     集合列表与文档数
+    GET  /metrics         Prometheus 文本格式指标
+    POST /search          {"query": "...", "collection": "名称", "limit": 5, "all": false}
+    POST /search/batch    {"queries": [{"query": "...", ...}, ...]}
+    POST /ingest          {"collection": "名称", "texts": ["..."], "source": "来源名", "create": false}
+                          或 {"collection": "名称", "path": "/本机/文件.pdf"}（需开启 allow_file_ingest）
+
+并发到达的查询在 max_wait_ms 内合并为一次嵌入调用；同时处理的请求超过 max_pending 时
+直接返回 503，超过 request_timeout 未完成的请求返回 504。写入由单个写入者串行执行，
+因为 add_texts 以集合当前点数作为起始 ID。
+
+启动: python -m src.cli serve --service-port 8765
+"""
+import asyncio
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from http import HTTPStatus
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from src.core import metrics
+from src.core.document_processor import DocumentProcessor
+from src.core.logger import Logger
+from src.core.vector_store import VectorStore, payload_content
+
+# settings.json 中 "service" 节的默认值
+DEFAULT_SERVICE_SETTINGS = {
+    "host": "127.0.0.1",
+    "port": 8765,
+    # 一次嵌入调用合并的最大查询数
+    "max_batch_size": 32,
+    # 第一个查询到达后最多等待多久再凑批（毫秒）
+    "max_wait_ms": 5,
+    # 同时处理的请求上限，超出时返回 503
+    "max_pending": 256,
+    "request_timeout": 10.0,
+    "ingest_timeout": 300.0,
+    "idle_timeout": 30.0,
+    "max_body_bytes": 16 * 1024 * 1024,
+    # 执行 Qdrant 请求的线程数
+    "search_threads": 8,
+    "max_limit": 100,
+    # 是否允许按服务端本机路径导入文件
+    "allow_file_ingest": False
+}
+
+# 与界面导入一致的每批块数
+INGEST_BATCH_SIZE = 64
+
+
+class HttpError(Exception):
+    """以指定状态码结束请求"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+class QueryBatcher:
+    """将并发的查询编码请求合并为批次，在单独的线程中调用 embedder.encode"""
+
+    def __init__(self, embedder, max_batch_size: int = 32, max_wait_ms: float = 5):
+        self.embedder = embedder
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.logger = Logger.get_logger("service")
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+        # 编码串行执行，批次之间不争抢 CPU/GPU
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="ServiceEncoder")
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._executor.shutdown(wait=False)
+
+    async def encode(self, texts: List[str]) -> List[List[float]]:
+        """提交若干查询并等待各自的向量"""
+        loop = asyncio.get_running_loop()
+        futures = []
+        for text in texts:
+            future = loop.create_future()
+            self._queue.put_nowait((text, future))
+            futures.append(future)
+        return list(await asyncio.gather(*futures))
+
+    async def _collect(self) -> List[Tuple[str, asyncio.Future]]:
+        batch = [await self._queue.get()]
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            # 队列中已有的请求不必等待
+            if not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+                continue
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+        # 已超时取消的请求不再编码
+        return [(text, future) for text, future in batch if not future.done()]
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            metrics.SERVICE_BATCH_SIZE.observe(len(texts))
+            try:
+                start = time.perf_counter()
+                vectors = await loop.run_in_executor(self._executor, self.embedder.encode, texts)
+                metrics.EMBED_SECONDS.observe(time.perf_counter() - start, source="service")
+                metrics.EMBED_TEXTS_TOTAL.inc(len(texts), source="service")
+                for (_, future), vector in zip(batch, vectors):
+                    if not future.done():
+                        future.set_result(list(vector))
+            except Exception as e:
+                self.logger.error(f"批量编码失败: {str(e)}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+
+
+class SearchService:
+    """基于 asyncio 的 HTTP/1.1 服务，支持 keep-alive，只依赖标准库"""
+
+    def __init__(self, store: VectorStore, config: Optional[Dict] = None):
+        self.store = store
+        self.config = {**DEFAULT_SERVICE_SETTINGS, **(config or {})}
+        self.logger = Logger.get_logger("service")
+        self.batcher = QueryBatcher(store.embedder, int(self.config["max_batch_size"]),
+                                    float(self.config["max_wait_ms"]))
+        self.processor = DocumentProcessor()
+        self.pending = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+        self._executor = ThreadPoolExecutor(max_workers=int(self.config["search_threads"]),
+                                            thread_name_prefix="ServiceWorker")
+        self._write_lock: Optional[asyncio.Lock] = None
+        self._routes = {
+            ("GET", "/health"): ("health", self.handle_health),
+            ("GET", "/collections"): ("collections", self.handle_collections),
+            ("GET", "/metrics"): ("metrics", self.handle_metrics),
+            ("POST", "/search"): ("search", self.handle_search),
+            ("POST", "/search/batch"): ("search_batch", self.handle_search_batch),
+            ("POST", "/ingest"): ("ingest", self.handle_ingest)
+        }
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.config['host']}:{self.config['port']}"
+
+    async def start(self):
+        self._write_lock = asyncio.Lock()
+        self.batcher.start()
+        self._server = await asyncio.start_server(self._handle_connection, self.config["host"],
+                                                  int(self.config["port"]))
+        # 端口为 0 时由系统分配
+        self.config["port"] = self._server.sockets[0].getsockname()[1]
+        self.logger.info(f"搜索服务已启动: {self.url}")
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.batcher.stop()
+        self._executor.shutdown(wait=False)
+
+    async def serve_forever(self):
+        await self.start()
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    def _run_blocking(self, func, *args):
+        return asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    # ---- HTTP ----
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        """读取一个请求，连接关闭时返回 None"""
+        request_line = await asyncio.wait_for(reader.readline(), float(self.config["idle_timeout"]))
+        if not request_line:
+            return None
+        try:
+            method, target, version = request_line.decode("latin-1").split()
+        except ValueError:
+            raise HttpError(400, "Malformed request line")
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if length > int(self.config["max_body_bytes"]):
+            raise HttpError(413, "Request body too large")
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?")[0], version, headers, body
+
+    async def _handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await self._read_request(reader)
+                except HttpError as e:
+                    await self._write(writer, e.status, {"error": e.message}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                method, path, version, headers, body = request
+                status, payload = await self._dispatch(method, path, body)
+                keep_alive = (version == "HTTP/1.1" and headers.get("connection", "").lower() != "close")
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except Exception as e:
+            self.logger.error(f"处理连接失败: {str(e)}")
+        finally:
+            writer.close()
+            try:
+                await writer.wait_closed()
+            except Exception:
+                pass
+
+    async def _write(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        if isinstance(payload, str):
+            body = payload.encode("utf-8")
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        else:
+            body = json.dumps(payload, ensure_ascii=False, default=str).encode("utf-8")
+            content_type = "application/json; charset=utf-8"
+        head = [
+            f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+            f"Content-Type: {content_type}",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if status == 503:
+            head.append("Retry-After: 1")
+        writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+        await writer.drain()
+
+    async def _dispatch(self, method: str, path: str, body: bytes):
+        route = self._routes.get((method, path.rstrip("/") or "/"))
+        if route is None:
+            return 404, {"error": f"No route for {method} {path}"}
+        endpoint, handler = route
+
+        # 背压：在途请求已满时立即拒绝，而不是无限排队
+        if self.pending >= int(self.config["max_pending"]):
+            metrics.SERVICE_REQUESTS_TOTAL.inc(endpoint=endpoint, status="503")
+            return 503, {"error": "Server busy, retry later"}
+
+        self.pending += 1
+        start = time.perf_counter()
+        timeout = float(self.config["ingest_timeout" if endpoint == "ingest" else "request_timeout"])
+        try:
+            payload = json.loads(body) if body else {}
+            if not isinstance(payload, dict):
+                raise HttpError(400, "Request body must be a JSON object")
+            status, result = 200, await asyncio.wait_for(handler(payload), timeout)
+        except json.JSONDecodeError as e:
+            status, result = 400, {"error": f"Invalid JSON: {str(e)}"}
+        except HttpError as e:
+            status, result = e.status, {"error": e.message}
+        except asyncio.TimeoutError:
+            # 超时只释放请求，已提交到线程池的 Qdrant 调用仍会执行完；写入在完成前一直持有写锁
+            status, result = 504, {"error": f"Request exceeded {timeout}s"}
+        except Exception as e:
+            self.logger.error(f"请求 {method} {path} 失败: {str(e)}")
+            status, result = 500, {"error": str(e)}
+        finally:
+            self.pending -= 1
+        metrics.SERVICE_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+        metrics.SERVICE_REQUESTS_TOTAL.inc(endpoint=endpoint, status=str(status))
+        return status, result
+
+    # ---- 端点 ----
+
+    async def handle_health(self, payload: Dict) -> Dict:
+        return {"status": "ok", "pending": self.pending}
+
+    async def handle_collections(self, payload: Dict) -> Dict:
+        def collect():
+            return [
+                {"name": info["name"], "documents": info["points_count"], "created_at": info["created_at"]}
+                for info in map(self.store.get_collection_info, self.store.get_collections())
+            ]
+        return {"collections": await self._run_blocking(collect)}
+
+    async def handle_metrics(self, payload: Dict) -> str:
+        return metrics.MetricsRegistry.get_registry().to_prometheus()
+
+    def _parse_query(self, item) -> Dict:
+        if isinstance(item, str):
+            item = {"query": item}
+        query = item.get("query") if isinstance(item, dict) else None
+        if not isinstance(query, str) or not query.strip():
+            raise HttpError(400, "Each query needs a non-empty \"query\" string")
+        limit = item.get("limit", 5)
+        # bool 是 int 的子类，"limit": true 不能当作 1
+        if isinstance(limit, bool) or not isinstance(limit, int) or not 0 < limit <= int(self.config["max_limit"]):
+            raise HttpError(400, f"\"limit\" must be an integer between 1 and {self.config['max_limit']}")
+        return {"query": query, "limit": limit, "collection": item.get("collection"),
+                "all": bool(item.get("all")), "id": item.get("id")}
+
+    async def _search_one(self, query: Dict, vector: List[float]) -> Dict:
+        start = time.perf_counter()
+        if query["all"]:
+            results = await self._run_blocking(
+                lambda: self.store.search_all(query["query"], limit=query["limit"], query_vector=vector)
+            )
+            hits = [
+                {"score": score, "source": source, "text": payload_content(text), "collection": collection}
+                for score, source, text, collection in results
+            ]
+        else:
+            def search():
+                collection = self.store._resolve_collection(query["collection"])
+                return self.store._search_vector(vector, collection, query["limit"])
+            try:
+                results = await self._run_blocking(search)
+            except ValueError as e:
+                raise HttpError(404, str(e))
+            hits = [{"score": score, "source": source, "text": payload_content(text)} for score, source, text in results]
+        metrics.SEARCH_SECONDS.observe(time.perf_counter() - start, kind="service")
+        result = {"query": query["query"], "hits": hits}
+        if query["id"] is not None:
+            result["id"] = query["id"]
+        return result
+
+    async def handle_search(self, payload: Dict) -> Dict:
+        query = self._parse_query(payload)
+        vector = (await self.batcher.encode([query["query"]]))[0]
+        return await self._search_one(query, vector)
+
+    async def handle_search_batch(self, payload: Dict) -> Dict:
+        items = payload.get("queries")
+        if not isinstance(items, list) or not items:
+            raise HttpError(400, "\"queries\" must be a non-empty list")
+        queries = [self._parse_query(item) for item in items]
+        vectors = await self.batcher.encode([query["query"] for query in queries])
+        results = await asyncio.gather(*(
+            self._search_one(query, vector) for query, vector in zip(queries, vectors)
+        ))
+        return {"results": list(results)}
+
+    async def handle_ingest(self, payload: Dict) -> Dict:
+        collection = payload.get("collection")
+        if not isinstance(collection, str) or not collection:
+            raise HttpError(400, "\"collection\" is required")
+
+        if "path" in payload:
+            if not self.config["allow_file_ingest"]:
+                raise HttpError(403, "File ingestion is disabled (allow_file_ingest)")
+            path = str(payload["path"])
+            try:
+                chunks = await self._run_blocking(self.processor.process_document, path)
+            except Exception as e:
+                raise HttpError(422, str(e))
+        else:
+            texts = payload.get("texts")
+            if not isinstance(texts, list) or not texts or not all(isinstance(text, str) for text in texts):
+                raise HttpError(400, "\"texts\" must be a non-empty list of strings, or give \"path\"")
+            source = str(payload.get("source") or "api")
+            created_at = datetime.now().isoformat()
+            chunks = [
+                {"content": text, "source": source, "filename": Path(source).name,
+                 "file_type": "TEXT", "created_at": created_at}
+                for text in texts
+            ]
+
+        def write():
+            if collection not in self.store.get_collections():
+                if not payload.get("create"):
+                    raise HttpError(404, f"Collection {collection} does not exist")
+                if not self.store.create_collection(collection):
+                    raise HttpError(500, f"Failed to create collection {collection}")
+            for i in range(0, len(chunks), INGEST_BATCH_SIZE):
+                self.store.add_texts(collection, chunks[i:i + INGEST_BATCH_SIZE], i == 0)
+
+        # 单个写入者：add_texts 以集合当前点数作为起始 ID，并发写入会产生 ID 冲突。
+        # 请求超时被取消时线程池中的写入仍在进行，锁要等写入真正结束才释放
+        await self._write_lock.acquire()
+        future = self._run_blocking(write)
+        future.add_done_callback(lambda _: self._write_lock.release())
+        await asyncio.shield(future)
+        return {"collection": collection, "chunks": len(chunks)}
+
+
+def run_service(store: VectorStore, config: Optional[Dict] = None):
+    """在当前线程中运行服务直到中断"""
+    service = SearchService(store, config)
+    asyncio.run(service.serve_forever())
@@ -0,0 +1,46 @@
+import os
+import json
+import threading
+from typing import Dict, Optional
+
+# 进程内串行化 update_settings 的读-改-写，两个写入方不会互相覆盖
+_update_lock = threading.Lock()
+
+
+def read_settings() -> Optional[Dict]:
+    """读取 settings.json：先找工作目录下的 data/，再找用户目录，都没有时返回 None"""
+    # 1. 尝试从工作目录加载设置
+    settings_path = os.path.join(os.getcwd(), "data", "settings.json")
+    if os.path.exists(settings_path):
+        with open(settings_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # 2. 如果找不到，尝试从用户目录加载设置
+    user_settings_path = os.path.join(os.path.expanduser("~"), "qdrant_knowledge_base", "settings.json")
+    if os.path.exists(user_settings_path):
+        with open(user_settings_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # 3. 如果还是找不到，返回 None
+    return None
+
+
+def update_settings(section: str, values: Dict) -> Dict:
+    """合并更新 data/settings.json 中的一节并写回，返回完整设置"""
+    settings_dir = os.path.join(os.getcwd(), "data")
+    os.makedirs(settings_dir, exist_ok=True)
+    settings_path = os.path.join(settings_dir, "settings.json")
+
+    with _update_lock:
+        settings = {}
+        if os.path.exists(settings_path):
+            with open(settings_path, "r", encoding="utf-8") as f:
+                settings = json.load(f)
+        settings[section] = {**settings.get(section, {}), **values}
+
+        # 先写临时文件再替换，读取方不会读到写了一半的文件
+        tmp_path = f"{settings_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(settings, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, settings_path)
+        return settings
@@ -0,0 +1,220 @@
+"""
+逐行流式处理 JSONL、CSV 与 Markdown，并按配置把字段映射为内容与元数据
+
+字段映射来自 settings.json 的 "streaming" 节，"jsonl" / "csv" 子节可按格式覆盖:
+    "streaming": {
+        "content_fields": ["question", "answer"],
+        "metadata_fields": ["category", "user.id"],
+        "csv": {"delimiter": ";"}
+    }
+content_fields 中存在的字段按顺序以换行拼接为内容；都不存在时用所有标量字段的 "键: 值"。
+metadata_fields 为 null 时，内容以外的标量字段都作为元数据。字段名支持 "a.b" 形式的嵌套路径。
+"""
+import csv
+import json
+import re
+from itertools import chain
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.core.logger import Logger
+from src.core.text_encoding import iter_lines
+
+logger = Logger.get_logger("document")
+
+# settings.json 中 "streaming" 节的默认值
+DEFAULT_STREAMING_SETTINGS = {
+    # 不小于此大小（MB）的 TXT/MD/CSV/JSONL 文件边读边导入，不经过解析缓存
+    "threshold_mb": 32,
+    "max_line_chars": 16 * 1024 * 1024,
+    # 单个内容块的最大字符数，超出时在换行处切开
+    "max_chunk_chars": 64 * 1024,
+    "content_fields": ["content", "text", "body", "message", "question", "answer"],
+    "metadata_fields": None,
+    # CSV 分隔符，null 表示从文件开头自动识别
+    "delimiter": None,
+    "jsonl": {},
+    "csv": {}
+}
+
+# 只记录前几条解析错误，其余只计数
+_MAX_LOGGED_ERRORS = 5
+
+_SCALAR_TYPES = (str, int, float, bool)
+
+
+def load_streaming_settings(file_format: Optional[str] = None, settings: Optional[Dict] = None) -> Dict:
+    """合并默认值、"streaming" 节与按格式的子节"""
+    if settings is None:
+        try:
+            from src.core.settings import read_settings
+            settings = read_settings()
+        except Exception:
+            settings = None
+    section = (settings or {}).get("streaming", {})
+    config = {**DEFAULT_STREAMING_SETTINGS, **section}
+    if file_format:
+        config.update(section.get(file_format, {}))
+    return config
+
+
+def get_field(record: Dict, path: str):
+    """按 "a.b" 路径取嵌套字段，不存在时返回 None"""
+    value = record
+    for key in path.split("."):
+        if not isinstance(value, dict) or key not in value:
+            return None
+        value = value[key]
+    return value
+
+
+class RecordMapper:
+    """把一条记录（dict）映射为 (内容, 元数据)"""
+
+    def __init__(self, content_fields: List[str], metadata_fields: Optional[List[str]] = None):
+        self.content_fields = list(content_fields)
+        self.metadata_fields = metadata_fields
+
+    @classmethod
+    def from_config(cls, config: Dict) -> "RecordMapper":
+        return cls(config["content_fields"], config["metadata_fields"])
+
+    def map(self, record: Dict) -> Tuple[str, Dict]:
+        used = []
+        values = []
+        for field in self.content_fields:
+            value = get_field(record, field)
+            if value not in (None, ""):
+                used.append(field)
+                values.append(value if isinstance(value, str) else json.dumps(value, ensure_ascii=False))
+        if values:
+            content = "\n".join(values)
+        else:
+            content = "\n".join(
+                f"{key}: {value}" for key, value in record.items()
+                if isinstance(value, _SCALAR_TYPES) and value != ""
+            )
+
+        if self.metadata_fields is None:
+            # 没有匹配的内容字段时，所有字段都已写入内容
+            metadata = {
+                key: value for key, value in record.items()
+                if key not in used and isinstance(value, _SCALAR_TYPES)
+            } if values else {}
+        else:
+            metadata = {}
+            for field in self.metadata_fields:
+                value = get_field(record, field)
+                if value is not None:
+                    metadata[field] = value
+        return content, metadata
+
+
+def _record_unit(content: str, metadata: Dict, chunk_type: str, index: int, position_key: str) -> Dict:
+    unit = {
+        "content": content.strip(),
+        "chunk_type": chunk_type,
+        "chunk_index": index,
+        position_key: index
+    }
+    if metadata:
+        unit["metadata"] = metadata
+    return unit
+
+
+def iter_jsonl_units(lines: Iterable[str], mapper: RecordMapper) -> Iterator[Dict]:
+    """每行一个 JSON 对象；无法解析的行跳过并计数"""
+    errors = 0
+    for line_number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            errors += 1
+            if errors <= _MAX_LOGGED_ERRORS:
+                logger.warning(f"JSONL 第 {line_number} 行无法解析: {str(e)}")
+            continue
+        if not isinstance(record, dict):
+            record = {"content": record if isinstance(record, str) else json.dumps(record, ensure_ascii=False)}
+        content, metadata = mapper.map(record)
+        if content.strip():
+            yield _record_unit(content, metadata, "record", line_number, "line_number")
+    if errors:
+        logger.warning(f"JSONL 中共有 {errors} 行无法解析，已跳过")
+
+
+def iter_csv_units(pieces: Iterable[str], mapper: RecordMapper, delimiter: Optional[str] = None,
+                   max_line_chars: int = DEFAULT_STREAMING_SETTINGS["max_line_chars"]) -> Iterator[Dict]:
+    """第一行为表头，其余每行一条记录；未指定分隔符时从文件开头识别"""
+    pieces = iter(pieces)
+    first = next(pieces, "")
+    if not delimiter:
+        try:
+            delimiter = csv.Sniffer().sniff(first[:64 * 1024], delimiters=",;\t|").delimiter
+        except csv.Error:
+            delimiter = ","
+    # 引号内的长字段（例如 FAQ 的答案）可能超过 csv 模块默认的 128K 限制
+    csv.field_size_limit(max(csv.field_size_limit(), max_line_chars))
+    reader = csv.reader(iter_lines(chain([first], pieces), max_line_chars), delimiter=delimiter)
+    header = next(reader, None)
+    if not header:
+        return
+    header = [name.strip() for name in header]
+    for row_number, row in enumerate(reader, 1):
+        if not any(cell.strip() for cell in row):
+            continue
+        content, metadata = mapper.map(dict(zip(header, row)))
+        if content.strip():
+            yield _record_unit(content, metadata, "row", row_number, "row_number")
+
+
+_HEADING = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+
+def iter_markdown_units(lines: Iterable[str], max_chunk_chars: int = DEFAULT_STREAMING_SETTINGS["max_chunk_chars"]) -> Iterator[Dict]:
+    """按空行切分段落，代码块保持完整，每段附带所在的标题路径"""
+    headings: List[Tuple[int, str]] = []
+    body: List[str] = []
+    body_chars = 0
+    in_fence = False
+    index = 0
+
+    def flush():
+        nonlocal body, body_chars, index
+        text = "".join(body).strip()
+        body, body_chars = [], 0
+        if not text:
+            return None
+        index += 1
+        unit = {"content": text, "chunk_type": "section", "chunk_index": index}
+        if headings:
+            unit["section"] = " > ".join(title for _, title in headings)
+        return unit
+
+    for line in lines:
+        stripped = line.strip()
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence:
+            heading = _HEADING.match(stripped)
+            if heading or not stripped:
+                unit = flush()
+                if unit:
+                    yield unit
+                if heading:
+                    level = len(heading.group(1))
+                    headings = [(lvl, title) for lvl, title in headings if lvl < level]
+                    headings.append((level, heading.group(2)))
+                continue
+        body.append(line)
+        body_chars += len(line)
+        if body_chars >= max_chunk_chars:
+            unit = flush()
+            if unit:
+                yield unit
+
+    unit = flush()
+    if unit:
+        yield unit
@@ -0,0 +1,179 @@
+"""
+文本编码检测与流式解码
+
+detect_encoding 只读取文件开头、中部和结尾的少量样本：先识别 BOM，再依次尝试 UTF-8、
+无 BOM 的 UTF-16 与 GB18030（GBK / GB2312 的超集）。随后 iter_text 按块流式严格解码全文，
+整个文件只读一遍，内存占用与文件大小无关。样本之外才出现的 GBK 内容由 iter_text
+在出错处改用 GB18030 继续解码，不会被替换成 U+FFFD。
+"""
+import codecs
+import io
+import os
+from typing import Callable, Iterable, Iterator, List, Optional
+
+from src.core.logger import Logger
+
+logger = Logger.get_logger("document")
+
+# 每个样本的字节数
+SAMPLE_SIZE = 64 * 1024
+# 流式解码时每次读取的字节数
+READ_BYTES = 1024 * 1024
+
+# 较长的 BOM 在前，UTF-32 LE 的 BOM 以 UTF-16 LE 的 BOM 开头
+_BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# 无 BOM 时按顺序尝试的编码；ASCII 是 UTF-8 的子集，GB18030 兼容 GBK 与 GB2312
+FALLBACK_ENCODINGS = ("utf-8", "gb18030")
+
+
+def _read_samples(file_path: str, sample_size: int) -> List[tuple]:
+    """返回 (样本, 是否从文件开头开始, 是否到达文件结尾)"""
+    size = os.path.getsize(file_path)
+    with open(file_path, "rb") as f:
+        if size <= sample_size * 3:
+            return [(f.read(), True, True)]
+        samples = [(f.read(sample_size), True, False)]
+        for offset, at_end in ((size // 2, False), (size - sample_size, True)):
+            f.seek(offset)
+            samples.append((f.read(sample_size), False, at_end))
+        return samples
+
+
+def _decodes(sample: bytes, encoding: str, aligned: bool, final: bool) -> bool:
+    """样本能否按 encoding 解码；中途截取的样本允许跳过开头被截断的多字节字符"""
+    for skip in (range(1) if aligned else range(4)):
+        try:
+            codecs.getincrementaldecoder(encoding)().decode(sample[skip:], final)
+            return True
+        except UnicodeDecodeError:
+            continue
+    return False
+
+
+def _utf16_without_bom(sample: bytes) -> Optional[str]:
+    """无 BOM 的 UTF-16：ASCII 为主的文本中每两个字节有一个 0"""
+    if len(sample) < 2:
+        return None
+    even_zeros = sample[0::2].count(0)
+    odd_zeros = sample[1::2].count(0)
+    half = len(sample) / 2
+    if odd_zeros > half * 0.3 and even_zeros < half * 0.05:
+        return "utf-16-le"
+    if even_zeros > half * 0.3 and odd_zeros < half * 0.05:
+        return "utf-16-be"
+    return None
+
+
+def detect_encoding(file_path: str, sample_size: int = SAMPLE_SIZE) -> str:
+    """检测文本文件编码，返回可直接传给 open() 的编码名（带 BOM 的编码会自动去掉 BOM）"""
+    samples = _read_samples(file_path, sample_size)
+    head = samples[0][0]
+    for bom, encoding in _BOMS:
+        if head.startswith(bom):
+            return encoding
+
+    utf16 = _utf16_without_bom(head)
+    if utf16:
+        return utf16
+
+    for encoding in FALLBACK_ENCODINGS:
+        if all(_decodes(sample, encoding, aligned, final) for sample, aligned, final in samples):
+            return encoding
+
+    logger.warning(f"无法确定文件编码，先按 UTF-8 解码: {file_path}")
+    return "utf-8"
+
+
+def _newline_decoder(encoding: str) -> io.IncrementalNewlineDecoder:
+    return io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(encoding)(errors="strict"), translate=True)
+
+
+def iter_text(file_path: str, encoding: Optional[str] = None, read_bytes: int = READ_BYTES,
+              progress_callback: Optional[Callable[[int], None]] = None) -> Iterator[str]:
+    """流式解码文本文件，按块产出字符串
+
+    与文本模式的 open() 一样统一换行符为 \\n。解码是严格的，不替换无效字节。
+    按 UTF-8 解码时遇到无效字节（样本没有覆盖到的 GBK 段落），如果此前产出的都是 ASCII
+    （按 GB18030 解码结果相同），从尚未产出的字节起改用 GB18030，等同于整个文件按 GB18030
+    解码而不必重读；已产出过非 ASCII 内容或 GB18030 也无法解码时抛出 UnicodeDecodeError。
+    """
+    encoding = encoding or detect_encoding(file_path)
+    size = os.path.getsize(file_path) or 1
+    decoder = _newline_decoder(encoding)
+    ascii_only = True
+    with open(file_path, "rb") as raw:
+        while True:
+            position = raw.tell()
+            data = raw.read(read_bytes)
+            final = not data
+            # (解码器中尚未解码的字节, 标志位)，最低位表示末尾有待定的 \r
+            pending, flag = decoder.getstate()
+            try:
+                piece = decoder.decode(data, final)
+            except UnicodeDecodeError as e:
+                offset = position - len(pending) + e.start
+                if encoding != "utf-8" or not ascii_only:
+                    logger.error(f"{file_path} 第 {offset} 字节处无法按 {encoding} 解码: {e.reason}")
+                    raise
+                logger.warning(f"{file_path} 第 {offset} 字节处不是有效的 UTF-8，改用 GB18030 解码")
+                encoding = "gb18030"
+                decoder = _newline_decoder(encoding)
+                decoder.setstate((b"", flag & 1))
+                raw.seek(position - len(pending))
+                continue
+            ascii_only = ascii_only and piece.isascii()
+            if piece:
+                yield piece
+            if progress_callback:
+                progress_callback(min(int(raw.tell() * 100 / size), 100))
+            if final:
+                break
+
+
+def iter_paragraphs(pieces: Iterable[str], separator: str = "\n\n", max_chars: int = 64 * 1024) -> Iterator[str]:
+    """按 separator 切分流式文本，结果与 "".join(pieces).split(separator) 相同
+
+    缓冲区有上限：没有空行的超长段落（例如日志）在 max_chars 附近的换行处切开。
+    """
+    buffer = ""
+    for piece in pieces:
+        buffer += piece
+        parts = buffer.split(separator)
+        buffer = parts.pop()
+        yield from parts
+        while len(buffer) > max_chars:
+            cut = buffer.rfind("\n", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            yield buffer[:cut]
+            buffer = buffer[cut:]
+    yield buffer
+
+
+def iter_lines(pieces: Iterable[str], max_line_chars: int = 16 * 1024 * 1024) -> Iterator[str]:
+    """把流式文本切成行（保留行尾的 \\n），超过 max_line_chars 的行整行丢弃并记录警告"""
+    buffer = ""
+    skipping = False
+    for piece in pieces:
+        buffer += piece
+        lines = buffer.split("\n")
+        buffer = lines.pop()
+        for line in lines:
+            if skipping:
+                # 超长行的剩余部分
+                skipping = False
+                continue
+            yield line + "\n"
+        if len(buffer) > max_line_chars:
+            logger.warning(f"跳过超过 {max_line_chars} 个字符的行")
+            buffer = ""
+            skipping = True
+    if buffer and not skipping:
+        yield buffer
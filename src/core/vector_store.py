@@ -3,16 +3,185 @@ import sys
 import json
 import shutil
 import ast
+import inspect
+import math
 
 import time
+import heapq
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
 from qdrant_client import QdrantClient, models
+from qdrant_client.http.exceptions import ResponseHandlingException
 from qdrant_client.http.models import Distance, VectorParams
+from src.core import metrics
 from src.core.logger import Logger
+from src.core.profiler import profiled
+from src.core.settings import read_settings
+from src.models.embedding_scheduler import EmbeddingScheduler
+from src.models.embedding_server import get_embedding_server, model_key
 import numpy as np
 
+# 服务器模式的默认传输设置，可在 data/settings.json 的 "qdrant" 节中覆盖
+DEFAULT_TRANSPORT_SETTINGS = {
+    "prefer_grpc": True,
+    "grpc_port": 6334,
+    "pool_size": 4,
+    "timeout": 10.0,
+    "retries": 3,
+    "retry_backoff": 0.5
+}
+
+# 跨知识库搜索的默认总延迟上限（秒）
+DEFAULT_SEARCH_ALL_TIMEOUT = 5.0
+
+# 较早的 qdrant-client 的 search 没有服务器端超时参数
+_SEARCH_ACCEPTS_TIMEOUT = "timeout" in inspect.signature(QdrantClient.search).parameters
+
+
+def _is_transient_error(error: Exception) -> bool:
+    """判断异常是否为可重试的瞬时错误"""
+    if isinstance(error, (ResponseHandlingException, ConnectionError, TimeoutError)):
+        return True
+    try:
+        import grpc
+    except ImportError:
+        return False
+    if isinstance(error, grpc.RpcError):
+        return error.code() in (grpc.StatusCode.UNAVAILABLE, grpc.StatusCode.DEADLINE_EXCEEDED)
+    return False
+
+
+def default_data_dir() -> str:
+    """返回数据目录：优先使用工作目录下的 data/qdrant，不可写时改用用户目录"""
+    # 1. 尝试使用工作目录下的 data/qdrant
+    data_dir = os.path.join(os.getcwd(), "data", "qdrant")
+    if not os.path.exists(data_dir) or not os.access(data_dir, os.W_OK):
+        # 2. 如果工作目录不可写，尝试使用用户目录
+        data_dir = os.path.join(os.path.expanduser("~"), "qdrant_knowledge_base", "data")
+        os.makedirs(data_dir, exist_ok=True)
+
+    # 确保路径使用正确的分隔符
+    return os.path.normpath(data_dir)
+
+
+def build_points(texts: list, vectors: list, start_id: int) -> List[models.PointStruct]:
+    """Build point structs with sequential IDs starting at start_id"""
+    points = []
+    for i, (vector, text) in enumerate(zip(vectors, texts)):
+        point = models.PointStruct(
+            id=start_id + i,  # Use dynamically generated ID
+            vector=vector,
+            payload={
+                "text": str(text),  # Ensure text is string
+                "timestamp": str(datetime.now().isoformat())  # Ensure timestamp is string
+            }
+        )
+        # 单独保存来源文件路径，重新导入时按它删除旧的块
+        if isinstance(text, dict) and text.get("source"):
+            point.payload["source"] = str(text["source"])
+        points.append(point)
+    return points
+
+
+def parse_payload_text(text: str) -> Dict:
+    """Parse the stored chunk dict back from the payload text, plain text becomes {"content": text}"""
+    try:
+        chunk = ast.literal_eval(text)
+        if isinstance(chunk, dict):
+            return chunk
+    except (ValueError, SyntaxError):
+        pass
+    return {"content": text}
+
+
+def payload_content(text: str) -> str:
+    """Return only the chunk content from the payload text"""
+    return parse_payload_text(text).get("content", text)
+
+
+def format_hits(search_result) -> list:
+    """Convert Qdrant hits into (score, source, text) tuples"""
+    results = []
+    for hit in search_result:
+        document_name="Unknown Document"
+        document_name=hit.payload.get("text","")
+        if isinstance(document_name,str) and (document_name is not None):
+            document_name=ast.literal_eval(document_name).get('filename','Unknown Document')
+        results.append((
+            hit.score,
+            document_name,
+            hit.payload.get("text", "")
+        ))
+    return results
+
+
+def build_quantization_config(kind: Optional[str]):
+    """根据名称构建量化配置：None、"scalar"（int8）或 "binary"，None 表示不量化"""
+    if not kind:
+        return None
+    if kind == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(type=models.ScalarType.INT8, always_ram=True)
+        )
+    if kind == "binary":
+        return models.BinaryQuantization(binary=models.BinaryQuantizationConfig(always_ram=True))
+    raise ValueError(f"不支持的量化类型: {kind}")
+
+
+def build_search_params(params: Optional[Dict]) -> Optional[models.SearchParams]:
+    """将 {"hnsw_ef", "exact", "rescore", "oversampling"} 字典转换为 SearchParams"""
+    if not params:
+        return None
+    quantization = None
+    if "rescore" in params or "oversampling" in params:
+        quantization = models.QuantizationSearchParams(
+            rescore=params.get("rescore", True),
+            oversampling=params.get("oversampling")
+        )
+    return models.SearchParams(
+        hnsw_ef=params.get("hnsw_ef"),
+        exact=params.get("exact", False),
+        quantization=quantization
+    )
+
+
+class QdrantClientPool:
+    """Qdrant 客户端池，供 GUI 和多个导入线程并发使用"""
+
+    def __init__(self, factory: Callable[[], QdrantClient], size: int = 1):
+        self.size = max(1, int(size))
+        self._clients = [factory() for _ in range(self.size)]
+        self._idle = queue.Queue()
+        for client in self._clients:
+            self._idle.put(client)
+
+    @property
+    def primary(self) -> QdrantClient:
+        """返回第一个客户端，用于管理类操作"""
+        return self._clients[0]
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """借出一个空闲客户端，用完后自动归还"""
+        try:
+            client = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("等待 Qdrant 客户端超时")
+        try:
+            yield client
+        finally:
+            self._idle.put(client)
+
+    def close(self):
+        """关闭池中所有客户端"""
+        for client in self._clients:
+            client.close()
+
 # 简单的文本嵌入替代方案
 class SimpleEmbedder:
     def __init__(self, vector_size=384):
@@ -31,19 +200,31 @@ class SimpleEmbedder:
             vectors.append(vector)
         return vectors
 
+# SimpleEmbedder 在共享嵌入服务中的键
+SIMPLE_EMBEDDER_KEY = model_key("simple", "hash")
+
+
 class VectorStore:
-    def __init__(self, host: str = "localhost", port: int = 6333, reset: bool = False):
+    def __init__(self, host: str = "localhost", port: int = 6333, reset: bool = False,
+                 data_dir: Optional[str] = None, settings: Optional[Dict] = None):
         """初始化向量存储
         Args:
             host: Qdrant服务器地址
             port: Qdrant服务器端口
             reset: 是否重置数据目录
+            data_dir: 数据目录，默认使用 default_data_dir()
+            settings: 设置字典，默认读取 settings.json
         """
         try:
-            self.logger = Logger.get_logger()
+            self.logger = Logger.get_logger("vector_store")
+            # 保护 kb_config.json 中的 next_id 与 doc_count
+            self._id_lock = threading.RLock()
+            # 服务器模式下的 (host, port)，AsyncVectorStore 据此建立异步连接；本地模式为 None
+            self.server_address = None
 
             # 读取设置文件
-            settings = self.load_settings()
+            if settings is None:
+                settings = self.load_settings()
 
             # 使用可在打包环境中工作的路径
             if getattr(sys, 'frozen', False):
@@ -56,15 +237,7 @@ class VectorStore:
                 self.logger.info(f"应用程序在开发环境中运行，基础目录: {base_dir}")
 
             # 数据目录
-            # 1. 尝试使用工作目录下的 data/qdrant
-            data_dir = os.path.join(os.getcwd(), "data", "qdrant")
-            if not os.path.exists(data_dir) or not os.access(data_dir, os.W_OK):
-                # 2. 如果工作目录不可写，尝试使用用户目录
-                data_dir = os.path.join(os.path.expanduser("~"), "qdrant_knowledge_base", "data")
-                os.makedirs(data_dir, exist_ok=True)
-
-            # 确保路径使用正确的分隔符
-            data_dir = os.path.normpath(data_dir)
+            data_dir = data_dir or default_data_dir()
 
             # 只有在明确指定 reset=True 时才重置数据目录
             if reset and os.path.exists(data_dir):
@@ -76,40 +249,63 @@ class VectorStore:
             os.makedirs(data_dir, exist_ok=True)
             self.logger.info(f"数据目录路径: {data_dir}")
 
+            # 传输设置：默认值 + settings.json 中的覆盖项
+            qdrant_settings = (settings or {}).get("qdrant", {})
+            self.transport = {
+                key: qdrant_settings.get(key, default)
+                for key, default in DEFAULT_TRANSPORT_SETTINGS.items()
+            }
+
             # 根据设置决定使用本地存储模式还是服务器模式
-            if settings and settings.get("qdrant", {}).get("mode") == "server":
+            if qdrant_settings.get("mode") == "server":
                 # 服务器模式
-                server_host = settings["qdrant"].get("host", host)
-                server_port = settings["qdrant"].get("port", port)
-
-                self.logger.info(f"正在连接到 Qdrant 服务器: {server_host}:{server_port}")
-                self.client = QdrantClient(
-                    host=server_host,
-                    port=server_port,
-                    prefer_grpc=False,
-                    timeout=10.0
+                server_host = qdrant_settings.get("host", host)
+                server_port = qdrant_settings.get("port", port)
+                transport_name = "gRPC" if self.transport["prefer_grpc"] else "HTTP"
+                self.server_address = (server_host, server_port)
+
+                self.logger.info(
+                    f"正在连接到 Qdrant 服务器: {server_host}:{server_port} "
+                    f"(传输: {transport_name}, 连接池: {self.transport['pool_size']})"
                 )
+                self.pool = QdrantClientPool(
+                    lambda: QdrantClient(
+                        host=server_host,
+                        port=server_port,
+                        grpc_port=self.transport["grpc_port"],
+                        prefer_grpc=self.transport["prefer_grpc"],
+                        timeout=self.transport["timeout"]
+                    ),
+                    size=self.transport["pool_size"]
+                )
+                self.client = self.pool.primary
 
                 # 测试连接
-                self.client.get_collections()
+                self._execute(lambda client: client.get_collections(), "get_collections")
                 self.logger.info(f"成功连接到 Qdrant 服务器: {server_host}:{server_port}")
             else:
-                # 本地存储模式
+                # 本地存储模式：存储目录有文件锁，只能使用单个客户端
                 storage_dir = os.path.join(data_dir, "storage")
                 os.makedirs(storage_dir, exist_ok=True)
 
-                self.client = QdrantClient(
-                    path=storage_dir,
-                    prefer_grpc=False,
-                    timeout=10.0
+                self.pool = QdrantClientPool(
+                    lambda: QdrantClient(
+                        path=storage_dir,
+                        prefer_grpc=False,
+                        timeout=self.transport["timeout"]
+                    ),
+                    size=1
                 )
+                self.client = self.pool.primary
 
                 # 测试连接
                 self.client.get_collections()
                 self.logger.info("成功使用本地存储模式")
 
             self.embedding_model = None
-            self.embedder = SimpleEmbedder()
+            # 嵌入调度器负责按长度分桶、自适应批大小并统计吞吐；
+            # 编码交给进程内共享的嵌入服务，与其他 VectorStore 及搜索服务合批
+            self.configure_embedder(settings)
             self.current_collection = None
             self.config_file = os.path.join(data_dir, "kb_config.json")
             self.load_config()
@@ -121,11 +317,37 @@ class VectorStore:
     def __del__(self):
         """清理资源"""
         try:
-            if hasattr(self, 'client'):
+            if getattr(self, '_search_executor', None) is not None:
+                self._search_executor.shutdown(wait=False, cancel_futures=True)
+            if hasattr(self, 'pool'):
+                self.pool.close()
+            elif hasattr(self, 'client'):
                 self.client.close()
         except Exception as e:
             self.logger.error(f"关闭 Qdrant 客户端失败: {str(e)}")
 
+    def _execute(self, operation: Callable[[QdrantClient], object], name: str = "request"):
+        """从连接池借出客户端执行操作，瞬时错误按设置重试
+        Args:
+            operation: 接收 QdrantClient 并返回结果的函数
+            name: 操作名称，用于错误与重试指标
+        """
+        retries = max(0, int(self.transport["retries"]))
+        backoff = float(self.transport["retry_backoff"])
+        for attempt in range(retries + 1):
+            try:
+                with self.pool.acquire(timeout=self.transport["timeout"]) as client:
+                    return operation(client)
+            except Exception as e:
+                transient = _is_transient_error(e)
+                metrics.QDRANT_ERRORS_TOTAL.inc(operation=name, transient=str(transient).lower())
+                if attempt >= retries or not transient:
+                    raise
+                metrics.QDRANT_RETRIES_TOTAL.inc(operation=name)
+                delay = backoff * (2 ** attempt)
+                self.logger.warning(f"Qdrant 请求失败，{delay:.1f}s 后重试 ({attempt + 1}/{retries}): {str(e)}")
+                time.sleep(delay)
+
     def load_config(self):
         """加载知识库配置"""
         try:
@@ -170,12 +392,18 @@ class VectorStore:
         try:
             with open(self.config_file, "w", encoding="utf-8") as f:
                 json.dump(self.config, f, ensure_ascii=False, indent=2)
-            self.logger.info(f"成功保存知识库配置: {self.config_file}")
+            self.logger.debug("成功保存知识库配置: %s", self.config_file)
         except Exception as e:
             self.logger.error(f"保存配置失败: {str(e)}")
 
-    def create_collection(self, name, vector_size=384):
-        """创建新的集合"""
+    def create_collection(self, name, vector_size=None, hnsw_config: Optional[Dict] = None,
+                          quantization: Optional[str] = None):
+        """创建新的集合
+        Args:
+            vector_size: 向量维度，None 使用当前嵌入模型的维度
+            hnsw_config: HNSW 索引参数，例如 {"m": 16, "ef_construct": 100}，None 使用 Qdrant 默认值
+            quantization: 向量量化方式，None / "scalar" / "binary"
+        """
         try:
             # 检查集合是否已存在
             collections = self.client.get_collections().collections
@@ -184,18 +412,27 @@ class VectorStore:
             if name in collection_names:
                 raise ValueError(f"集合 {name} 已存在")
 
+            vector_size = vector_size or self.vector_size
             # 创建集合
             self.client.create_collection(
                 collection_name=name,
-                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
+                vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE),
+                hnsw_config=models.HnswConfigDiff(**hnsw_config) if hnsw_config else None,
+                quantization_config=build_quantization_config(quantization)
             )
+            self._create_source_index(name)
 
-            # 更新配置
+            # 更新配置；新集合的每个点都带 source 字段，不需要迁移
             self.config["collections"][name] = {
                 "created_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
                 "doc_count": 0,
-                "vector_size": vector_size
+                "vector_size": vector_size,
+                "source_indexed": True
             }
+            if hnsw_config:
+                self.config["collections"][name]["hnsw_config"] = hnsw_config
+            if quantization:
+                self.config["collections"][name]["quantization"] = quantization
             self.save_config()
 
             self.current_collection = name
@@ -253,132 +490,409 @@ class VectorStore:
 
             return True
         except Exception as e:
-            print(f"删除集合失败: {str(e)}")
+            self.logger.error(f"删除集合失败: {str(e)}")
             return False
 
-    def add_texts(self, collection_name: str, texts: list, is_first_chunk: bool = False):
+    @profiled("vector_store.add_texts")
+    def add_texts(self, collection_name: str, texts: list, is_first_chunk: bool = False,
+                  vectors: Optional[list] = None, start_id: Optional[int] = None):
         """Add texts to collection
         Args:
             collection_name: Collection name
             texts: List of texts
             is_first_chunk: Whether this is the first chunk of the document, used to control document count, defaults to False
+            vectors: Precomputed vectors for texts, skips embedding when given
+            start_id: ID of the first point; None uses the collection's current points_count
         """
         try:
-            # Get current number of points in collection as starting ID
-            collection_info = self.client.get_collection(collection_name)
-            start_id = collection_info.points_count
+            if start_id is None:
+                start_id = self.reserve_point_ids(collection_name, len(texts))
+            else:
+                self.reserve_point_ids(collection_name, len(texts), start_id)
 
-            # Get vector representation of texts
-            vectors = []
-            for text in texts:
-                vector = self.embedder.encode([text])[0]
-                vectors.append(vector)
+            # Get vector representation of texts in one call so the embedder can batch them
+            if vectors is None:
+                with metrics.EMBED_SECONDS.time(source="vector_store"):
+                    vectors = self.embedder.encode(texts)
+                metrics.EMBED_TEXTS_TOTAL.inc(len(texts), source="vector_store")
 
             # Prepare point data
-            points = []
-            for i, (vector, text) in enumerate(zip(vectors, texts)):
-                point = models.PointStruct(
-                    id=start_id + i,  # Use dynamically generated ID
-                    vector=vector,
-                    payload={
-                        "text": str(text),  # Ensure text is string
-                        "timestamp": str(datetime.now().isoformat())  # Ensure timestamp is string
-                    }
-                )
-                points.append(point)
+            points = build_points(texts, vectors, start_id)
 
             # Batch add to collection
-            self.client.upsert(
-                collection_name=collection_name,
-                points=points
-            )
+            with metrics.UPSERT_SECONDS.time():
+                self._execute(lambda client: client.upsert(
+                    collection_name=collection_name,
+                    points=points
+                ), "upsert")
+            metrics.UPSERT_POINTS_TOTAL.inc(len(points))
 
             # Update document count in config, only when processing first chunk
-            if is_first_chunk and collection_name in self.config["collections"]:
-                self.config["collections"][collection_name]["doc_count"] += 1
-                self.save_config()
+            if is_first_chunk:
+                self.count_document(collection_name)
 
-            self.logger.info(f"Successfully added {len(texts)} texts to collection {collection_name}")
+            # 热点路径：使用惰性格式化，级别未启用时不构造消息
+            self.logger.debug("Successfully added %d texts to collection %s", len(texts), collection_name)
 
         except Exception as e:
             self.logger.error(f"Failed to add texts: {str(e)}")
             raise
 
-    def search(self, query, collection_name=None, limit=5):
+    def reserve_point_ids(self, collection_name: str, count: int, start_id: Optional[int] = None) -> int:
+        """为一批点预留连续 ID，返回起始 ID
+
+        下一个可用 ID 记录在 kb_config.json 的 next_id 中，与 points_count 取较大值：删除过点的
+        集合 points_count 小于已用过的最大 ID。分配在锁内完成，多个导入线程以及共用本对象的
+        AsyncVectorStore 并发写入同一集合时 ID 不会重叠。
+        Args:
+            start_id: 调用方显式指定的起始 ID，只用于推进 next_id
+        """
+        with self._id_lock:
+            collection_config = self.config["collections"].get(collection_name)
+            if start_id is None:
+                # Get current number of points in collection as starting ID
+                collection_info = self._execute(lambda client: client.get_collection(collection_name), "get_collection")
+                start_id = collection_info.points_count or 0
+                if collection_config is not None:
+                    start_id = max(start_id, collection_config.get("next_id", 0))
+            if collection_config is not None:
+                collection_config["next_id"] = max(collection_config.get("next_id", 0), start_id + count)
+                self.save_config()
+            return start_id
+
+    def count_document(self, collection_name: str):
+        """文档数加一"""
+        with self._id_lock:
+            collection_config = self.config["collections"].get(collection_name)
+            if collection_config is not None:
+                collection_config["doc_count"] += 1
+                self.save_config()
+
+    def delete_source(self, collection_name: str, source: str) -> int:
+        """删除来自同一文件的所有块，返回删除的点数
+        Args:
+            collection_name: Collection name
+            source: 导入时的文件路径，即块的 "source" 字段
+        """
+        try:
+            # 旧版本写入的点没有 source 字段，先一次性补上，之后只按 source 过滤
+            self._migrate_source_field(collection_name)
+            source_filter = models.Filter(must=[
+                models.FieldCondition(key="source", match=models.MatchValue(value=source))
+            ])
+            ids = []
+            offset = None
+            while True:
+                records, offset = self._execute(lambda client: client.scroll(
+                    collection_name=collection_name, scroll_filter=source_filter, limit=1000,
+                    offset=offset, with_payload=False, with_vectors=False
+                ), "scroll")
+                ids.extend(record.id for record in records)
+                if offset is None:
+                    break
+            if not ids:
+                return 0
+
+            for start in range(0, len(ids), 1000):
+                selector = models.PointIdsList(points=ids[start:start + 1000])
+                self._execute(lambda client: client.delete(
+                    collection_name=collection_name, points_selector=selector
+                ), "delete")
+            with self._id_lock:
+                collection_config = self.config["collections"].get(collection_name)
+                if collection_config is not None:
+                    collection_config["doc_count"] = max(collection_config["doc_count"] - 1, 0)
+                    self.save_config()
+            self.logger.info(f"已删除 {source} 的 {len(ids)} 个块: {collection_name}")
+            return len(ids)
+        except Exception as e:
+            self.logger.error(f"删除文件的块失败: {str(e)}")
+            raise
+
+    def _create_source_index(self, collection_name: str):
+        """为 source 字段建立 keyword 索引，按文件删除时走索引；本地模式下不支持时忽略"""
+        try:
+            self._execute(lambda client: client.create_payload_index(
+                collection_name=collection_name, field_name="source",
+                field_schema=models.PayloadSchemaType.KEYWORD
+            ), "create_payload_index")
+        except Exception as e:
+            self.logger.warning(f"创建 source 索引失败: {collection_name}: {str(e)}")
+
+    def _migrate_source_field(self, collection_name: str):
+        """把旧版本写入的点的来源从 text 解析出来写入 source 字段，每个集合只执行一次，
+        完成后在知识库配置中记录 "source_indexed" """
+        collection_config = self.config["collections"].get(collection_name)
+        if collection_config is None or collection_config.get("source_indexed"):
+            return
+
+        legacy_filter = models.Filter(must=[
+            models.IsEmptyCondition(is_empty=models.PayloadField(key="source"))
+        ])
+        migrated = 0
+        offset = None
+        while True:
+            records, offset = self._execute(lambda client: client.scroll(
+                collection_name=collection_name, scroll_filter=legacy_filter, limit=1000,
+                offset=offset, with_payload=["text"], with_vectors=False
+            ), "scroll")
+            by_source: Dict[str, List] = {}
+            for record in records:
+                source = parse_payload_text(record.payload.get("text", "")).get("source")
+                if source:
+                    by_source.setdefault(str(source), []).append(record.id)
+            for source, ids in by_source.items():
+                self._execute(lambda client: client.set_payload(
+                    collection_name=collection_name, payload={"source": source}, points=ids
+                ), "set_payload")
+                migrated += len(ids)
+            # scroll 的 offset 是下一个点的 ID，补写字段后不会跳过或重复
+            if offset is None:
+                break
+
+        self._create_source_index(collection_name)
+        with self._id_lock:
+            collection_config["source_indexed"] = True
+            self.save_config()
+        self.logger.info(f"已为 {collection_name} 的 {migrated} 个旧点补写 source 字段")
+
+    @profiled("vector_store.search")
+    def search(self, query, collection_name=None, limit=5, offset=0, score_threshold=None,
+               search_params: Optional[Dict] = None):
         """Search texts
         Args:
             query: Search query
             collection_name: Collection name, if None use current collection
-            limit: Result count limit
+            limit: Result count limit (page size)
+            offset: Number of leading hits to skip, used for paging
+            score_threshold: Only return hits scoring at least this value
+            search_params: Index search parameters, see build_search_params
         Returns:
             list: Search results list, each element is a (score, source, text) tuple
         """
         try:
-            # If no collection name specified, use current collection
-            if collection_name is None:
-                if self.current_collection is None:
-                    # If no current collection, try to get first available collection
-                    collections = self.get_collections()
-                    if not collections:
-                        raise ValueError("No available collections, please create one first")
-                    collection_name = collections[0]
-                    self.current_collection = collection_name
-                else:
-                    collection_name = self.current_collection
-
-            # Encode query
+            with metrics.SEARCH_SECONDS.time(kind="search"):
+                # If no collection name specified, use current collection
+                collection_name = self._resolve_collection(collection_name)
+
+                # Encode query
+                query_vector = self.embedder.encode([query])[0]
+                return self._search_vector(query_vector, collection_name, limit, offset, score_threshold,
+                                           search_params)
+        except Exception as e:
+            self.logger.error(f"搜索失败: {str(e)}")
+            return []
+
+    def iter_search(self, query, collection_name=None, page_size=20, max_results=None,
+                    score_threshold=None, query_vector=None) -> Iterator[Tuple[float, str, str]]:
+        """Lazily yield search hits, fetching further pages from Qdrant only when consumed
+        Args:
+            query: Search query
+            collection_name: Collection name, if None use current collection
+            page_size: Hits fetched per request
+            max_results: Stop after this many hits, None for no limit
+            score_threshold: Only yield hits scoring at least this value
+            query_vector: Precomputed query vector, skips encoding when given
+        Yields:
+            (score, source, text) tuples in descending score order
+        """
+        collection_name = self._resolve_collection(collection_name)
+        # Encode once, every page reuses the same vector
+        if query_vector is None:
             query_vector = self.embedder.encode([query])[0]
-            print(
-                'Encoding query'
-            )
-            # Search
-            search_result = self.client.search(
-                collection_name=collection_name,
-                query_vector=query_vector,
-                limit=limit
-            )
 
-            # Format results
-            results = []
-            for hit in search_result:
-                print(hit.payload)
-                document_name="Unknown Document"
-                document_name=hit.payload.get("text","")
-                if isinstance(document_name,str) and (document_name is not None):
-                    document_name=ast.literal_eval(document_name).get('filename','Unknown Document')
-                results.append((
-                    hit.score,
-                    document_name,
-                    hit.payload.get("text", "")
-                ))
+        offset = 0
+        while max_results is None or offset < max_results:
+            limit = page_size if max_results is None else min(page_size, max_results - offset)
+            try:
+                with metrics.SEARCH_SECONDS.time(kind="page"):
+                    page = self._search_vector(query_vector, collection_name, limit, offset, score_threshold)
+            except Exception as e:
+                self.logger.error(f"分页搜索失败: {str(e)}")
+                return
+            yield from page
+            offset += len(page)
+            if len(page) < limit:
+                return
+
+    def iter_search_all(self, query, collections=None, page_size=20,
+                        score_threshold=None) -> Iterator[Tuple[float, str, str, str]]:
+        """Lazily yield hits of several collections merged by score, paging each one on demand
+        Args:
+            query: Search query
+            collections: Collection names, if None search all collections
+            page_size: Hits fetched per request from each collection
+            score_threshold: Only yield hits scoring at least this value
+        Yields:
+            (score, source, text, collection) tuples in descending score order
+        """
+        if collections is None:
+            collections = self.get_collections()
+        if not collections:
+            return
+
+        # 只编码一次；每个集合的结果本身按分数降序，归并时各集合只在被消费到时才取下一页
+        query_vector = self.embedder.encode([query])[0]
+
+        def tagged(name):
+            for score, source, text in self.iter_search(query, name, page_size, score_threshold=score_threshold,
+                                                        query_vector=query_vector):
+                yield score, source, text, name
 
+        yield from heapq.merge(*(tagged(name) for name in collections), key=lambda hit: -hit[0])
+
+    def search_all(self, query, collections=None, limit=5, timeout=DEFAULT_SEARCH_ALL_TIMEOUT,
+                   query_vector=None):
+        """Search several collections and merge the results
+        Args:
+            query: Search query
+            collections: Collection names, if None search all collections
+            limit: Global result count limit
+            timeout: Overall latency cap in seconds, including query encoding; collections
+                that miss it are skipped
+            query_vector: Precomputed query vector, skips encoding when given
+        Returns:
+            list: (score, source, text, collection) tuples sorted by score. All collections are
+                embedded by the same model with cosine distance, so raw scores are comparable
+                and are merged as they are.
+        """
+        start = time.perf_counter()
+        deadline = start + timeout
+        try:
+            if collections is None:
+                collections = self.get_collections()
+            if not collections:
+                return []
+
+            # Encode query once for all collections
+            if query_vector is None:
+                query_vector = self.embedder.encode([query])[0]
+
+            heap = []
+
+            def merge(name, hits):
+                for score, source, text in hits:
+                    entry = (score, name, source, text)
+                    if len(heap) < limit:
+                        heapq.heappush(heap, entry)
+                    else:
+                        heapq.heappushpop(heap, entry)
+
+            if self.pool.size <= 1:
+                # 只有一个客户端（本地模式）时并行没有意义：逐个搜索，超时后不再发起新的搜索
+                for i, name in enumerate(collections):
+                    if time.perf_counter() >= deadline:
+                        self.logger.warning(f"跨知识库搜索超过 {timeout}s 延迟上限，跳过 {len(collections) - i} 个集合")
+                        break
+                    try:
+                        merge(name, self._search_vector(query_vector, name, limit))
+                    except Exception as e:
+                        self.logger.error(f"搜索集合 {name} 失败: {str(e)}")
+            else:
+                remaining = deadline - time.perf_counter()
+                # 服务器端超时使超过期限的搜索在 Qdrant 中结束，而不是在后台线程中继续占用连接
+                server_timeout = max(1, math.ceil(remaining))
+                executor = self._get_search_executor()
+                futures = {
+                    executor.submit(self._search_vector, query_vector, name, limit, server_timeout=server_timeout): name
+                    for name in collections
+                }
+                done, not_done = wait(futures, timeout=max(0.0, remaining))
+                for future in not_done:
+                    future.cancel()
+                    self.logger.warning(f"搜索集合 {futures[future]} 超过 {timeout}s 延迟上限，已跳过")
+                for future in done:
+                    try:
+                        merge(futures[future], future.result())
+                    except Exception as e:
+                        self.logger.error(f"搜索集合 {futures[future]} 失败: {str(e)}")
+
+            results = [(score, source, text, name) for score, name, source, text in sorted(heap, reverse=True)]
+            metrics.SEARCH_SECONDS.observe(time.perf_counter() - start, kind="search_all")
             return results
         except Exception as e:
-            self.logger.error(f"搜索失败: {str(e)}")
+            self.logger.error(f"跨知识库搜索失败: {str(e)}")
             return []
 
+    def _resolve_collection(self, collection_name=None):
+        """Return collection_name, falling back to the current or first collection"""
+        if collection_name is not None:
+            return collection_name
+        if self.current_collection is None:
+            # If no current collection, try to get first available collection
+            collections = self.get_collections()
+            if not collections:
+                raise ValueError("No available collections, please create one first")
+            self.current_collection = collections[0]
+        return self.current_collection
+
+    def _search_vector(self, query_vector, collection_name, limit, offset=0, score_threshold=None,
+                       search_params: Optional[Dict] = None, server_timeout: Optional[int] = None):
+        """Search one collection with an already encoded query
+        Args:
+            server_timeout: Seconds Qdrant may spend on the search, ignored by clients without it
+        """
+        params = build_search_params(search_params)
+        options = {"timeout": server_timeout} if server_timeout and _SEARCH_ACCEPTS_TIMEOUT else {}
+        search_result = self._execute(lambda client: client.search(
+            collection_name=collection_name,
+            query_vector=query_vector,
+            limit=limit,
+            offset=offset,
+            score_threshold=score_threshold,
+            search_params=params,
+            **options
+        ), "search")
+        return format_hits(search_result)
+
+    def _get_search_executor(self):
+        """懒加载跨集合搜索线程池，线程数与连接池大小一致（每个线程占用一个客户端）"""
+        if getattr(self, "_search_executor", None) is None:
+            self._search_executor = ThreadPoolExecutor(
+                max_workers=self.pool.size,
+                thread_name_prefix="VectorStoreSearch"
+            )
+        return self._search_executor
+
+    def configure_embedder(self, settings: Optional[Dict]):
+        """按设置选择嵌入：配置了模型时使用 EmbeddingService，否则使用简单嵌入"""
+        self.embedding_service = self._create_embedding_service(settings)
+        if self.embedding_service is not None:
+            self.embedding_server = self.embedding_service.server
+            self.embedder = self.embedding_service.scheduler
+            self.vector_size = self.embedding_service.dimension
+        else:
+            self.embedding_server = get_embedding_server(SIMPLE_EMBEDDER_KEY, SimpleEmbedder, name="simple")
+            self.embedder = EmbeddingScheduler.from_settings(self.embedding_server.encode, settings)
+            self.vector_size = SimpleEmbedder().vector_size
+
+    def _create_embedding_service(self, settings):
+        """模型设置对话框保存过嵌入模型时，按其后端、线程数与精度设置创建 EmbeddingService；
+        未配置或加载失败时返回 None，使用简单嵌入"""
+        if not (settings or {}).get("models", {}).get("embedding", {}).get("model"):
+            return None
+        try:
+            # 延迟导入：未配置模型时命令行和搜索服务不必加载 sentence_transformers
+            from src.models.model_manager import EmbeddingService, ModelRegistry
+            return EmbeddingService.from_settings(ModelRegistry(), settings)
+        except Exception as e:
+            self.logger.error(f"加载嵌入模型失败，使用简单嵌入: {str(e)}")
+            return None
+
     def set_embedding_model(self, model):
         """设置嵌入模型"""
         self.embedding_model = model
         return True
 
+    def set_embedder(self, embedder):
+        """设置嵌入器，需提供 encode(texts) 方法，例如 EmbeddingScheduler"""
+        self.embedder = embedder
+        return True
+
     def load_settings(self):
         """加载设置"""
         try:
-            # 1. 尝试从工作目录加载设置
-            settings_path = os.path.join(os.getcwd(), "data", "settings.json")
-            if os.path.exists(settings_path):
-                with open(settings_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-
-            # 2. 如果找不到，尝试从用户目录加载设置
-            user_settings_path = os.path.join(os.path.expanduser("~"), "qdrant_knowledge_base", "settings.json")
-            if os.path.exists(user_settings_path):
-                with open(user_settings_path, "r", encoding="utf-8") as f:
-                    return json.load(f)
-
-            # 3. 如果还是找不到，返回 None
-            return None
+            return read_settings()
         except Exception as e:
             self.logger.error(f"加载设置失败: {str(e)}")
             return None
\ No newline at end of file
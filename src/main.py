@@ -1,19 +1,8 @@
 import sys
 import os
-import logging
 from PyQt6.QtWidgets import QApplication
 from PyQt6.QtCore import QSettings, Qt
 from src.core.logger import Logger
- 
-# 设置日志
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler("app.log"),
-        logging.StreamHandler()
-    ]
-)
 
 # 添加项目根目录到Python路径
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
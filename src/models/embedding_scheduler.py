@@ -0,0 +1,248 @@
+import re
+import time
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional
+from src.core.logger import Logger
+
+try:
+    import psutil
+except ImportError:  # 可选依赖，缺失时不做内存自适应
+    psutil = None
+
+logger = Logger.get_logger("embedding")
+
+# settings.json 中 "embedding_scheduler" 节的默认值
+DEFAULT_EMBEDDING_SCHEDULER_SETTINGS = {
+    "batch_size": 32,
+    "min_batch_size": 4,
+    "max_batch_size": 256,
+    # 每批的目标耗时（秒），批大小据此增减
+    "target_latency": 0.5,
+    "min_free_memory_mb": 512,
+    # CPU 编码进程数，0 表示在调用线程中编码；只对本地 torch 模型生效
+    "num_workers": 0,
+    "threads_per_worker": 1
+}
+
+# 中日韩字符按单字计 token，其余按单词计
+_TOKEN_PATTERN = re.compile(r"[぀-ヿ㐀-䶿一-鿿가-힯]|[A-Za-z0-9_]+")
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的 token 数，用于吞吐统计"""
+    return len(_TOKEN_PATTERN.findall(text))
+
+
+# ---- 编码进程池 ----
+# 每个子进程各自加载一份模型，只在 CPU 上使用
+
+_worker_model = None
+
+
+def _init_worker(model_path: str, num_threads: int):
+    global _worker_model
+    import torch
+    from sentence_transformers import SentenceTransformer
+    torch.set_num_threads(num_threads)
+    _worker_model = SentenceTransformer(model_path, device="cpu")
+
+
+def _encode_in_worker(texts: List[str]):
+    start = time.perf_counter()
+    embeddings = _worker_model.encode(texts, batch_size=len(texts)).tolist()
+    return embeddings, time.perf_counter() - start
+
+
+class EmbeddingScheduler:
+    """Sits in front of an encoder such as EmbeddingService.embed_text
+
+    Chunks are sorted by length so each batch holds texts of similar length,
+    which reduces padding. The batch size grows while batches finish well under
+    target_latency and there is spare memory, and shrinks when they overrun.
+    On CPU the batches can optionally be spread over a pool of encoder processes.
+    Exposes `encode(texts)` so it can be used as VectorStore's embedder.
+    """
+
+    def __init__(self, encode_fn: Optional[Callable[[List[str]], List[List[float]]]] = None,
+                 batch_size: int = 32, min_batch_size: int = 4, max_batch_size: int = 256,
+                 target_latency: float = 0.5, min_free_memory_mb: float = 512,
+                 model_path: Optional[str] = None, num_workers: int = 0, threads_per_worker: int = 1):
+        """
+        Args:
+            encode_fn: Encodes a list of texts into a list of vectors
+            batch_size: Initial batch size
+            min_batch_size: Lower bound for the adaptive batch size
+            max_batch_size: Upper bound for the adaptive batch size
+            target_latency: Desired seconds per batch
+            min_free_memory_mb: Stop growing batches when free memory drops below this
+            model_path: Model to load in encoder processes, required when num_workers > 0
+            num_workers: Number of encoder processes, 0 encodes in the calling thread
+            threads_per_worker: Torch intra-op threads per encoder process
+        """
+        if encode_fn is None and not (model_path and num_workers > 0):
+            raise ValueError("需要提供 encode_fn，或同时提供 model_path 和 num_workers")
+        self.encode_fn = encode_fn
+        self.batch_size = batch_size
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.target_latency = target_latency
+        self.min_free_memory_mb = min_free_memory_mb
+        self.model_path = model_path
+        self.num_workers = num_workers
+        self.threads_per_worker = threads_per_worker
+        self._executor = None
+        self._lock = threading.Lock()
+        self._listeners: List[Callable[[Dict], None]] = []
+        self.reset_stats()
+
+    @classmethod
+    def from_settings(cls, encode_fn: Callable[[List[str]], List[List[float]]], settings: Optional[Dict] = None,
+                      model_path: Optional[str] = None) -> "EmbeddingScheduler":
+        """按 settings.json 的 "embedding_scheduler" 节创建调度器
+        Args:
+            model_path: 编码进程加载的模型；为 None 时（例如哈希嵌入或 onnx 后端）不启用进程池
+        """
+        if settings is None:
+            try:
+                from src.core.settings import read_settings
+                settings = read_settings()
+            except Exception:
+                settings = None
+        config = {**DEFAULT_EMBEDDING_SCHEDULER_SETTINGS, **(settings or {}).get("embedding_scheduler", {})}
+        num_workers = int(config["num_workers"])
+        if num_workers > 0 and not model_path:
+            logger.warning("当前嵌入模型不支持编码进程池，num_workers 设置被忽略")
+            num_workers = 0
+        return cls(
+            encode_fn,
+            batch_size=int(config["batch_size"]),
+            min_batch_size=int(config["min_batch_size"]),
+            max_batch_size=int(config["max_batch_size"]),
+            target_latency=float(config["target_latency"]),
+            min_free_memory_mb=float(config["min_free_memory_mb"]),
+            model_path=model_path,
+            num_workers=num_workers,
+            threads_per_worker=int(config["threads_per_worker"])
+        )
+
+    # ---- 统计 ----
+
+    def reset_stats(self):
+        """清空累计统计"""
+        self.total_chunks = 0
+        self.total_tokens = 0
+        self.total_time = 0.0
+
+    def stats(self) -> Dict:
+        """返回累计吞吐统计"""
+        elapsed = self.total_time or 1e-9
+        return {
+            "chunks": self.total_chunks,
+            "tokens": self.total_tokens,
+            "chunks_per_sec": self.total_chunks / elapsed,
+            "tokens_per_sec": self.total_tokens / elapsed,
+            "batch_size": self.batch_size
+        }
+
+    def add_listener(self, listener: Callable[[Dict], None]):
+        """注册统计回调，每个批次完成后调用"""
+        self._listeners.append(listener)
+
+    def remove_listener(self, listener: Callable[[Dict], None]):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _record(self, texts: List[str], latency: float, wall_time: float):
+        """Record a finished batch; wall_time is the elapsed time attributed to it for throughput"""
+        with self._lock:
+            self.total_chunks += len(texts)
+            self.total_tokens += sum(estimate_tokens(text) for text in texts)
+            self.total_time += wall_time
+            self._adapt(len(texts), latency)
+            stats = self.stats()
+        for listener in list(self._listeners):
+            try:
+                listener(stats)
+            except Exception as e:
+                logger.error(f"嵌入统计回调失败: {str(e)}")
+
+    # ---- 自适应批大小 ----
+
+    def _memory_tight(self) -> bool:
+        if psutil is None:
+            return False
+        return psutil.virtual_memory().available / 1024 / 1024 < self.min_free_memory_mb
+
+    def _adapt(self, batch_len: int, latency: float):
+        # 只根据满批次调整，尾部的小批次不代表真实延迟
+        if batch_len < self.batch_size:
+            return
+        if latency > self.target_latency or self._memory_tight():
+            self.batch_size = max(self.min_batch_size, self.batch_size // 2)
+        elif latency < self.target_latency / 2:
+            self.batch_size = min(self.max_batch_size, self.batch_size * 2)
+
+    # ---- 编码 ----
+
+    def _get_executor(self):
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.num_workers,
+                initializer=_init_worker,
+                initargs=(self.model_path, self.threads_per_worker)
+            )
+        return self._executor
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        """Encode texts in length-bucketed adaptive batches, preserving input order"""
+        texts = [str(text) for text in texts]
+        if not texts:
+            return []
+        # 按长度排序，相近长度的文本进入同一批次以减少 padding
+        order = sorted(range(len(texts)), key=lambda i: len(texts[i]))
+        vectors: List[Optional[List[float]]] = [None] * len(texts)
+
+        if self.num_workers > 0:
+            self._encode_parallel(texts, order, vectors)
+        else:
+            position = 0
+            while position < len(order):
+                indices = order[position:position + self.batch_size]
+                position += len(indices)
+                batch = [texts[i] for i in indices]
+                start = time.perf_counter()
+                embeddings = self.encode_fn(batch)
+                latency = time.perf_counter() - start
+                self._record(batch, latency, latency)
+                for i, vector in zip(indices, embeddings):
+                    vectors[i] = list(vector)
+        return vectors
+
+    def _encode_parallel(self, texts: List[str], order: List[int], vectors: list):
+        executor = self._get_executor()
+        # 批大小在提交时确定，每轮最多保持 num_workers 个批次在途
+        position = 0
+        while position < len(order):
+            round_start = time.perf_counter()
+            pending = []
+            for _ in range(self.num_workers):
+                if position >= len(order):
+                    break
+                indices = order[position:position + self.batch_size]
+                position += len(indices)
+                pending.append((indices, executor.submit(_encode_in_worker, [texts[i] for i in indices])))
+            for indices, future in pending:
+                embeddings, latency = future.result()
+                # 批次并行执行，吞吐按整轮的墙钟时间计算
+                wall_time = time.perf_counter() - round_start
+                round_start += wall_time
+                self._record([texts[i] for i in indices], latency, wall_time)
+                for i, vector in zip(indices, embeddings):
+                    vectors[i] = vector
+
+    def close(self):
+        """关闭编码进程池"""
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
@@ -0,0 +1,201 @@
+"""
+进程内共享的嵌入服务：每个模型只加载一份，并把各线程并发的 encode 调用合并成批次
+
+导入线程、搜索、HTTP 服务与命令行都通过 get_embedding_server(key, loader) 取得同一个
+EmbeddingServer。第一个请求到达后最多等待 max_wait_ms，凑满 max_batch_size 条文本或
+到达时限即编码一次，再把结果按请求切分返回。
+
+模型与服务都以弱引用登记：没有使用者持有时即可被回收；工作线程空闲 idle_timeout 秒后
+自动退出，不会让模型常驻内存。
+"""
+import queue
+import threading
+import time
+import weakref
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from src.core import metrics
+from src.core.logger import Logger
+
+logger = Logger.get_logger("embedding")
+
+# settings.json 中 "embedding_server" 节的默认值
+DEFAULT_EMBEDDING_SERVER_SETTINGS = {
+    # 关闭时 encode 直接在调用线程中执行，仍共享同一份模型
+    "enabled": True,
+    # 一次编码合并的最大文本数，单个更大的请求单独编码
+    "max_batch_size": 64,
+    # 第一个请求到达后最多等待多久再凑批（毫秒）
+    "max_wait_ms": 5,
+    # 工作线程空闲多久后退出（秒）
+    "idle_timeout": 30.0
+}
+
+_models: "weakref.WeakValueDictionary[Hashable, Any]" = weakref.WeakValueDictionary()
+_servers: "weakref.WeakValueDictionary[Hashable, EmbeddingServer]" = weakref.WeakValueDictionary()
+_registry_lock = threading.Lock()
+
+
+class _Request:
+    __slots__ = ("texts", "future", "enqueued")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.future = Future()
+        self.enqueued = time.perf_counter()
+
+
+class EmbeddingServer:
+    """Coalesces concurrent encode calls on one shared model
+
+    `encode(texts)` may be called from any thread. Requests are queued and a
+    single worker thread encodes them in batches, so one model copy serves
+    import workers and searches without them contending for the CPU/GPU.
+    The return type follows the model's encode (list or ndarray rows).
+    """
+
+    def __init__(self, model, name: str = "model", config: Optional[Dict] = None):
+        """
+        Args:
+            model: 具有 encode(texts) 方法的模型，例如 SentenceTransformer
+            name: 指标与日志中使用的模型名
+            config: 覆盖 DEFAULT_EMBEDDING_SERVER_SETTINGS
+        """
+        config = {**DEFAULT_EMBEDDING_SERVER_SETTINGS, **(config or {})}
+        self.model = model
+        self.name = name
+        self.enabled = bool(config["enabled"])
+        self.max_batch_size = int(config["max_batch_size"])
+        self.max_wait = float(config["max_wait_ms"]) / 1000
+        self.idle_timeout = float(config["idle_timeout"])
+        self._queue: "queue.Queue[_Request]" = queue.Queue()
+        self._carry: Optional[_Request] = None
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def encode(self, texts: List[str]):
+        """编码文本，阻塞直到本请求所在的批次完成"""
+        texts = list(texts)
+        if not texts:
+            return []
+        # 关闭合批，或在工作线程内重入（例如模型回调）时直接编码
+        if not self.enabled or threading.current_thread() is self._thread:
+            return self._encode_direct(texts)
+        request = _Request(texts)
+        self._queue.put(request)
+        self._ensure_worker()
+        return request.future.result()
+
+    def _encode_direct(self, texts: List[str]):
+        start = time.perf_counter()
+        vectors = self.model.encode(texts)
+        metrics.EMBED_SECONDS.observe(time.perf_counter() - start, source="embedding_server")
+        metrics.EMBED_TEXTS_TOTAL.inc(len(texts), source="embedding_server")
+        return vectors
+
+    def _ensure_worker(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name=f"EmbeddingServer-{self.name}", daemon=True)
+                self._thread.start()
+
+    def _collect(self) -> List[_Request]:
+        """取出一个批次；超出 max_batch_size 的请求留到下一批"""
+        if self._carry is not None:
+            first, self._carry = self._carry, None
+        else:
+            first = self._queue.get(timeout=self.idle_timeout)
+        batch = [first]
+        size = len(first.texts)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                request = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if size + len(request.texts) > self.max_batch_size:
+                self._carry = request
+                break
+            batch.append(request)
+            size += len(request.texts)
+        return batch
+
+    def _run(self):
+        while True:
+            try:
+                batch = self._collect()
+            except queue.Empty:
+                # 空闲退出；退出前再检查一次，避免与刚入队的请求竞争
+                with self._lock:
+                    if self._queue.empty() and self._carry is None:
+                        self._thread = None
+                        return
+                continue
+
+            texts = [text for request in batch for text in request.texts]
+            now = time.perf_counter()
+            for request in batch:
+                metrics.EMBED_SERVER_WAIT_SECONDS.observe(now - request.enqueued, model=self.name)
+            metrics.EMBED_SERVER_BATCH_SIZE.observe(len(texts), model=self.name)
+            try:
+                vectors = self._encode_direct(texts)
+                offset = 0
+                for request in batch:
+                    request.future.set_result(vectors[offset:offset + len(request.texts)])
+                    offset += len(request.texts)
+            except Exception as e:
+                logger.error(f"嵌入服务编码失败 ({self.name}): {str(e)}")
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+
+
+def _load_config() -> Dict:
+    try:
+        from src.core.settings import read_settings
+        return (read_settings() or {}).get("embedding_server", {})
+    except Exception:
+        return {}
+
+
+def model_key(backend: str, path: str, device: str = "cpu", **options) -> tuple:
+    """生成共享模型的键；值为 None/False 的选项不参与区分，使默认配置的调用方共用一份模型"""
+    return (backend, str(path), device, tuple(sorted((k, v) for k, v in options.items() if v)))
+
+
+def get_shared_model(key: Hashable, loader: Callable[[], Any]):
+    """返回 key 对应的共享模型，尚未加载或已被回收时调用 loader 加载
+
+    Args:
+        key: 标识一份模型的键，通常由 model_key 生成
+        loader: 无参函数，返回具有 encode 方法的模型
+    """
+    with _registry_lock:
+        model = _models.get(key)
+        if model is None:
+            metrics.CACHE_REQUESTS_TOTAL.inc(cache="shared_model", result="miss")
+            model = loader()
+            _models[key] = model
+            logger.info(f"已加载共享模型: {key}")
+        else:
+            metrics.CACHE_REQUESTS_TOTAL.inc(cache="shared_model", result="hit")
+        return model
+
+
+def get_embedding_server(key: Hashable, loader: Callable[[], Any], name: Optional[str] = None) -> EmbeddingServer:
+    """返回 key 对应模型的共享 EmbeddingServer
+
+    调用方应持有返回的服务（例如保存其 encode 方法），只要仍有持有者就不会重复加载模型。
+    """
+    server = _servers.get(key)
+    if server is not None:
+        return server
+    model = get_shared_model(key, loader)
+    with _registry_lock:
+        server = _servers.get(key)
+        if server is None:
+            server = EmbeddingServer(model, name or str(key), _load_config())
+            _servers[key] = server
+        return server
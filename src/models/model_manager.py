@@ -1,8 +1,26 @@
 import os
 import json
 from typing import Dict, List, Optional, Union, Any
-import logging
+import time
 from sentence_transformers import SentenceTransformer
+from src.core import metrics
+from src.core.logger import Logger
+from src.models.embedding_scheduler import EmbeddingScheduler
+from src.models.embedding_server import get_embedding_server, model_key
+
+logger = Logger.get_logger("models")
+
+def resolve_local_model(name: str, models_dir: str = "models") -> str:
+    """模型市场下载的模型返回本地目录，否则原样返回（Hugging Face 模型 ID 或路径）"""
+    try:
+        with open(os.path.join(models_dir, "models_info.json"), "r", encoding="utf-8") as f:
+            info = json.load(f).get(name)
+        if info and os.path.isdir(os.path.join(models_dir, info["path"])):
+            return os.path.join(models_dir, info["path"])
+    except (OSError, ValueError):
+        pass
+    return name
+
 
 class ModelRegistry:
     """Model registry, manages all available embedding and rerank models"""
@@ -39,7 +57,7 @@ class ModelRegistry:
                 self.active_embedding_model = "all-MiniLM-L6-v2"
                 self.save_models_config()
         except Exception as e:
-            logging.error(f"Failed to load model configuration: {str(e)}")
+            logger.error(f"Failed to load model configuration: {str(e)}")
             raise
     
     def save_models_config(self):
@@ -86,10 +104,54 @@ class ModelRegistry:
 class EmbeddingService:
     """嵌入服务，负责文本向量化"""
     
-    def __init__(self, model_registry: ModelRegistry):
+    def __init__(self, model_registry: ModelRegistry, backend: str = "torch", device: str = "cpu",
+                 num_threads: Optional[int] = None, use_fp16: bool = False, quantize: bool = False,
+                 settings: Optional[Dict] = None):
+        """
+        Args:
+            model_registry: 模型注册表
+            backend: "torch" 使用 SentenceTransformer，"onnx" 使用 onnxruntime
+            device: torch 后端的运行设备
+            num_threads: CPU 线程数（torch 线程数或 onnxruntime intra-op 线程数）
+            use_fp16: torch 后端在 GPU 上使用半精度
+            quantize: onnx 后端使用 int8 动态量化模型
+            settings: 完整设置，用于 "embedding_scheduler" 节；None 时读取 settings.json
+        """
         self.model_registry = model_registry
+        self.backend = backend
+        self.device = device
+        self.num_threads = num_threads
+        self.use_fp16 = use_fp16
+        self.quantize = quantize
+        self.settings = settings
         self.model = None
+        self.server = None
+        self.scheduler = None
+        self.dimension = None
         self.load_active_model()
+
+    @classmethod
+    def from_settings(cls, model_registry: ModelRegistry, settings: Optional[Dict]) -> "EmbeddingService":
+        """根据 settings.json 中 "models" 节（模型设置对话框保存的内容）创建服务
+
+        对话框中选择的模型优先于注册表中的活动模型（只在内存中切换，不改写注册表文件）。
+        """
+        model_settings = (settings or {}).get("models", {})
+        advanced = model_settings.get("advanced", {})
+        name = model_settings.get("embedding", {}).get("model")
+        if name:
+            if name not in model_registry.embedding_models:
+                model_registry.embedding_models[name] = {"name": name, "path": resolve_local_model(name)}
+            model_registry.active_embedding_model = name
+        return cls(
+            model_registry,
+            backend=advanced.get("backend", "torch"),
+            device=model_settings.get("embedding", {}).get("device", "cpu"),
+            num_threads=advanced.get("num_threads"),
+            use_fp16=advanced.get("use_fp16", False),
+            quantize=advanced.get("quantize", False),
+            settings=settings
+        )
     
     def load_active_model(self):
         """加载当前活动的embedding模型"""
@@ -102,11 +164,42 @@ class EmbeddingService:
         if not model_info:
             raise ValueError(f"找不到模型: {self.model_registry.active_embedding_model}")
         
+        if self.backend == "onnx":
+            key = model_key("onnx", model_info["path"], quantize=self.quantize, num_threads=self.num_threads)
+        else:
+            key = model_key("torch", model_info["path"], self.device,
+                            fp16=self.use_fp16 and self.device.startswith("cuda"))
+
+        def loader():
+            start = time.perf_counter()
+            if self.backend == "onnx":
+                from src.models.onnx_backend import OnnxEmbeddingBackend
+                model = OnnxEmbeddingBackend(
+                    model_info["path"],
+                    quantize=self.quantize,
+                    num_threads=self.num_threads
+                ).load()
+            else:
+                if self.num_threads:
+                    import torch
+                    torch.set_num_threads(self.num_threads)
+                model = SentenceTransformer(model_info["path"], device=self.device)
+                if self.use_fp16 and self.device.startswith("cuda"):
+                    model.half()
+            metrics.MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, service="embedding", backend=self.backend)
+            return model
+
         try:
-            self.model = SentenceTransformer(model_info["path"])
-            logging.info(f"已加载embedding模型: {model_info['name']}")
+            # 同一模型在进程内只加载一份，编码请求与其他组件合批
+            self.server = get_embedding_server(key, loader, name=model_info["name"])
+            self.model = self.server.model
+            self.dimension = model_info.get("dimension") or self.model.get_sentence_embedding_dimension()
+            # 批量编码经调度器按长度分桶、自适应批大小；CPU 上的 torch 模型可分散到编码进程
+            pool_model = model_info["path"] if self.backend == "torch" and self.device == "cpu" else None
+            self.scheduler = EmbeddingScheduler.from_settings(self.server.encode, self.settings, model_path=pool_model)
+            logger.info(f"已加载embedding模型: {model_info['name']} (后端: {self.backend})")
         except Exception as e:
-            logging.error(f"加载embedding模型失败: {str(e)}")
+            logger.error(f"加载embedding模型失败: {str(e)}")
             raise
     
     def embed_text(self, text: Union[str, List[str]]) -> Union[List[float], List[List[float]]]:
@@ -115,10 +208,15 @@ class EmbeddingService:
             self.load_active_model()
         
         try:
-            embeddings = self.model.encode(text)
-            return embeddings.tolist()
+            with metrics.EMBED_SECONDS.time(source="embedding_service"):
+                if isinstance(text, str):
+                    embeddings = self.server.encode([text])[0]
+                else:
+                    embeddings = self.scheduler.encode(text)
+            metrics.EMBED_TEXTS_TOTAL.inc(1 if isinstance(text, str) else len(text), source="embedding_service")
+            return embeddings.tolist() if hasattr(embeddings, "tolist") else list(embeddings)
         except Exception as e:
-            logging.error(f"文本向量化失败: {str(e)}")
+            logger.error(f"文本向量化失败: {str(e)}")
             raise
 
 class RerankService:
@@ -143,11 +241,13 @@ class RerankService:
             # 根据模型类型加载不同的模型实现
             # 这里仅为示例，实际实现可能需要根据具体模型类型调整
             from sentence_transformers import CrossEncoder
+            start = time.perf_counter()
             self.model = CrossEncoder(model_info["path"])
-            logging.info(f"已加载rerank模型: {model_info['name']}")
+            metrics.MODEL_LOAD_SECONDS.observe(time.perf_counter() - start, service="rerank", backend="torch")
+            logger.info(f"已加载rerank模型: {model_info['name']}")
             return self.model
         except Exception as e:
-            logging.error(f"加载rerank模型失败: {str(e)}")
+            logger.error(f"加载rerank模型失败: {str(e)}")
             return None
     
     def rerank(self, query: str, documents: List[str], scores: List[float] = None) -> List[Dict[str, Any]]:
@@ -163,7 +263,8 @@ class RerankService:
             # Create pairs for each document and query
             pairs = [[query, doc] for doc in documents]
             # Calculate relevance scores
-            rerank_scores = self.model.predict(pairs)
+            with metrics.RERANK_SECONDS.time():
+                rerank_scores = self.model.predict(pairs)
             
             # Combine documents and scores, sort by score
             results = [{"text": doc, "score": float(score)} 
@@ -172,7 +273,7 @@ class RerankService:
             
             return results
         except Exception as e:
-            logging.error(f"Reranking failed: {str(e)}")
+            logger.error(f"Reranking failed: {str(e)}")
             # Return original order
             return [{"text": doc, "score": scores[i] if scores else 0} 
                     for i, doc in enumerate(documents)]
@@ -0,0 +1,191 @@
+import re
+import json
+from pathlib import Path
+from typing import List, Optional, Union
+import numpy as np
+from src.core import metrics
+from src.core.logger import Logger
+
+# onnxruntime 为可选依赖，只有选择 ONNX 后端时才需要安装
+try:
+    import onnxruntime as ort
+except ImportError:
+    ort = None
+
+logger = Logger.get_logger("models")
+
+
+class OnnxEmbeddingBackend:
+    """ONNX Runtime embedding backend for CPU-only machines
+
+    On first use the SentenceTransformer model is exported to ONNX (optionally
+    dynamically quantized to int8) and cached under models/onnx/<model>/ together
+    with its tokenizer and pooling settings. Later runs load the cached artefact
+    directly. `encode` mirrors SentenceTransformer.encode and returns an ndarray.
+    """
+
+    META_FILE = "export_meta.json"
+
+    def __init__(self, model_path: str, cache_dir: str = "models/onnx", quantize: bool = False,
+                 num_threads: Optional[int] = None, max_length: Optional[int] = None):
+        """
+        Args:
+            model_path: SentenceTransformer model name or local path
+            cache_dir: Directory holding exported ONNX models
+            quantize: Use the dynamically quantized int8 model
+            num_threads: onnxruntime intra-op threads, None lets onnxruntime decide
+            max_length: Maximum token sequence length, None uses the model's max_seq_length
+                recorded at export so vectors match the sentence-transformers backend
+        """
+        if ort is None:
+            raise ImportError("使用 ONNX 后端需要安装 onnxruntime: pip install onnxruntime")
+        self.model_path = model_path
+        self.quantize = quantize
+        self.num_threads = num_threads
+        self.max_length = max_length
+        safe_name = re.sub(r"[^\w.-]+", "_", model_path.strip("/\\"))
+        self.export_dir = Path(cache_dir) / safe_name
+        self.session = None
+        self.tokenizer = None
+        self.meta = None
+
+    @classmethod
+    def from_registry(cls, model_registry, **kwargs) -> "OnnxEmbeddingBackend":
+        """Create a backend for the registry's active embedding model"""
+        model_info = model_registry.embedding_models.get(model_registry.active_embedding_model)
+        if not model_info:
+            raise ValueError(f"找不到模型: {model_registry.active_embedding_model}")
+        return cls(model_info["path"], **kwargs)
+
+    @property
+    def onnx_file(self) -> Path:
+        return self.export_dir / ("model.int8.onnx" if self.quantize else "model.onnx")
+
+    def export(self) -> Path:
+        """Export (and quantize) the model if no cached artefact exists, returns the ONNX file"""
+        fp32_file = self.export_dir / "model.onnx"
+        cached = self.onnx_file.exists() and (self.export_dir / self.META_FILE).exists()
+        metrics.CACHE_REQUESTS_TOTAL.inc(cache="onnx_export", result="hit" if cached else "miss")
+        if not fp32_file.exists() or not (self.export_dir / self.META_FILE).exists():
+            self._export_fp32(fp32_file)
+        if self.quantize and not self.onnx_file.exists():
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            logger.info(f"正在量化 ONNX 模型为 int8: {self.onnx_file}")
+            quantize_dynamic(str(fp32_file), str(self.onnx_file), weight_type=QuantType.QInt8)
+        return self.onnx_file
+
+    def _export_fp32(self, onnx_file: Path):
+        import torch
+        from sentence_transformers import SentenceTransformer
+        from sentence_transformers.models import Normalize
+
+        logger.info(f"正在导出 ONNX 模型: {self.model_path} -> {onnx_file}")
+        st_model = SentenceTransformer(self.model_path, device="cpu")
+        transformer = st_model[0]
+        pooling = st_model[1] if len(st_model) > 1 else None
+        self.export_dir.mkdir(parents=True, exist_ok=True)
+        transformer.tokenizer.save_pretrained(str(self.export_dir))
+
+        encoded = transformer.tokenizer(["export sample"], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in encoded]
+
+        class _Wrapper(torch.nn.Module):
+            def __init__(self, model):
+                super().__init__()
+                self.model = model
+
+            def forward(self, *inputs):
+                return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+        with torch.no_grad():
+            torch.onnx.export(
+                _Wrapper(transformer.auto_model.eval()),
+                tuple(encoded[name] for name in input_names),
+                str(onnx_file),
+                input_names=input_names,
+                output_names=["last_hidden_state"],
+                dynamic_axes=dynamic_axes,
+                opset_version=14
+            )
+
+        meta = {
+            "model_path": self.model_path,
+            "input_names": input_names,
+            "pooling": "cls" if pooling is not None and getattr(pooling, "pooling_mode_cls_token", False) else "mean",
+            "normalize": any(isinstance(module, Normalize) for module in st_model),
+            "dimension": st_model.get_sentence_embedding_dimension(),
+            "max_seq_length": self._max_seq_length(st_model)
+        }
+        with open(self.export_dir / self.META_FILE, "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+
+    @staticmethod
+    def _max_seq_length(st_model) -> int:
+        """SentenceTransformer 截断输入的长度；未设置时使用分词器的上限"""
+        return int(st_model.max_seq_length or st_model[0].tokenizer.model_max_length)
+
+    def _complete_meta(self):
+        """旧版本导出的 export_meta.json 没有 max_seq_length，从原模型补上，不必重新导出"""
+        from sentence_transformers import SentenceTransformer
+        self.meta["max_seq_length"] = self._max_seq_length(SentenceTransformer(self.model_path, device="cpu"))
+        with open(self.export_dir / self.META_FILE, "w", encoding="utf-8") as f:
+            json.dump(self.meta, f, ensure_ascii=False, indent=2)
+
+    def load(self):
+        """Load the cached ONNX model into an inference session"""
+        from transformers import AutoTokenizer
+
+        onnx_file = self.export()
+        with open(self.export_dir / self.META_FILE, "r", encoding="utf-8") as f:
+            self.meta = json.load(f)
+        if "max_seq_length" not in self.meta:
+            self._complete_meta()
+        if self.max_length is None:
+            self.max_length = self.meta["max_seq_length"]
+        self.tokenizer = AutoTokenizer.from_pretrained(str(self.export_dir))
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if self.num_threads:
+            options.intra_op_num_threads = self.num_threads
+        self.session = ort.InferenceSession(str(onnx_file), options, providers=["CPUExecutionProvider"])
+        logger.info(f"已加载 ONNX 模型: {onnx_file}")
+        return self
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self.meta is None:
+            self.load()
+        return self.meta["dimension"]
+
+    def encode(self, sentences: Union[str, List[str]], batch_size: int = 32) -> np.ndarray:
+        """Encode sentences into embeddings, like SentenceTransformer.encode"""
+        if self.session is None:
+            self.load()
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        outputs = []
+        for start in range(0, len(texts), batch_size):
+            encoded = self.tokenizer(
+                texts[start:start + batch_size],
+                padding=True,
+                truncation=True,
+                max_length=self.max_length,
+                return_tensors="np"
+            )
+            feeds = {name: encoded[name].astype(np.int64) for name in self.meta["input_names"]}
+            hidden = self.session.run(None, feeds)[0]
+            outputs.append(self._pool(hidden, feeds["attention_mask"]))
+        embeddings = np.concatenate(outputs) if outputs else np.zeros((0, self.meta["dimension"]), dtype=np.float32)
+        return embeddings[0] if single else embeddings
+
+    def _pool(self, hidden: np.ndarray, attention_mask: np.ndarray) -> np.ndarray:
+        if self.meta["pooling"] == "cls":
+            pooled = hidden[:, 0]
+        else:
+            mask = attention_mask[..., None].astype(hidden.dtype)
+            pooled = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        if self.meta["normalize"]:
+            pooled = pooled / np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+        return pooled.astype(np.float32)
@@ -1,69 +1,184 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QTableWidget, QTableWidgetItem,
+    QPushButton, QTableView,
     QMessageBox, QProgressBar, QComboBox,
     QFileDialog, QCheckBox
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from pathlib import Path
 import os
-from src.core.document_processor import DocumentProcessor
+import threading
+import time
+from src.core.document_processor import DocumentProcessor, available_extensions, file_dialog_filter, iter_batches
+from src.core.logger import Logger
+from src.core.profiler import profiled
+from .table_models import ImportFileModel, ProgressBarDelegate
+
+# Chunks passed to VectorStore.add_texts per call
+ADD_BATCH_SIZE = 64
+
+logger = Logger.get_logger("ui")
+
+
+class ProgressThrottle:
+    """Coalesces progress updates so at most max_per_second are emitted
+
+    A value held back by the throttle is emitted by a trailing timer once the
+    interval has passed, so the last update is never lost when updates stop.
+    The worker's run() has no Qt event loop, so a threading.Timer is used
+    rather than a QTimer; emitting a signal from it is queued to the GUI thread
+    like any other cross-thread emit.
+    """
+
+    def __init__(self, emit, max_per_second: float = 10):
+        self.emit = emit
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0.0
+        self.last_emit = 0.0
+        self.pending = None
+        self._timer = None
+        self._lock = threading.Lock()
+
+    def _merge(self, pending, args):
+        """Combine a held-back value with a newer one, the newer value wins"""
+        return args
+
+    def update(self, *args):
+        """Record the latest value, emitting it only if the interval has elapsed"""
+        with self._lock:
+            now = time.monotonic()
+            if self.pending is None and now - self.last_emit >= self.interval:
+                self.last_emit = now
+            else:
+                self.pending = self._merge(self.pending, args)
+                if self._timer is None:
+                    self._timer = threading.Timer(max(0.0, self.last_emit + self.interval - now), self.flush)
+                    self._timer.daemon = True
+                    self._timer.start()
+                return
+        self.emit(*args)
+
+    def flush(self):
+        """Emit the last coalesced value, if any"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self.pending is None:
+                return
+            args, self.pending = self.pending, None
+            self.last_emit = time.monotonic()
+        self.emit(*args)
+
+
+class StatusThrottle(ProgressThrottle):
+    """Collects per-row status changes and emits them together as {row: status}"""
+
+    def _merge(self, pending, args):
+        statuses = pending[0] if pending is not None else {}
+        statuses.update(args[0])
+        return (statuses,)
+
+    def set(self, row: int, status: str):
+        self.update({row: status})
+
 
 class BatchImportWorker(QThread):
-    progress = pyqtSignal(int, str)  # Progress value, current processing file
-    file_progress = pyqtSignal(int)  # Single file processing progress
+    progress = pyqtSignal(int, int)  # Total progress value, row of current file
+    file_progress = pyqtSignal(int, int)  # Row, single file processing progress (throttled)
+    file_statuses = pyqtSignal(dict)  # {row: status text} (throttled)
+    throughput = pyqtSignal(float, float)  # Embedding chunks/sec, tokens/sec (throttled)
     finished = pyqtSignal()
     error = pyqtSignal(str)
 
-    def __init__(self, files, collection_name, store):
+    def __init__(self, files, collection_name, store, max_updates_per_second: float = 10):
         super().__init__()
-        self.files = files
+        self.files = list(files)
         self.collection_name = collection_name
         self.store = store
         self.is_cancelled = False
         self.processor = DocumentProcessor()
+        self.max_updates_per_second = max_updates_per_second
+        self.conversions = []
 
+    @profiled("batch_import_worker.run")
     def run(self):
         try:
             total = len(self.files)
-            for i, file in enumerate(self.files, 1):
-                if self.is_cancelled:
-                    break
-                
-                # Update total progress and current file
-                self.progress.emit(int(i * 100 / total), file)
-                
-                try:
-                    # Process document
-                    chunks = self.processor.process_document(
-                        file,
-                        progress_callback=self.file_progress.emit
-                    )
-                    
-                    # Save chunks to vector database
-                    for j, chunk in enumerate(chunks):
-                        if self.is_cancelled:
-                            break
-                        # 只在处理第一个块时设置is_first_chunk为True
-                        self.store.add_texts(self.collection_name, [chunk], is_first_chunk=(j == 0))
-                    
-                except Exception as e:
-                    print(f"Failed to process file: {file}, error: {str(e)}")
-                    continue
+            # Total progress and per-file progress are throttled independently
+            total_throttle = ProgressThrottle(self.progress.emit, self.max_updates_per_second)
+            file_throttle = ProgressThrottle(self.file_progress.emit, self.max_updates_per_second)
+            status_throttle = StatusThrottle(self.file_statuses.emit, self.max_updates_per_second)
+            # Report embedding throughput if the store's embedder supports listeners
+            throughput_throttle = ProgressThrottle(self.throughput.emit, self.max_updates_per_second)
+            listener = lambda stats: throughput_throttle.update(stats["chunks_per_sec"], stats["tokens_per_sec"])
+            embedder = self.store.embedder
+            if hasattr(embedder, "add_listener"):
+                embedder.reset_stats()
+                embedder.add_listener(listener)
+            try:
+                self.import_files(total, total_throttle, file_throttle, status_throttle)
+            finally:
+                file_throttle.flush()
+                status_throttle.flush()
+                if hasattr(embedder, "remove_listener"):
+                    embedder.remove_listener(listener)
+                throughput_throttle.flush()
                 
+            total_throttle.flush()
             if not self.is_cancelled:
+                self.progress.emit(100, total - 1)
                 self.finished.emit()
         except Exception as e:
             self.error.emit(str(e))
 
+    def import_files(self, total, total_throttle, file_throttle, status_throttle):
+        """Parse each file and add its chunks to the store in batches"""
+        # Legacy office files are converted in parallel ahead of the import loop
+        self.conversions = self.processor.prefetch(self.files)
+        for row, file in enumerate(self.files):
+            if self.is_cancelled:
+                break
+            
+            # Update total progress and current file
+            total_throttle.update(int(row * 100 / total), row)
+            status_throttle.set(row, "Processing")
+            
+            try:
+                # Process document; large line-oriented files are parsed while their chunks are stored
+                chunks = self.processor.iter_chunks(
+                    file,
+                    progress_callback=lambda value, row=row: file_throttle.update(row, value)
+                )
+                
+                # Save chunks to vector database, a batch at a time so the embedder can batch them
+                for j, batch in enumerate(iter_batches(chunks, ADD_BATCH_SIZE)):
+                    if self.is_cancelled:
+                        break
+                    # 只在处理第一批时设置is_first_chunk为True
+                    self.store.add_texts(self.collection_name, batch, is_first_chunk=(j == 0))
+                
+                # Completed rows are drawn at 100% by the model, so this may be coalesced
+                file_throttle.update(row, 100)
+                status_throttle.set(row, "Cancelled" if self.is_cancelled else "Completed")
+            except Exception as e:
+                logger.error(f"Failed to process file: {file}, error: {str(e)}")
+                status_throttle.set(row, "Failed")
+                continue
+
     def cancel(self):
         self.is_cancelled = True
+        for future in self.conversions:
+            future.cancel()
 
 class BatchImportDialog(QDialog):
-    def __init__(self, parent=None):
+    def __init__(self, parent=None, store=None):
         super().__init__(parent)
-        self.files = []
+        # Use the given store, falling back to the main window's store
+        self.store = store if store is not None else getattr(parent, "store", None)
         self.worker = None
+        self.file_model = ImportFileModel(self.format_size, self)
+        # The model owns the file list
+        self.files = self.file_model.files
         self.init_ui()
 
     def init_ui(self):
@@ -75,17 +190,22 @@ class BatchImportDialog(QDialog):
         kb_layout = QHBoxLayout()
         kb_label = QLabel("Target Knowledge Base:")
         self.kb_combo = QComboBox()
-        self.kb_combo.addItems(["Default Knowledge Base", "Knowledge Base 1", "Knowledge Base 2"])  # This should get from actual knowledge base list
+        if self.store is not None:
+            self.kb_combo.addItems(self.store.get_collections())
+        else:
+            self.kb_combo.addItems(["Default Knowledge Base", "Knowledge Base 1", "Knowledge Base 2"])  # This should get from actual knowledge base list
         kb_layout.addWidget(kb_label)
         kb_layout.addWidget(self.kb_combo)
         kb_layout.addStretch()
         layout.addLayout(kb_layout)
 
-        # File list
-        self.file_table = QTableWidget()
-        self.file_table.setColumnCount(5)
-        self.file_table.setHorizontalHeaderLabels(["Filename", "Size", "Type", "Status", "Progress"])
+        # File list, progress column is painted by a delegate rather than per-row widgets
+        self.file_table = QTableView()
+        self.file_table.setModel(self.file_model)
+        self.file_table.setItemDelegateForColumn(ImportFileModel.PROGRESS_COLUMN, ProgressBarDelegate(self.file_table))
         self.file_table.horizontalHeader().setStretchLastSection(True)
+        # Uniform row heights let the view skip measuring every row
+        self.file_table.verticalHeader().setDefaultSectionSize(24)
         layout.addWidget(self.file_table)
 
         # Options
@@ -122,6 +242,11 @@ class BatchImportDialog(QDialog):
         self.current_file_label.hide()
         layout.addWidget(self.current_file_label)
 
+        # Embedding throughput label
+        self.throughput_label = QLabel()
+        self.throughput_label.hide()
+        layout.addWidget(self.throughput_label)
+
         # Buttons
         button_layout = QHBoxLayout()
         
@@ -155,7 +280,7 @@ class BatchImportDialog(QDialog):
             self,
             "Select Files",
             "",
-            "Document Files (*.txt *.pdf *.doc *.docx);;All Files (*.*)"
+            file_dialog_filter()
         )
         
         if files:
@@ -169,17 +294,18 @@ class BatchImportDialog(QDialog):
         )
         
         if folder:
+            extensions = available_extensions()
             files = []
             if self.recursive_check.isChecked():
                 # Recursively traverse folder
                 for root, _, filenames in os.walk(folder):
                     for filename in filenames:
-                        if filename.endswith(('.txt', '.pdf', '.doc', '.docx')):
+                        if Path(filename).suffix.lower() in extensions:
                             files.append(os.path.join(root, filename))
             else:
                 # Only traverse current folder
                 for filename in os.listdir(folder):
-                    if filename.endswith(('.txt', '.pdf', '.doc', '.docx')):
+                    if Path(filename).suffix.lower() in extensions:
                         files.append(os.path.join(folder, filename))
             
             if files:
@@ -189,37 +315,11 @@ class BatchImportDialog(QDialog):
 
     def add_files_to_list(self, files):
         """Add files to list"""
-        for file in files:
-            if file not in self.files:
-                self.files.append(file)
-                path = Path(file)
-                row = self.file_table.rowCount()
-                self.file_table.insertRow(row)
-                
-                # Filename
-                self.file_table.setItem(row, 0, QTableWidgetItem(path.name))
-                
-                # File size
-                size = path.stat().st_size
-                size_str = self.format_size(size)
-                self.file_table.setItem(row, 1, QTableWidgetItem(size_str))
-                
-                # File type
-                self.file_table.setItem(row, 2, QTableWidgetItem(path.suffix[1:].upper()))
-                
-                # Status
-                self.file_table.setItem(row, 3, QTableWidgetItem("Pending"))
-                
-                # Progress
-                progress_bar = QProgressBar()
-                progress_bar.setRange(0, 100)
-                progress_bar.setValue(0)
-                self.file_table.setCellWidget(row, 4, progress_bar)
+        self.file_model.add_files(files)
 
     def clear_files(self):
         """Clear file list"""
-        self.files.clear()
-        self.file_table.setRowCount(0)
+        self.file_model.clear()
 
     def start_import(self):
         """Start importing"""
@@ -236,48 +336,31 @@ class BatchImportDialog(QDialog):
         self.current_file_label.show()
         
         # Update all file status to pending
-        for row in range(self.file_table.rowCount()):
-            self.file_table.setItem(row, 3, QTableWidgetItem("Pending"))
-            progress_bar = self.file_table.cellWidget(row, 4)
-            if progress_bar:
-                progress_bar.setValue(0)
+        self.file_model.reset_progress()
 
         self.worker = BatchImportWorker(self.files, self.kb_combo.currentText(), self.store)
         self.worker.progress.connect(self.update_progress)
         self.worker.file_progress.connect(self.update_file_progress)
+        self.worker.file_statuses.connect(self.file_model.set_statuses)
+        self.worker.throughput.connect(self.update_throughput)
         self.worker.finished.connect(self.import_finished)
         self.worker.error.connect(self.import_error)
         self.worker.start()
 
-    def update_progress(self, progress: int, current_file: str):
+    def update_progress(self, progress: int, row: int):
         """Update total progress"""
         self.total_progress.setValue(progress)
-        self.current_file_label.setText(f"Processing: {current_file}")
-        
-        # Update file status
-        for row in range(self.file_table.rowCount()):
-            file_name = self.file_table.item(row, 0).text()
-            if Path(current_file).name == file_name:
-                self.file_table.setItem(row, 3, QTableWidgetItem("Processing"))
-            elif progress > (row + 1) * 100 / self.file_table.rowCount():
-                self.file_table.setItem(row, 3, QTableWidgetItem("Completed"))
-                progress_bar = self.file_table.cellWidget(row, 4)
-                if progress_bar:
-                    progress_bar.setValue(100)
-
-    def update_file_progress(self, progress: int):
-        """Update file progress"""
+        self.current_file_label.setText(f"Processing: {self.files[row]}")
+
+    def update_file_progress(self, row: int, progress: int):
+        """Update file progress, only the affected row is repainted"""
         self.file_progress.setValue(progress)
-        
-        # Update current file progress bar
-        current_file = self.current_file_label.text().replace("Processing: ", "")
-        for row in range(self.file_table.rowCount()):
-            file_name = self.file_table.item(row, 0).text()
-            if current_file.endswith(file_name):
-                progress_bar = self.file_table.cellWidget(row, 4)
-                if progress_bar:
-                    progress_bar.setValue(progress)
-                break
+        self.file_model.set_progress(row, progress)
+
+    def update_throughput(self, chunks_per_sec: float, tokens_per_sec: float):
+        """Update embedding throughput"""
+        self.throughput_label.show()
+        self.throughput_label.setText(f"Embedding: {chunks_per_sec:.1f} chunks/s, {tokens_per_sec:.0f} tokens/s")
 
     def import_finished(self):
         """Import completed"""
@@ -287,15 +370,6 @@ class BatchImportDialog(QDialog):
         self.import_button.setEnabled(True)
         self.cancel_button.setText("Close")
         
-        # Update all unfinished files to completed
-        for row in range(self.file_table.rowCount()):
-            status = self.file_table.item(row, 3).text()
-            if status != "Completed":
-                self.file_table.setItem(row, 3, QTableWidgetItem("Completed"))
-                progress_bar = self.file_table.cellWidget(row, 4)
-                if progress_bar:
-                    progress_bar.setValue(100)
-        
         QMessageBox.information(self, "Success", "Document import completed")
 
     def import_error(self, error_msg: str):
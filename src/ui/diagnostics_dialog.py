@@ -0,0 +1,158 @@
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QLabel, QPushButton, QTableWidget,
+    QTableWidgetItem, QHeaderView, QSpinBox, QCheckBox, QFileDialog, QMessageBox,
+    QApplication
+)
+from PyQt6.QtCore import QTimer
+from src.core import metrics
+from src.core.logger import Logger
+from src.core.settings import read_settings, update_settings
+
+# 自动刷新间隔（毫秒）
+REFRESH_INTERVAL_MS = 2000
+
+
+def _format_seconds(value: float) -> str:
+    return f"{value * 1000:.2f} ms"
+
+
+class DiagnosticsDialog(QDialog):
+    """Shows the in-process metrics and controls the Prometheus endpoint"""
+
+    HEADERS = ["Metric", "Labels", "Count / Value", "Mean", "p50", "p95", "p99"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.logger = Logger.get_logger("ui")
+        self.registry = metrics.MetricsRegistry.get_registry()
+        self.setWindowTitle("Diagnostics")
+        self.resize(900, 500)
+        self.init_ui()
+        self.refresh()
+
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh)
+        self.timer.start(REFRESH_INTERVAL_MS)
+
+    def init_ui(self):
+        layout = QVBoxLayout(self)
+
+        self.table = QTableWidget()
+        self.table.setColumnCount(len(self.HEADERS))
+        self.table.setHorizontalHeaderLabels(self.HEADERS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.ResizeToContents)
+        self.table.horizontalHeader().setSectionResizeMode(1, QHeaderView.ResizeMode.Stretch)
+        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        layout.addWidget(self.table)
+
+        # Prometheus endpoint
+        config = {**metrics.DEFAULT_METRICS_SETTINGS, **(read_settings() or {}).get("metrics", {})}
+        endpoint_layout = QHBoxLayout()
+        endpoint_layout.addWidget(QLabel("Endpoint port:"))
+        self.port_input = QSpinBox()
+        self.port_input.setRange(1, 65535)
+        self.port_input.setValue(int(config["port"]))
+        endpoint_layout.addWidget(self.port_input)
+        self.endpoint_button = QPushButton()
+        self.endpoint_button.clicked.connect(self.toggle_endpoint)
+        endpoint_layout.addWidget(self.endpoint_button)
+        self.autostart_check = QCheckBox("Start at launch")
+        self.autostart_check.setChecked(bool(config["enabled"]))
+        self.autostart_check.toggled.connect(self.save_endpoint_settings)
+        endpoint_layout.addWidget(self.autostart_check)
+        self.endpoint_label = QLabel()
+        endpoint_layout.addWidget(self.endpoint_label, 1)
+        layout.addLayout(endpoint_layout)
+
+        button_layout = QHBoxLayout()
+        refresh_button = QPushButton("Refresh")
+        refresh_button.clicked.connect(self.refresh)
+        copy_button = QPushButton("Copy Prometheus Text")
+        copy_button.clicked.connect(self.copy_prometheus)
+        export_button = QPushButton("Export...")
+        export_button.clicked.connect(self.export_prometheus)
+        reset_button = QPushButton("Reset")
+        reset_button.clicked.connect(self.reset_metrics)
+        close_button = QPushButton("Close")
+        close_button.clicked.connect(self.accept)
+        for button in (refresh_button, copy_button, export_button, reset_button):
+            button_layout.addWidget(button)
+        button_layout.addStretch()
+        button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self.update_endpoint_state()
+
+    def _rows(self):
+        """One row per metric and label set"""
+        for metric in self.registry.metrics():
+            if isinstance(metric, metrics.Histogram):
+                seconds = metric.name.endswith("_seconds")
+                fmt = _format_seconds if seconds else (lambda value: f"{value:.1f}")
+                for row in metric.summary():
+                    yield (metric.name, row["labels"], str(row["count"]),
+                           fmt(row["mean"]), fmt(row["p50"]), fmt(row["p95"]), fmt(row["p99"]))
+            else:
+                for key, value in metric.samples():
+                    yield (metric.name, metric.label_dict(key), f"{value:g}", "", "", "", "")
+
+    def refresh(self):
+        rows = list(self._rows())
+        self.table.setRowCount(len(rows))
+        for i, (name, labels, *values) in enumerate(rows):
+            self.table.setItem(i, 0, QTableWidgetItem(name))
+            self.table.setItem(i, 1, QTableWidgetItem(", ".join(f"{k}={v}" for k, v in labels.items())))
+            for column, value in enumerate(values, 2):
+                self.table.setItem(i, column, QTableWidgetItem(value))
+
+    def update_endpoint_state(self):
+        server = metrics.get_server()
+        if server:
+            self.endpoint_button.setText("Stop Endpoint")
+            self.endpoint_label.setText(server.url)
+            self.port_input.setEnabled(False)
+        else:
+            self.endpoint_button.setText("Start Endpoint")
+            self.endpoint_label.setText("Endpoint stopped")
+            self.port_input.setEnabled(True)
+
+    def toggle_endpoint(self):
+        try:
+            if metrics.get_server():
+                metrics.stop_server()
+            else:
+                metrics.start_server(metrics.DEFAULT_METRICS_SETTINGS["host"], self.port_input.value())
+                self.save_endpoint_settings()
+        except OSError as e:
+            QMessageBox.critical(self, "Error", f"Failed to start metrics endpoint: {str(e)}")
+        self.update_endpoint_state()
+
+    def save_endpoint_settings(self):
+        try:
+            update_settings("metrics", {
+                "enabled": self.autostart_check.isChecked(),
+                "port": self.port_input.value()
+            })
+        except Exception as e:
+            self.logger.error(f"保存指标设置失败: {str(e)}")
+
+    def copy_prometheus(self):
+        QApplication.clipboard().setText(self.registry.to_prometheus())
+
+    def export_prometheus(self):
+        path, _ = QFileDialog.getSaveFileName(self, "Export Metrics", "metrics.prom", "Prometheus Text (*.prom *.txt)")
+        if not path:
+            return
+        try:
+            with open(path, "w", encoding="utf-8") as f:
+                f.write(self.registry.to_prometheus())
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Export failed: {str(e)}")
+
+    def reset_metrics(self):
+        self.registry.reset()
+        self.refresh()
+
+    def done(self, result):
+        self.timer.stop()
+        super().done(result)
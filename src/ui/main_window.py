@@ -4,19 +4,35 @@ from PyQt6.QtWidgets import (
     QTableWidget, QTableWidgetItem, QMessageBox,
     QTabWidget, QFileDialog, QSpinBox, QGroupBox,
     QFormLayout, QLineEdit, QProgressBar, QSplitter,
-    QInputDialog, QDialog, QHeaderView, QProgressDialog
+    QInputDialog, QDialog, QHeaderView, QProgressDialog,
+    QCheckBox, QDoubleSpinBox, QTableView
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QAction, QIcon
 import os
 from datetime import datetime
-from src.core.vector_store import VectorStore
-from src.core.document_processor import DocumentProcessor
+from src.core.vector_store import VectorStore, DEFAULT_TRANSPORT_SETTINGS
+from src.core.document_processor import DocumentProcessor, file_dialog_filter, iter_batches
 from src.ui.model_settings_dialog import ModelSettingsDialog
+from src.ui.diagnostics_dialog import DiagnosticsDialog
+from src.core import metrics
+from src.core.settings import read_settings, update_settings
 from src.core.logger import Logger
+from src.core.profiler import profiled
 from .style_manager import StyleManager
+from .table_models import ResultTableModel
+from .search_result_dialog import SearchResultDialog, results_from_hits
 import json
 
+# 搜索页知识库下拉框中表示“搜索全部知识库”的选项
+ALL_COLLECTIONS_LABEL = "All Knowledge Bases"
+
+# 搜索结果每页条数，滚动到底部时再取下一页
+RESULT_PAGE_SIZE = 20
+
+# 每次调用 add_texts 传入的块数
+ADD_BATCH_SIZE = 64
+
 class ImportWorker(QThread):
     progress = pyqtSignal(int)
     error = pyqtSignal(str)
@@ -33,19 +49,32 @@ class ImportWorker(QThread):
     def stop(self):
         self._is_running = False
         
+    @profiled("import_worker.run")
     def run(self):
         try:
-            # Process document
-            chunks = self.processor.process_document(self.file_path)
+            # Process document; large line-oriented files are read while importing,
+            # progress then follows the bytes read
+            if self.processor.is_streaming(self.file_path):
+                chunks = self.processor.iter_chunks(
+                    self.file_path, progress_callback=lambda value: self.progress.emit(min(value, 99))
+                )
+                total = None
+            else:
+                chunks = self.processor.process_document(self.file_path)
+                total = len(chunks)
             
-            # Import to vector storage
-            total = len(chunks)
-            for i, chunk in enumerate(chunks):
+            # Import to vector storage in batches so the embedder can batch them
+            done = 0
+            for i, batch in enumerate(iter_batches(chunks, ADD_BATCH_SIZE)):
                 if not self._is_running:
                     break
-                # Only set is_first_chunk to True when processing the first chunk
-                self.store.add_texts(self.collection_name, [chunk], is_first_chunk=(i == 0))
-                self.progress.emit(int((i + 1) / total * 100))
+                # Only set is_first_chunk to True when processing the first batch
+                self.store.add_texts(self.collection_name, batch, is_first_chunk=(i == 0))
+                done += len(batch)
+                if total:
+                    self.progress.emit(int(done / total * 100))
+            if total is None and self._is_running:
+                self.progress.emit(100)
                 
             if self._is_running:
                 self.finished.emit()
@@ -65,6 +94,8 @@ class MainWindow(QMainWindow):
             # 初始化向量存储，不重置数据目录
             self.store = VectorStore(reset=False)
             self.processor = DocumentProcessor()
+            # settings.json 中启用时启动 Prometheus 指标端点
+            metrics.start_from_settings(read_settings())
             self.init_ui()
             self.init_menu()
             self.load_style()
@@ -136,6 +167,11 @@ class MainWindow(QMainWindow):
         qdrant_settings_action.triggered.connect(self.show_qdrant_settings)
         settings_menu.addAction(qdrant_settings_action)
 
+        # 诊断：性能指标与 Prometheus 端点
+        diagnostics_action = QAction('diagnostics', self)
+        diagnostics_action.triggered.connect(self.show_diagnostics)
+        settings_menu.addAction(diagnostics_action)
+
     def init_ui(self):
         self.setWindowTitle("V-knowledge")
         self.setMinimumSize(800, 600)
@@ -200,6 +236,7 @@ class MainWindow(QMainWindow):
         config_layout.addRow("Keywords:", self.search_input)
         
         self.kb_select = QComboBox()
+        self.kb_select.addItem(ALL_COLLECTIONS_LABEL)
         self.kb_select.addItems(self.store.get_collections())
         config_layout.addRow("Knowledge Base:", self.kb_select)
 
@@ -213,18 +250,31 @@ class MainWindow(QMainWindow):
         search_results = QGroupBox("Search Results")
         results_layout = QVBoxLayout(search_results)
         
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(3)
-        self.result_table.setHorizontalHeaderLabels(["Similarity", "Document", "Content"])
+        # Model/view table, further pages are fetched through the model as the user scrolls
+        self.result_model = ResultTableModel([
+            ("Similarity", lambda row: f"{row[0]:.4f}"),
+            ("Document", lambda row: row[1]),
+            ("Content", lambda row: row[2])
+        ], page_size=RESULT_PAGE_SIZE)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         self.result_table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         results_layout.addWidget(self.result_table)
         
         layout.addWidget(search_results)
 
-        # Export button
+        # Detail view and export buttons
+        buttons_layout = QHBoxLayout()
+        details_btn = QPushButton("View Details")
+        details_btn.clicked.connect(self.show_result_details)
+        buttons_layout.addWidget(details_btn)
         export_btn = QPushButton(QIcon(":/icons/export.png"), "Export Results")
         export_btn.clicked.connect(self.export_results)
-        results_layout.addWidget(export_btn)
+        buttons_layout.addWidget(export_btn)
+        results_layout.addLayout(buttons_layout)
+        self.result_table.doubleClicked.connect(self.show_result_details)
+        # 最近一次搜索的 (query, collection)，详情对话框按它重新分页查询
+        self.last_search = None
 
         return widget
 
@@ -301,7 +351,7 @@ class MainWindow(QMainWindow):
                 self,
                 "Select Document",
                 "",
-                "Document Files (*.txt *.pdf *.docx)"
+                file_dialog_filter()
             )
             
             if file_path:
@@ -377,6 +427,7 @@ class MainWindow(QMainWindow):
         try:
             # 更新知识库选择下拉框
             self.kb_select.clear()
+            self.kb_select.addItem(ALL_COLLECTIONS_LABEL)
             self.kb_select.addItems(self.store.get_collections())
             
             # 如果搜索框中有查询内容，重新执行搜索
@@ -406,12 +457,24 @@ class MainWindow(QMainWindow):
             self.logger.error(f"删除知识库失败: {str(e)}")
             QMessageBox.critical(self, "错误", f"删除知识库失败: {str(e)}")
 
+    def show_diagnostics(self):
+        """显示诊断面板"""
+        dialog = DiagnosticsDialog(self)
+        dialog.exec()
+
     def show_model_settings(self):
         """显示模型设置对话框"""
         dialog = ModelSettingsDialog(self)
         if dialog.exec() == QDialog.DialogCode.Accepted:
             settings = dialog.get_settings()
-            # TODO: 应用模型设置
+            # 保存到 settings.json，并按其中的模型、后端、线程数和精度重新创建 EmbeddingService
+            try:
+                all_settings = update_settings("models", settings)
+            except Exception as e:
+                self.logger.error(f"保存模型设置失败: {str(e)}")
+                QMessageBox.critical(self, "错误", f"保存模型设置失败: {str(e)}")
+                return
+            self.store.configure_embedder(all_settings)
             QMessageBox.information(self, "成功", "模型设置已更新！")
 
     def run_test(self):
@@ -454,21 +517,42 @@ class MainWindow(QMainWindow):
             return
         
         try:
-            results = self.store.search(query, collection)
-            
-            # Show results
-            self.result_table.setRowCount(len(results))
-            for i, (score, doc, content) in enumerate(results):
-                self.result_table.setItem(i, 0, QTableWidgetItem(f"{score:.4f}"))
-                self.result_table.setItem(i, 1, QTableWidgetItem(doc))
-                self.result_table.setItem(i, 2, QTableWidgetItem(content))
+            if collection == ALL_COLLECTIONS_LABEL:
+                # Federated search, prefix documents with their knowledge base
+                self.result_model.set_results(source=(
+                    (score, f"[{name}] {doc}", content)
+                    for score, doc, content, name in self.iter_hits(query, collection)
+                ))
+            else:
+                # Paged search, further pages are fetched as the user scrolls
+                self.result_model.set_results(source=self.iter_hits(query, collection))
+            self.last_search = (query, collection)
                 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Search failed: {str(e)}")
 
+    def iter_hits(self, query, collection):
+        """Paged hits of one knowledge base, or of all of them merged by score"""
+        if collection == ALL_COLLECTIONS_LABEL:
+            return self.store.iter_search_all(query, page_size=RESULT_PAGE_SIZE)
+        return self.store.iter_search(query, collection, page_size=RESULT_PAGE_SIZE)
+
+    def show_result_details(self, *args):
+        """Open the last search in the detail dialog, which pages through the hits on its own"""
+        if self.last_search is None:
+            QMessageBox.warning(self, "Warning", "Please search first!")
+            return
+        query, collection = self.last_search
+        dialog = SearchResultDialog(
+            query, [], self,
+            results_iter=results_from_hits(self.iter_hits(query, collection)),
+            page_size=RESULT_PAGE_SIZE
+        )
+        dialog.exec()
+
     def export_results(self):
         """Export search results"""
-        if self.result_table.rowCount() == 0:
+        if self.result_model.rowCount() == 0:
             QMessageBox.warning(self, "Warning", "No search results to export!")
             return
             
@@ -485,18 +569,12 @@ class MainWindow(QMainWindow):
                     if file_path.endswith(".csv"):
                         # Export CSV
                         f.write("Similarity,Document,Content\n")
-                        for i in range(self.result_table.rowCount()):
-                            score = self.result_table.item(i, 0).text()
-                            doc = self.result_table.item(i, 1).text()
-                            content = self.result_table.item(i, 2).text()
-                            f.write(f"{score},{doc},{content}\n")
+                        for score, doc, content in self.result_model.rows:
+                            f.write(f"{score:.4f},{doc},{content}\n")
                     else:
                         # Export text
-                        for i in range(self.result_table.rowCount()):
-                            score = self.result_table.item(i, 0).text()
-                            doc = self.result_table.item(i, 1).text()
-                            content = self.result_table.item(i, 2).text()
-                            f.write(f"Similarity: {score}\n")
+                        for score, doc, content in self.result_model.rows:
+                            f.write(f"Similarity: {score:.4f}\n")
                             f.write(f"Document: {doc}\n")
                             f.write(f"Content: {content}\n")
                             f.write("-" * 50 + "\n")
@@ -529,6 +607,32 @@ class MainWindow(QMainWindow):
         port_input.setValue(6333)
         layout.addRow("serverPort:", port_input)
         
+        # 传输设置：gRPC、连接池、超时与重试
+        grpc_check = QCheckBox("preferGrpc")
+        grpc_check.setChecked(DEFAULT_TRANSPORT_SETTINGS["prefer_grpc"])
+        layout.addRow("transport:", grpc_check)
+        
+        grpc_port_input = QSpinBox()
+        grpc_port_input.setRange(1, 65535)
+        grpc_port_input.setValue(DEFAULT_TRANSPORT_SETTINGS["grpc_port"])
+        layout.addRow("grpcPort:", grpc_port_input)
+        
+        pool_size_input = QSpinBox()
+        pool_size_input.setRange(1, 64)
+        pool_size_input.setValue(DEFAULT_TRANSPORT_SETTINGS["pool_size"])
+        layout.addRow("connectionPoolSize:", pool_size_input)
+        
+        timeout_input = QDoubleSpinBox()
+        timeout_input.setRange(1.0, 600.0)
+        timeout_input.setSuffix(" s")
+        timeout_input.setValue(DEFAULT_TRANSPORT_SETTINGS["timeout"])
+        layout.addRow("timeout:", timeout_input)
+        
+        retries_input = QSpinBox()
+        retries_input.setRange(0, 10)
+        retries_input.setValue(DEFAULT_TRANSPORT_SETTINGS["retries"])
+        layout.addRow("retries:", retries_input)
+        
         # 按钮
         button_box = QHBoxLayout()
         save_button = QPushButton("save")
@@ -549,7 +653,14 @@ class MainWindow(QMainWindow):
             mode_combo.currentText(),
             host_input.text(),
             port_input.value(),
-            dialog
+            dialog,
+            transport={
+                "prefer_grpc": grpc_check.isChecked(),
+                "grpc_port": grpc_port_input.value(),
+                "pool_size": pool_size_input.value(),
+                "timeout": timeout_input.value(),
+                "retries": retries_input.value()
+            }
         ))
         cancel_button.clicked.connect(dialog.close)
         
@@ -565,12 +676,17 @@ class MainWindow(QMainWindow):
                         mode_combo.setCurrentIndex(mode_index)
                         host_input.setText(qdrant_settings.get("host", "localhost"))
                         port_input.setValue(qdrant_settings.get("port", 6333))
+                        grpc_check.setChecked(qdrant_settings.get("prefer_grpc", DEFAULT_TRANSPORT_SETTINGS["prefer_grpc"]))
+                        grpc_port_input.setValue(qdrant_settings.get("grpc_port", DEFAULT_TRANSPORT_SETTINGS["grpc_port"]))
+                        pool_size_input.setValue(qdrant_settings.get("pool_size", DEFAULT_TRANSPORT_SETTINGS["pool_size"]))
+                        timeout_input.setValue(qdrant_settings.get("timeout", DEFAULT_TRANSPORT_SETTINGS["timeout"]))
+                        retries_input.setValue(qdrant_settings.get("retries", DEFAULT_TRANSPORT_SETTINGS["retries"]))
             except Exception as e:
                 self.logger.error(f"failedToLoadSettings: {str(e)}")
         
         dialog.exec()
     
-    def save_qdrant_settings(self, mode, host, port, dialog):
+    def save_qdrant_settings(self, mode, host, port, dialog, transport=None):
         """保存 Qdrant 服务器设置"""
         try:
             # 创建设置目录
@@ -591,10 +707,13 @@ class MainWindow(QMainWindow):
             
             # 更新设置
             settings["qdrant"] = {
+                **settings.get("qdrant", {}),
                 "mode": "local" if mode == "localStorageMode" else "server",
                 "host": host,
                 "port": port
             }
+            if transport:
+                settings["qdrant"].update(transport)
             
             # 保存设置
             with open(settings_path, "w", encoding="utf-8") as f:
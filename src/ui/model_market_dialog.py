@@ -8,7 +8,7 @@ from src.core.model_manager import ModelManager
 import requests
 import json
 from datetime import datetime
-import time
+import threading
 
 class ModelDownloadWorker(QThread):
     progress = pyqtSignal(int)
@@ -19,18 +19,31 @@ class ModelDownloadWorker(QThread):
         self.model_manager = model_manager
         self.model_name = model_name
         self.model_type = model_type
+        self.cancel_event = threading.Event()
+        self._last_percent = -1
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def report_progress(self, downloaded: int, total: int):
+        """Emit byte progress as a percentage, only when the percentage changes"""
+        percent = int(downloaded * 100 / total) if total else 100
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress.emit(percent)
         
     def run(self):
         try:
-            # Simulate download progress
-            for i in range(101):
-                self.progress.emit(i)
-                time.sleep(0.1)
-            
-            # Actually download the model
-            success = self.model_manager.download_model(self.model_name, self.model_type)
+            success = self.model_manager.download_model(
+                self.model_name,
+                self.model_type,
+                progress_callback=self.report_progress,
+                cancel_event=self.cancel_event
+            )
             if success:
                 self.finished.emit(True, "Model downloaded successfully!")
+            elif self.cancel_event.is_set():
+                self.finished.emit(False, "Download cancelled. It will resume from where it stopped next time.")
             else:
                 self.finished.emit(False, "Model download failed. Please check your network connection or try again.")
         except Exception as e:
@@ -121,19 +134,20 @@ class ModelMarketDialog(QDialog):
                 ]
 
             # 获取本地模型列表
-            local_models = self.model_manager.get_local_models(model_type)
-            local_model_names = [m["name"] for m in local_models]
+            local_models = {m["name"]: m for m in self.model_manager.get_local_models(model_type)}
 
             for model in models:
                 row = self.model_table.rowCount()
                 self.model_table.insertRow(row)
                 self.model_table.setItem(row, 0, QTableWidgetItem(model["name"]))
-                self.model_table.setItem(row, 1, QTableWidgetItem(model["size"]))
+                # Downloaded models show their cached on-disk size
+                local_size = local_models.get(model["name"], {}).get("size")
+                self.model_table.setItem(row, 1, QTableWidgetItem(local_size or model["size"]))
                 self.model_table.setItem(row, 2, QTableWidgetItem(model["language"]))
                 self.model_table.setItem(row, 3, QTableWidgetItem(model["description"]))
                 
                 # Set status
-                if model["name"] in local_model_names:
+                if model["name"] in local_models:
                     status = "Downloaded"
                     button_text = "Delete"
                     button_callback = lambda checked, m=model["name"]: self.delete_model(m)
@@ -171,6 +185,7 @@ class ModelMarketDialog(QDialog):
             
             # Connect signals
             self.download_worker.progress.connect(progress_dialog.setValue)
+            progress_dialog.canceled.connect(self.download_worker.cancel)
             self.download_worker.finished.connect(
                 lambda success, msg: self.handle_download_finished(success, msg, progress_dialog)
             )
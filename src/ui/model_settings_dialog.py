@@ -3,10 +3,10 @@ from PyQt6.QtWidgets import (
     QLineEdit, QPushButton, QFormLayout, QComboBox,
     QSpinBox, QCheckBox, QGroupBox, QTabWidget,
     QDoubleSpinBox, QTextEdit, QTableWidget, QTableWidgetItem,
-    QMessageBox, QWidget
+    QMessageBox, QWidget, QFileDialog
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
-from src.core.model_tester import ModelTester
+from src.core.model_tester import ModelTester, load_evaluation_data
 from src.core.model_manager import ModelManager
 from src.ui.model_market_dialog import ModelMarketDialog
 
@@ -15,15 +15,33 @@ class ModelTestWorker(QThread):
     finished = pyqtSignal(dict)
     error = pyqtSignal(str)
 
-    def __init__(self, model_tester, model_name, device):
+    def __init__(self, model_tester, model_name, device, backend="torch",
+                 num_threads=None, quantize=False, compare=False, eval_path=None):
         super().__init__()
         self.model_tester = model_tester
         self.model_name = model_name
         self.device = device
+        self.backend = backend
+        self.num_threads = num_threads
+        self.quantize = quantize
+        self.compare = compare
+        self.eval_path = eval_path
 
     def run(self):
         try:
-            result = self.model_tester.test_model(self.model_name, self.device)
+            if self.eval_path:
+                # Similarity and retrieval metrics on a labelled dataset
+                result = self.model_tester.evaluate_model(
+                    self.model_name, load_evaluation_data(self.eval_path), self.device,
+                    backend=self.backend, num_threads=self.num_threads, quantize=self.quantize
+                )
+            elif self.compare:
+                # Compare the PyTorch and ONNX Runtime paths on CPU
+                result = self.model_tester.compare_backends(self.model_name, self.num_threads, self.quantize)
+            else:
+                result = self.model_tester.test_model(
+                    self.model_name, self.device, self.backend, self.num_threads, self.quantize
+                )
             self.finished.emit(result)
         except Exception as e:
             self.error.emit(str(e))
@@ -213,6 +231,15 @@ class ModelSettingsDialog(QDialog):
         self.use_fp16.setChecked(False)
         perf_layout.addRow("", self.use_fp16)
 
+        # Inference backend, ONNX Runtime is usually faster on CPU-only machines
+        self.backend = QComboBox()
+        self.backend.addItems(["torch", "onnx"])
+        perf_layout.addRow("Inference Backend:", self.backend)
+
+        self.quantize = QCheckBox("Quantize to INT8 (ONNX only)")
+        self.quantize.setChecked(False)
+        perf_layout.addRow("", self.quantize)
+
         layout.addWidget(perf_group)
 
         return widget
@@ -240,11 +267,20 @@ class ModelSettingsDialog(QDialog):
 
         layout.addWidget(test_group)
 
-        # Test button
+        # Test buttons
         test_btn = QPushButton("Start Test")
         test_btn.clicked.connect(self.run_test)
         layout.addWidget(test_btn)
 
+        compare_btn = QPushButton("Compare PyTorch / ONNX")
+        compare_btn.clicked.connect(lambda: self.run_test(compare=True))
+        layout.addWidget(compare_btn)
+
+        evaluate_btn = QPushButton("Evaluate on Dataset...")
+        evaluate_btn.setToolTip("JSONL/JSON/CSV file with query, reference and score fields")
+        evaluate_btn.clicked.connect(self.run_evaluation)
+        layout.addWidget(evaluate_btn)
+
         # Test results
         result_group = QGroupBox("Test Results")
         result_layout = QVBoxLayout(result_group)
@@ -258,17 +294,32 @@ class ModelSettingsDialog(QDialog):
 
         return widget
 
-    def run_test(self):
+    def run_evaluation(self):
+        """Evaluate the test model on a labelled query/reference dataset"""
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Select Evaluation Data", "", "Evaluation Data (*.jsonl *.json *.csv)"
+        )
+        if path:
+            self.run_test(eval_path=path)
+
+    def run_test(self, compare=False, eval_path=None):
         """Run performance test"""
         try:
             model_name = self.test_model.currentText()
             device = self.test_device.currentText()
 
-            # Create test thread
-            worker = ModelTestWorker(self.model_tester, model_name, device)
-            worker.finished.connect(self.show_test_results)
-            worker.error.connect(lambda msg: QMessageBox.critical(self, "Error", f"Test failed: {msg}"))
-            worker.start()
+            # Create test thread, keep a reference so it is not collected while running
+            self.test_worker = ModelTestWorker(
+                self.model_tester, model_name, device,
+                backend=self.backend.currentText(),
+                num_threads=self.num_threads.value(),
+                quantize=self.quantize.isChecked(),
+                compare=compare,
+                eval_path=eval_path
+            )
+            self.test_worker.finished.connect(self.show_test_results)
+            self.test_worker.error.connect(lambda msg: QMessageBox.critical(self, "Error", f"Test failed: {msg}"))
+            self.test_worker.start()
 
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Test failed: {str(e)}")
@@ -312,6 +363,8 @@ class ModelSettingsDialog(QDialog):
                 "use_cache": self.use_cache.isChecked(),
                 "cache_dir": self.cache_dir.text(),
                 "num_threads": self.num_threads.value(),
-                "use_fp16": self.use_fp16.isChecked()
+                "use_fp16": self.use_fp16.isChecked(),
+                "backend": self.backend.currentText(),
+                "quantize": self.quantize.isChecked()
             }
         } 
\ No newline at end of file
@@ -1,19 +1,44 @@
 from PyQt6.QtWidgets import (
     QDialog, QVBoxLayout, QHBoxLayout, QLabel,
-    QPushButton, QTableWidget, QTableWidgetItem,
+    QPushButton, QTableView,
     QMessageBox, QProgressBar, QComboBox,
     QTextEdit, QSplitter, QWidget, QFrame
 )
 from PyQt6.QtCore import Qt, QThread, pyqtSignal
 from PyQt6.QtGui import QColor, QPalette
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 import json
+from src.core.vector_store import parse_payload_text
+from .table_models import ResultTableModel
+
+
+def results_from_hits(hits) -> Iterator[Dict]:
+    """Lazily convert hits from VectorStore.iter_search / iter_search_all into result dicts
+
+    Hits of iter_search_all carry the collection name as a fourth element, kept as "collection".
+    """
+    for score, _, text, *collection in hits:
+        result = {"score": score, **parse_payload_text(text)}
+        if collection:
+            result["collection"] = collection[0]
+        yield result
+
 
 class SearchResultDialog(QDialog):
-    def __init__(self, query: str, results: List[Dict], parent=None):
+    def __init__(self, query: str, results: List[Dict], parent=None,
+                 results_iter: Optional[Iterator[Dict]] = None, page_size: int = 20):
+        """
+        Args:
+            query: Search query
+            results: Results already fetched
+            results_iter: Optional iterator yielding further results, pulled a page at a time on scroll
+            page_size: Number of results pulled from results_iter per page
+        """
         super().__init__(parent)
         self.query = query
         self.results = results
+        self.results_iter = results_iter
+        self.page_size = page_size
         self.init_ui()
         self.load_results()
 
@@ -56,14 +81,22 @@ class SearchResultDialog(QDialog):
         stats_layout.addStretch()
         left_layout.addLayout(stats_layout)
 
-        # Result list
-        self.result_table = QTableWidget()
-        self.result_table.setColumnCount(4)
-        self.result_table.setHorizontalHeaderLabels(["Relevance", "Source", "Type", "Time"])
+        # Result list, cells are formatted lazily and further pages fetched on scroll
+        self.result_model = ResultTableModel([
+            ("Relevance", lambda r: f"{r.get('score', 0):.2f}"),
+            ("Source", lambda r: r.get("source", "").split("/")[-1]),
+            ("Type", lambda r: r.get("file_type", "")),
+            ("Time", lambda r: r.get("created_at", "")[:19])
+        ], page_size=self.page_size, background=lambda r: self.get_score_color(r.get("score", 0)))
+        self.result_model.rowsInserted.connect(self.update_stats)
+        self.result_model.modelReset.connect(self.update_stats)
+        self.result_model.fetch_finished.connect(self.on_page_fetched)
+        self.result_table = QTableView()
+        self.result_table.setModel(self.result_model)
         self.result_table.horizontalHeader().setStretchLastSection(True)
-        self.result_table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.result_table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self.result_table.itemSelectionChanged.connect(self.show_content)
+        self.result_table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.result_table.setSelectionMode(QTableView.SelectionMode.SingleSelection)
+        self.result_table.selectionModel().selectionChanged.connect(self.show_content)
         left_layout.addWidget(self.result_table)
         
         splitter.addWidget(left_widget)
@@ -109,40 +142,34 @@ class SearchResultDialog(QDialog):
 
     def load_results(self):
         """Load search results"""
-        self.result_table.setRowCount(len(self.results))
-        for i, result in enumerate(self.results):
-            # Relevance
-            score = result.get("score", 0)
-            score_item = QTableWidgetItem(f"{score:.2f}")
-            score_item.setData(Qt.ItemDataRole.UserRole, score)
-            self.result_table.setItem(i, 0, score_item)
-            
-            # Set background color based on relevance
-            color = self.get_score_color(score)
-            score_item.setBackground(color)
-            
-            # Source
-            source = result.get("source", "").split("/")[-1]
-            self.result_table.setItem(i, 1, QTableWidgetItem(source))
-            
-            # Type
-            self.result_table.setItem(i, 2, QTableWidgetItem(result.get("file_type", "")))
-            
-            # Time
-            self.result_table.setItem(i, 3, QTableWidgetItem(result.get("created_at", "")[:19]))
+        self.result_model.set_results(self.results, source=self.results_iter)
+        # Share the model's row list so rows fetched later are visible to export
+        self.results = self.result_model.rows
+        self.update_stats()
         
         # Auto-select first row
-        if self.result_table.rowCount() > 0:
+        if self.result_model.rowCount() > 0:
+            self.result_table.selectRow(0)
+
+    def on_page_fetched(self):
+        """Refresh the count and select the first row once results arrive"""
+        self.update_stats()
+        if self.result_model.rowCount() > 0 and not self.result_table.selectionModel().hasSelection():
             self.result_table.selectRow(0)
 
+    def update_stats(self, *args):
+        """Update the result count label"""
+        more = "+" if self.result_model.has_more() else ""
+        self.stats_label.setText(f"Found {self.result_model.rowCount()}{more} results")
+
     def show_content(self):
         """Show selected result content"""
-        selected_rows = self.result_table.selectedItems()
+        selected_rows = self.result_table.selectionModel().selectedRows()
         if not selected_rows:
             return
         
         row = selected_rows[0].row()
-        result = self.results[row]
+        result = self.result_model.row_data(row)
         
         # Show content
         content = result.get("content", "")
@@ -156,6 +183,7 @@ class SearchResultDialog(QDialog):
             "Filename": result.get("filename", ""),
             "File Type": result.get("file_type", ""),
             "Created At": result.get("created_at", "")[:19],
+            "Knowledge Base": result.get("collection", ""),
             "Relevance": f"{result.get('score', 0):.2f}",
             "Chunk Type": result.get("chunk_type", ""),
             "Chunk Index": result.get("chunk_index", "")
@@ -183,11 +211,9 @@ class SearchResultDialog(QDialog):
     def sort_results(self, index):
         """Sort results"""
         if index == 0:  # Sort by relevance
-            self.results.sort(key=lambda x: x.get("score", 0), reverse=True)
+            self.result_model.sort_rows(key=lambda x: x.get("score", 0), reverse=True)
         else:  # Sort by time
-            self.results.sort(key=lambda x: x.get("created_at", ""), reverse=True)
-        
-        self.load_results()
+            self.result_model.sort_rows(key=lambda x: x.get("created_at", ""), reverse=True)
 
     def export_results(self):
         """Export search results"""
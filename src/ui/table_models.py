@@ -0,0 +1,282 @@
+from PyQt6.QtWidgets import QApplication, QStyle, QStyledItemDelegate, QStyleOptionProgressBar
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex, QThread, pyqtSignal
+from pathlib import Path
+from itertools import islice
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+from src.core.logger import Logger
+
+logger = Logger.get_logger("ui")
+
+# 列定义：(表头, 取显示文本的函数)
+Column = Tuple[str, Callable[[Any], str]]
+
+
+class PageFetcher(QThread):
+    """Pulls one page from a result iterator off the GUI thread"""
+    fetched = pyqtSignal(int, list, bool)  # Generation, rows, whether the iterator is exhausted
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, source: Iterator[Any], page_size: int, generation: int, parent=None):
+        super().__init__(parent)
+        self.source = source
+        self.page_size = page_size
+        self.generation = generation
+
+    def run(self):
+        try:
+            page = list(islice(self.source, self.page_size))
+            self.fetched.emit(self.generation, page, len(page) < self.page_size)
+        except Exception as e:
+            self.failed.emit(self.generation, str(e))
+
+
+class ResultTableModel(QAbstractTableModel):
+    """Lazy search result model
+
+    Cell text is only formatted when a view asks for a visible cell. When built
+    with an iterator, rows are pulled a page at a time through canFetchMore /
+    fetchMore as the view scrolls, so deep result lists are never loaded at once.
+    Pages are fetched on a worker thread, one at a time, so scrolling never
+    blocks on Qdrant.
+    """
+    fetch_finished = pyqtSignal()  # A page arrived or fetching stopped
+
+    def __init__(self, columns: List[Column], parent=None, page_size: int = 20,
+                 background: Optional[Callable[[Any], Any]] = None):
+        super().__init__(parent)
+        self.columns = columns
+        self.page_size = page_size
+        self.background = background
+        self.rows: List[Any] = []
+        self.source: Optional[Iterator[Any]] = None
+        self.sort_key: Optional[Callable[[Any], Any]] = None
+        self.sort_reverse = False
+        # Incremented on every reset so pages of a previous query are dropped
+        self._generation = 0
+        self._fetcher: Optional[PageFetcher] = None
+        # Fetchers of earlier queries that are still running, kept alive until they finish
+        self._stale_fetchers: List[PageFetcher] = []
+
+    def set_results(self, rows: Iterable[Any] = (), source: Optional[Iterator[Any]] = None):
+        """Replace all rows, optionally with an iterator supplying further pages"""
+        self.beginResetModel()
+        self._generation += 1
+        if self._fetcher is not None:
+            self._stale_fetchers.append(self._fetcher)
+            self._fetcher = None
+        self.rows = list(rows)
+        self.source = source
+        self.sort_key = None
+        self.endResetModel()
+        if not self.rows and self.canFetchMore(QModelIndex()):
+            self.fetchMore(QModelIndex())
+
+    def clear(self):
+        self.set_results()
+
+    def row_data(self, row: int) -> Any:
+        return self.rows[row]
+
+    def has_more(self) -> bool:
+        return self.source is not None
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.columns[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row = self.rows[index.row()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return self.columns[index.column()][1](row)
+        if role == Qt.ItemDataRole.UserRole:
+            return row
+        if role == Qt.ItemDataRole.BackgroundRole and self.background and index.column() == 0:
+            return self.background(row)
+        return None
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.source is not None and self._fetcher is None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if self.source is None or self._fetcher is not None:
+            return
+        self._fetcher = PageFetcher(self.source, self.page_size, self._generation, self)
+        self._fetcher.fetched.connect(self._on_page)
+        self._fetcher.failed.connect(self._on_failed)
+        self._fetcher.finished.connect(self._on_fetcher_finished)
+        self._fetcher.start()
+
+    def _on_page(self, generation: int, page: list, exhausted: bool):
+        if generation != self._generation:
+            return
+        self._fetcher = None
+        if exhausted:
+            self.source = None
+        if page:
+            start = len(self.rows)
+            self.beginInsertRows(QModelIndex(), start, start + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+            if self.sort_key is not None:
+                # New pages join the current sort order instead of being appended unsorted
+                self._apply_sort()
+        self.fetch_finished.emit()
+
+    def _on_failed(self, generation: int, message: str):
+        if generation != self._generation:
+            return
+        self._fetcher = None
+        self.source = None
+        logger.error(f"Failed to fetch more results: {message}")
+        self.fetch_finished.emit()
+
+    def _on_fetcher_finished(self):
+        fetcher = self.sender()
+        if fetcher in self._stale_fetchers:
+            self._stale_fetchers.remove(fetcher)
+        fetcher.deleteLater()
+
+    def sort_rows(self, key: Callable[[Any], Any], reverse: bool = False):
+        """Sort the rows, pages fetched later are kept in the same order"""
+        self.sort_key = key
+        self.sort_reverse = reverse
+        self._apply_sort()
+
+    def _apply_sort(self):
+        self.layoutAboutToBeChanged.emit()
+        self.rows.sort(key=self.sort_key, reverse=self.sort_reverse)
+        self.layoutChanged.emit()
+
+
+class ImportFileModel(QAbstractTableModel):
+    """File list of the batch import dialog
+
+    Status and progress live in flat lists indexed by row. File sizes are
+    stat'ed the first time a row becomes visible rather than when files are added.
+    """
+
+    HEADERS = ["Filename", "Size", "Type", "Status", "Progress"]
+    PROGRESS_COLUMN = 4
+
+    def __init__(self, format_size: Callable[[int], str], parent=None):
+        super().__init__(parent)
+        self.format_size = format_size
+        self.files: List[str] = []
+        self.statuses: List[str] = []
+        self.progress: List[int] = []
+        self._known = set()
+        self._sizes: Dict[int, str] = {}
+
+    def add_files(self, files: Iterable[str]) -> int:
+        """Append files not already listed, returns the number added"""
+        new_files = []
+        for file in files:
+            if file not in self._known:
+                self._known.add(file)
+                new_files.append(file)
+        if new_files:
+            start = len(self.files)
+            self.beginInsertRows(QModelIndex(), start, start + len(new_files) - 1)
+            self.files.extend(new_files)
+            self.statuses.extend(["Pending"] * len(new_files))
+            self.progress.extend([0] * len(new_files))
+            self.endInsertRows()
+        return len(new_files)
+
+    def clear(self):
+        self.beginResetModel()
+        self.files.clear()
+        self.statuses.clear()
+        self.progress.clear()
+        self._known.clear()
+        self._sizes.clear()
+        self.endResetModel()
+
+    def reset_progress(self):
+        """Mark every file pending again"""
+        self.statuses = ["Pending"] * len(self.files)
+        self.progress = [0] * len(self.files)
+        self._emit_rows_changed(0, len(self.files) - 1)
+
+    def set_statuses(self, statuses: Dict[int, str]):
+        """Apply a batch of coalesced status changes, completed rows are shown at 100%"""
+        if not statuses:
+            return
+        for row, status in statuses.items():
+            self.statuses[row] = status
+            if status == "Completed":
+                self.progress[row] = 100
+        self._emit_rows_changed(min(statuses), max(statuses))
+
+    def set_progress(self, row: int, value: int):
+        self.progress[row] = value
+        index = self.index(row, self.PROGRESS_COLUMN)
+        self.dataChanged.emit(index, index)
+
+    def _emit_rows_changed(self, first: int, last: int):
+        if first <= last:
+            self.dataChanged.emit(self.index(first, 3), self.index(last, self.PROGRESS_COLUMN))
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.files)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if role == Qt.ItemDataRole.DisplayRole and orientation == Qt.Orientation.Horizontal:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, column = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if column == 0:
+                return Path(self.files[row]).name
+            if column == 1:
+                return self._size(row)
+            if column == 2:
+                return Path(self.files[row]).suffix[1:].upper()
+            if column == 3:
+                return self.statuses[row]
+            if column == self.PROGRESS_COLUMN:
+                return self.progress[row]
+        if role == Qt.ItemDataRole.ToolTipRole and column == 0:
+            return self.files[row]
+        return None
+
+    def _size(self, row: int) -> str:
+        if row not in self._sizes:
+            try:
+                self._sizes[row] = self.format_size(Path(self.files[row]).stat().st_size)
+            except OSError:
+                self._sizes[row] = "-"
+        return self._sizes[row]
+
+
+class ProgressBarDelegate(QStyledItemDelegate):
+    """Paints a progress bar from the cell's integer value instead of embedding a QProgressBar widget"""
+
+    def paint(self, painter, option, index):
+        value = index.data(Qt.ItemDataRole.DisplayRole) or 0
+        bar = QStyleOptionProgressBar()
+        bar.rect = option.rect.adjusted(2, 2, -2, -2)
+        bar.minimum = 0
+        bar.maximum = 100
+        bar.progress = int(value)
+        bar.text = f"{int(value)}%"
+        bar.textVisible = True
+        bar.state = option.state
+        style = option.widget.style() if option.widget else QApplication.style()
+        style.drawControl(QStyle.ControlElement.CE_ProgressBar, bar, painter, option.widget)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 与 run.py 一样把项目根目录加入导入路径
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
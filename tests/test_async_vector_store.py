@@ -0,0 +1,88 @@
+"""AsyncVectorStore 与 VectorStore 混合写入同一集合时点 ID 不重叠"""
+import threading
+
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+
+from src.core.async_vector_store import AsyncLoopThread, AsyncVectorStore
+from src.core.vector_store import VectorStore
+
+COLLECTION = "mixed"
+
+
+def _chunks(prefix: str, count: int):
+    return [{"content": f"{prefix} {i}", "filename": f"{prefix}.txt", "source": f"{prefix}.txt"}
+            for i in range(count)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = VectorStore(data_dir=str(tmp_path), settings={"qdrant": {"mode": "local"}})
+    assert store.create_collection(COLLECTION)
+    yield store
+    store.pool.close()
+
+
+def _contents(store: VectorStore):
+    records, _ = store.client.scroll(COLLECTION, limit=10000, with_payload=True)
+    return sorted(str(record.payload["text"]) for record in records), [record.id for record in records]
+
+
+def test_sync_and_async_upserts_share_point_ids(store):
+    loop_thread = AsyncLoopThread()
+    async_store = AsyncVectorStore(store, max_in_flight=4)
+    try:
+        loop_thread.submit(async_store.connect()).result(timeout=30)
+
+        # 异步批量导入在事件循环线程中进行，同时在另一个线程中同步写入
+        documents = [_chunks(f"async{d}", 7) for d in range(6)]
+        async_future = loop_thread.submit(async_store.add_texts_many(COLLECTION, documents))
+
+        def write_sync():
+            for d in range(6):
+                store.add_texts(COLLECTION, _chunks(f"sync{d}", 5), is_first_chunk=True)
+
+        writer = threading.Thread(target=write_sync)
+        writer.start()
+        async_future.result(timeout=60)
+        writer.join(timeout=60)
+
+        # 再交替写入一次：各自从对方推进后的 next_id 继续
+        store.add_texts(COLLECTION, _chunks("tail-sync", 3), is_first_chunk=True)
+        loop_thread.submit(async_store.add_texts(COLLECTION, _chunks("tail-async", 3), True)).result(timeout=30)
+
+        expected = 6 * 7 + 6 * 5 + 3 + 3
+        contents, ids = _contents(store)
+        assert len(ids) == expected
+        assert sorted(ids) == list(range(expected))
+        assert len(set(contents)) == expected
+        assert store.config["collections"][COLLECTION]["next_id"] == expected
+        assert store.config["collections"][COLLECTION]["doc_count"] == 14
+
+        info = loop_thread.submit(async_store.get_collection_info(COLLECTION)).result(timeout=30)
+        assert info["points_count"] == 14
+        hits = loop_thread.submit(async_store.search("async3 2", COLLECTION, limit=3)).result(timeout=30)
+        assert len(hits) == 3
+    finally:
+        loop_thread.submit(async_store.close()).result(timeout=30)
+        loop_thread.stop()
+
+
+def test_ids_continue_after_deleting_a_source(store):
+    store.add_texts(COLLECTION, _chunks("a", 4), is_first_chunk=True)
+    store.add_texts(COLLECTION, _chunks("b", 4), is_first_chunk=True)
+    assert store.delete_source(COLLECTION, "a.txt") == 4
+
+    loop_thread = AsyncLoopThread()
+    async_store = AsyncVectorStore(store)
+    try:
+        loop_thread.submit(async_store.connect()).result(timeout=30)
+        loop_thread.submit(async_store.add_texts(COLLECTION, _chunks("c", 2), True)).result(timeout=30)
+    finally:
+        loop_thread.stop()
+
+    # points_count 为 4，但 ID 4~7 已被 b 使用，新点必须从 8 开始
+    _, ids = _contents(store)
+    assert sorted(ids) == [4, 5, 6, 7, 8, 9]
@@ -0,0 +1,56 @@
+"""解析缓存键随 "streaming" 设置变化：转换为文本后按 txt 设置切分的 .doc / .rtf 不再命中旧条目"""
+import json
+
+import pytest
+
+pytest.importorskip("docx")
+pytest.importorskip("PyPDF2")
+
+from src.core.document_processor import DocumentProcessor
+from src.core.parse_cache import ParseCache
+
+TEXT = "first line of the paragraph\nsecond line of the paragraph\nthird line of the paragraph\n"
+
+
+class FakeConverter:
+    """代替 LibreOffice：把任何 .doc / .rtf 转换为同一个文本文件，并记录转换次数"""
+
+    def __init__(self, output: str):
+        self.output = output
+        self.calls = 0
+
+    def convert(self, file_path: str):
+        self.calls += 1
+        return [self.output]
+
+
+def _write_settings(tmp_path, streaming: dict):
+    data_dir = tmp_path / "data"
+    data_dir.mkdir(exist_ok=True)
+    (data_dir / "settings.json").write_text(json.dumps({"streaming": streaming}), encoding="utf-8")
+
+
+@pytest.mark.parametrize("extension", [".rtf", ".doc"])
+def test_txt_streaming_settings_invalidate_cached_office_text(tmp_path, monkeypatch, extension):
+    monkeypatch.chdir(tmp_path)
+    converted = tmp_path / "converted.txt"
+    converted.write_text(TEXT, encoding="utf-8")
+    document = tmp_path / f"notes{extension}"
+    document.write_bytes(b"{\\rtf1 original bytes}")
+
+    _write_settings(tmp_path, {"txt": {"max_chunk_chars": 65536}})
+    processor = DocumentProcessor(cache=ParseCache(str(tmp_path / "cache")))
+    processor.office = FakeConverter(str(converted))
+
+    chunks = processor.process_document(str(document))
+    assert len(chunks) == 1
+    # 设置不变时命中缓存，不再转换
+    assert len(processor.process_document(str(document))) == 1
+    assert processor.office.calls == 1
+
+    # 修改 txt 的 max_chunk_chars 后缓存键变化，按新设置重新切分
+    _write_settings(tmp_path, {"txt": {"max_chunk_chars": 40}})
+    chunks = processor.process_document(str(document))
+    assert processor.office.calls == 2
+    assert len(chunks) == 3
+    assert [chunk["content"] for chunk in chunks] == [line for line in TEXT.splitlines()]
@@ -0,0 +1,155 @@
+"""ModelDownloader 对本地 HTTP 镜像（支持 Range）与 file:// 仓库的下载、取消续传和校验"""
+import hashlib
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+import pytest
+
+from src.core.model_downloader import DownloadCancelled, ModelDownloader
+
+MODEL = "org/tiny-model"
+SEGMENT_SIZE = 64 * 1024
+
+
+def _git_sha1(data: bytes) -> str:
+    return hashlib.sha1(f"blob {len(data)}\0".encode() + data).hexdigest()
+
+
+@pytest.fixture
+def repo_files():
+    """一个 LFS 大文件（多个分段）和一个普通小文件"""
+    return {
+        "model.bin": os.urandom(SEGMENT_SIZE * 5 + 123),
+        "config.json": json.dumps({"dim": 384}).encode()
+    }
+
+
+@pytest.fixture
+def mirror(repo_files):
+    """Hugging Face 布局的本地镜像，记录每个 Range 请求"""
+    state = {"ranges": [], "corrupt": False}
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            if self.path.startswith(f"/api/models/{MODEL}/tree/main"):
+                entries = [
+                    {"type": "file", "path": "model.bin", "size": len(repo_files["model.bin"]),
+                     "lfs": {"oid": hashlib.sha256(repo_files["model.bin"]).hexdigest(),
+                             "size": len(repo_files["model.bin"])}},
+                    {"type": "file", "path": "config.json", "size": len(repo_files["config.json"]),
+                     "oid": _git_sha1(repo_files["config.json"])}
+                ]
+                body = json.dumps(entries).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                return
+
+            prefix = f"/{MODEL}/resolve/main/"
+            name = self.path[len(prefix):] if self.path.startswith(prefix) else None
+            if name not in repo_files:
+                self.send_error(404)
+                return
+            data = repo_files[name]
+            if state["corrupt"]:
+                data = bytes(len(data))
+            match = re.match(r"bytes=(\d+)-(\d+)", self.headers.get("Range", ""))
+            if match:
+                start, end = int(match.group(1)), int(match.group(2))
+                state["ranges"].append((name, start, end))
+                body = data[start:end + 1]
+                self.send_response(206)
+                self.send_header("Content-Range", f"bytes {start}-{end}/{len(data)}")
+            else:
+                body = data
+                self.send_response(200)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    state["url"] = f"http://127.0.0.1:{server.server_address[1]}"
+    yield state
+    server.shutdown()
+    server.server_close()
+
+
+def _downloader(url: str) -> ModelDownloader:
+    return ModelDownloader(mirror=url, workers=3, segment_size=SEGMENT_SIZE, timeout=5)
+
+
+def _assert_downloaded(target: Path, repo_files):
+    for name, data in repo_files.items():
+        assert (target / name).read_bytes() == data
+    assert not list(target.glob("*.part*"))
+
+
+def test_download_verifies_files_and_reports_byte_progress(mirror, repo_files, tmp_path):
+    progress = []
+    _downloader(mirror["url"]).download(MODEL, tmp_path, lambda done, total: progress.append((done, total)))
+
+    _assert_downloaded(tmp_path, repo_files)
+    total = sum(len(data) for data in repo_files.values())
+    assert progress[-1] == (total, total)
+    # 大文件按分段并行下载
+    assert len([r for r in mirror["ranges"] if r[0] == "model.bin"]) == 6
+
+
+def test_cancelled_download_resumes_from_partial_segments(mirror, repo_files, tmp_path):
+    cancel = threading.Event()
+
+    def cancel_after_first_bytes(done, total):
+        if done > 0:
+            cancel.set()
+
+    with pytest.raises(DownloadCancelled):
+        _downloader(mirror["url"]).download(MODEL, tmp_path, cancel_after_first_bytes, cancel)
+    assert list(tmp_path.glob("*.part*"))
+    assert not (tmp_path / "model.bin").exists()
+
+    fetched_before = len(mirror["ranges"])
+    progress = []
+    _downloader(mirror["url"]).download(MODEL, tmp_path, lambda done, total: progress.append(done))
+
+    _assert_downloaded(tmp_path, repo_files)
+    # 续传时已下载的字节计入初始进度，且不再从头请求这些分段
+    assert progress[0] > 0
+    resumed = mirror["ranges"][fetched_before:]
+    total = sum(len(data) for data in repo_files.values())
+    assert sum(end - start + 1 for _, start, end in resumed) == total - progress[0]
+
+
+def test_checksum_mismatch_is_rejected_and_redownloaded(mirror, repo_files, tmp_path):
+    mirror["corrupt"] = True
+    with pytest.raises(IOError):
+        _downloader(mirror["url"]).download(MODEL, tmp_path)
+    assert not (tmp_path / "model.bin").exists()
+    # 校验失败的文件不保留分段，下次从头下载
+    assert not list(tmp_path.glob("*.part*"))
+
+    mirror["corrupt"] = False
+    _downloader(mirror["url"]).download(MODEL, tmp_path)
+    _assert_downloaded(tmp_path, repo_files)
+
+
+def test_local_file_repository(repo_files, tmp_path):
+    source = tmp_path / "repo" / MODEL
+    source.mkdir(parents=True)
+    for name, data in repo_files.items():
+        (source / name).write_bytes(data)
+    target = tmp_path / "out"
+
+    ModelDownloader(mirror=(tmp_path / "repo").as_uri(), segment_size=SEGMENT_SIZE).download(MODEL, target)
+
+    _assert_downloaded(target, repo_files)
@@ -0,0 +1,73 @@
+"""转换缓存按 LRU 索引淘汰：缓存目录只在第一次使用时扫描一次"""
+import os
+
+from src.core.office_converter import OfficeConverter
+from src.core.parse_cache import file_digest
+
+ENTRY_BYTES = 100 * 1024
+
+
+def _converter(tmp_path, monkeypatch):
+    converter = OfficeConverter(cache_dir=str(tmp_path / "cache"), max_mb=0.5, antiword=False)
+    # 代替 antiword：每次转换输出固定大小的文本
+    converter.soffice = None
+    converter.antiword = "antiword"
+    converter.conversions = 0
+
+    def fake_antiword(file_path, out_dir):
+        converter.conversions += 1
+        with open(os.path.join(out_dir, "out.txt"), "wb") as f:
+            f.write(b"x" * ENTRY_BYTES)
+
+    monkeypatch.setattr(converter, "_run_antiword", fake_antiword)
+    return converter
+
+
+def _documents(tmp_path, count):
+    paths = []
+    for i in range(count):
+        path = tmp_path / f"doc{i}.doc"
+        path.write_bytes(f"document {i}".encode())
+        paths.append(str(path))
+    return paths
+
+
+def test_eviction_follows_lru_without_rescanning(tmp_path, monkeypatch):
+    converter = _converter(tmp_path, monkeypatch)
+    documents = _documents(tmp_path, 7)
+    scans = []
+    load_index = converter._load_index
+    monkeypatch.setattr(converter, "_load_index", lambda: (scans.append(1), load_index()))
+
+    for path in documents[:5]:
+        converter.convert(path)
+    # 再次使用 doc0，它成为最近使用的条目
+    converter.convert(documents[0])
+    assert converter.conversions == 5
+    assert converter._total_bytes == 5 * ENTRY_BYTES
+
+    # 超过 0.5 MB 后淘汰到 90%：最久未用的 doc1、doc2 被删除
+    converter.convert(documents[5])
+    converter.convert(documents[6])
+    assert len(scans) == 1
+    assert converter._total_bytes == sum(converter._index.values()) <= converter.max_bytes
+
+    conversions = converter.conversions
+    converter.convert(documents[0])
+    assert converter.conversions == conversions
+    converter.convert(documents[1])
+    assert converter.conversions == conversions + 1
+
+
+def test_index_is_rebuilt_from_existing_cache(tmp_path, monkeypatch):
+    documents = _documents(tmp_path, 3)
+    first = _converter(tmp_path, monkeypatch)
+    for path in documents:
+        first.convert(path)
+
+    second = _converter(tmp_path, monkeypatch)
+    assert second.convert(documents[1])
+    assert second.conversions == 0
+    assert second._total_bytes == 3 * ENTRY_BYTES
+    # 命中的条目移到 LRU 末尾
+    assert next(reversed(second._index)).endswith(f"{file_digest(documents[1])}-txt")
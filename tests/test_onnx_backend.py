@@ -0,0 +1,75 @@
+"""ONNX 后端与 sentence-transformers 后端对长输入（超过 128 个 token）的嵌入一致"""
+import pytest
+
+np = pytest.importorskip("numpy")
+pytest.importorskip("torch")
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+sentence_transformers = pytest.importorskip("sentence_transformers")
+
+from src.models.onnx_backend import OnnxEmbeddingBackend
+
+MAX_SEQ_LENGTH = 256
+WORDS = ["alpha", "beta", "gamma", "delta", "epsilon", "zeta", "eta", "theta", "iota", "kappa"]
+
+
+@pytest.fixture(scope="module")
+def tiny_model(tmp_path_factory):
+    """随机初始化的小型 BERT，保存为 max_seq_length=256 的 SentenceTransformer，不需要下载"""
+    import torch
+    from sentence_transformers import SentenceTransformer, models
+    from transformers import BertConfig, BertModel, BertTokenizerFast
+
+    root = tmp_path_factory.mktemp("tiny")
+    bert_dir = root / "bert"
+    bert_dir.mkdir()
+    vocab = bert_dir / "vocab.txt"
+    vocab.write_text("\n".join(["[PAD]", "[UNK]", "[CLS]", "[SEP]", "[MASK]"] + WORDS) + "\n", encoding="utf-8")
+    BertTokenizerFast(vocab_file=str(vocab)).save_pretrained(str(bert_dir))
+    torch.manual_seed(0)
+    BertModel(BertConfig(vocab_size=len(WORDS) + 5, hidden_size=32, num_hidden_layers=2,
+                         num_attention_heads=2, intermediate_size=64,
+                         max_position_embeddings=512)).save_pretrained(str(bert_dir))
+
+    transformer = models.Transformer(str(bert_dir), max_seq_length=MAX_SEQ_LENGTH)
+    pooling = models.Pooling(transformer.get_word_embedding_dimension(), pooling_mode="mean")
+    st_model = SentenceTransformer(modules=[transformer, pooling, models.Normalize()], device="cpu")
+    st_dir = root / "st"
+    st_model.save(str(st_dir))
+    return str(st_dir), st_model
+
+
+def _long_text(tokens: int) -> str:
+    return " ".join(WORDS[i % len(WORDS)] for i in range(tokens))
+
+
+def test_onnx_uses_exported_max_seq_length_and_matches_torch(tiny_model, tmp_path):
+    model_path, st_model = tiny_model
+    texts = [_long_text(200), _long_text(240), "alpha beta"]
+
+    backend = OnnxEmbeddingBackend(model_path, cache_dir=str(tmp_path / "onnx")).load()
+    assert backend.meta["max_seq_length"] == MAX_SEQ_LENGTH
+    assert backend.max_length == MAX_SEQ_LENGTH
+
+    expected = st_model.encode(texts, convert_to_numpy=True)
+    np.testing.assert_allclose(backend.encode(texts), expected, atol=1e-4)
+
+    # 截断到 128 个 token 得到的向量不同，说明上面的比较覆盖了超过 128 的部分
+    truncated = OnnxEmbeddingBackend(model_path, cache_dir=str(tmp_path / "onnx"), max_length=128).load()
+    assert not np.allclose(truncated.encode(texts[:1]), expected[:1], atol=1e-4)
+
+
+def test_meta_without_max_seq_length_is_completed(tiny_model, tmp_path):
+    import json
+
+    model_path, _ = tiny_model
+    backend = OnnxEmbeddingBackend(model_path, cache_dir=str(tmp_path / "onnx"))
+    backend.export()
+    meta_file = backend.export_dir / OnnxEmbeddingBackend.META_FILE
+    meta = json.loads(meta_file.read_text(encoding="utf-8"))
+    del meta["max_seq_length"]
+    meta_file.write_text(json.dumps(meta), encoding="utf-8")
+
+    reloaded = OnnxEmbeddingBackend(model_path, cache_dir=str(tmp_path / "onnx")).load()
+    assert reloaded.max_length == MAX_SEQ_LENGTH
+    assert json.loads(meta_file.read_text(encoding="utf-8"))["max_seq_length"] == MAX_SEQ_LENGTH
@@ -0,0 +1,74 @@
+"""跨知识库分页搜索：按分数归并各集合的结果，逐页向 Qdrant 取数"""
+import pytest
+
+pytest.importorskip("numpy")
+pytest.importorskip("qdrant_client")
+
+from src.core.vector_store import VectorStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = VectorStore(data_dir=str(tmp_path), settings={"qdrant": {"mode": "local"}})
+    for name, count in (("kb1", 23), ("kb2", 17)):
+        assert store.create_collection(name)
+        store.add_texts(name, [{"content": f"{name} note {i}", "source": f"{name}.txt"} for i in range(count)],
+                        is_first_chunk=True)
+    yield store
+    store.pool.close()
+
+
+def test_iter_search_all_merges_every_page_by_score(store, monkeypatch):
+    requests = []
+    search_vector = store._search_vector
+
+    def counting_search(query_vector, collection_name, limit, offset=0, *args, **kwargs):
+        requests.append((collection_name, offset))
+        return search_vector(query_vector, collection_name, limit, offset, *args, **kwargs)
+
+    monkeypatch.setattr(store, "_search_vector", counting_search)
+    hits = store.iter_search_all("note 5", page_size=5)
+
+    first = [next(hits) for _ in range(3)]
+    # 只取了每个集合的第一页
+    assert sorted(requests) == [("kb1", 0), ("kb2", 0)]
+
+    rest = list(hits)
+    merged = first + rest
+    assert len(merged) == 40
+    assert [hit[0] for hit in merged] == sorted((hit[0] for hit in merged), reverse=True)
+    assert {hit[3] for hit in merged} == {"kb1", "kb2"}
+    assert sum(hit[3] == "kb1" for hit in merged) == 23
+
+
+def test_legacy_points_are_migrated_once(store, monkeypatch):
+    from qdrant_client.http import models
+
+    # 旧版本写入的点：只有 text，没有 source 字段
+    vector = store.embedder.encode(["legacy"])[0]
+    store.client.upsert("kb1", points=[
+        models.PointStruct(id=100 + i, vector=list(vector),
+                           payload={"text": str({"content": f"old {i}", "source": f"old{i % 2}.txt"})})
+        for i in range(6)
+    ])
+    del store.config["collections"]["kb1"]["source_indexed"]
+    assert store.config["collections"]["kb2"]["source_indexed"]
+
+    calls = []
+    execute = store._execute
+
+    def counting_execute(operation, name, *args, **kwargs):
+        calls.append(name)
+        return execute(operation, name, *args, **kwargs)
+
+    monkeypatch.setattr(store, "_execute", counting_execute)
+    assert store.delete_source("kb1", "old0.txt") == 3
+    assert store.config["collections"]["kb1"]["source_indexed"]
+    assert "set_payload" in calls
+
+    # 迁移只执行一次，之后只按 source 过滤
+    calls.clear()
+    assert store.delete_source("kb1", "old1.txt") == 3
+    assert calls.count("scroll") == 1
+    assert "set_payload" not in calls
+    assert store.delete_source("kb1", "kb1.txt") == 23